@@ -2,25 +2,110 @@
 Main Flask Application for Train Booking System
 """
 import os
+import time
 from flask import Flask, jsonify
 from flask_cors import CORS
 #from flask_jwt_extended import JWTManager
 from models import db
 from config import Config
+from replicas import init_replicas
+from query_profiler import init_query_profiler
+from slow_queries import init_slow_query_log
+from metrics import init_metrics
+from serializers import init_json, compile_serializers
+from compression import init_compression
+from assets import init_assets
+from migrations import latest_version, schema_version
 
-def create_app(config_class=Config):
-    """Application factory pattern"""
+
+def check_schema_version(app):
+    """Compare the database's schema version with the newest migration (one query)"""
+    with app.app_context():
+        with db.engine.connect() as connection:
+            current = schema_version(connection)
+    latest = latest_version()
+    
+    if current < latest:
+        message = f"Database schema is at version {current}, expected {latest}: run python migrate.py"
+        if app.config.get('SCHEMA_VERSION_CHECK') == 'strict':
+            raise RuntimeError(message)
+        print(f"WARNING: {message}")
+    else:
+        print(f"Database ready (schema version {current})")
+
+
+def start_background_tasks(app):
+    """Start this process's background threads (after any fork; idempotent)"""
+    if app.config.get('SWEEPER_ENABLED') and 'sweeper' not in app.extensions:
+        from sweeper import start_sweeper
+        app.extensions['sweeper'] = start_sweeper(app)
+    router = app.extensions.get('replica_router')
+    if router and 'replica_monitor' not in app.extensions:
+        app.extensions['replica_monitor'] = router.start()
+
+
+def warm_up(app):
+    """Do the lazy one-time work now, so a preloading master shares it with its workers"""
+    from sqlalchemy.orm import configure_mappers
+    from sqlalchemy.dialects import mysql, sqlite  # noqa: F401 (upserts in inventory.py)
+    import sweeper  # noqa: F401 (started per worker)
+    
+    configure_mappers()
+    compile_serializers(mapper.class_ for mapper in db.Model.registry.mappers)
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+
+def dispose_engines(app, close=True):
+    """Drop pooled connections of the primary and replica engines.
+
+    After a fork use close=False: the child forgets the parent's connections
+    without closing sockets the parent still owns.
+    """
+    with app.app_context():
+        engines = list(db.engines.values())
+    router = app.extensions.get('replica_router')
+    if router:
+        engines.extend(router.engines)
+    for engine in engines:
+        engine.dispose(close=close)
+
+
+def create_app(config_class=Config, start_background=True):
+    """Application factory pattern.
+
+    Under gunicorn use wsgi:app, which builds the app once per process and
+    leaves background threads to the post_worker_init hook.
+    """
+    timings = {}
+    started = phase_started = time.perf_counter()
+    
+    def phase(name):
+        nonlocal phase_started
+        now = time.perf_counter()
+        timings[name] = round((now - phase_started) * 1000, 2)
+        phase_started = now
+    
     app = Flask(__name__)
     app.config.from_object(config_class)
+    init_json(app)
+    phase('config')
     
     # Initialize extensions
     db.init_app(app)
+    init_replicas(app)
+    init_query_profiler(app)
+    init_slow_query_log(app)
+    init_metrics(app, db)
+    init_compression(app)
+    init_assets(app)
     CORS(app, 
      resources={r"/api/*": {"origins": "*"}},
-     allow_headers=["Content-Type", "Authorization"],
-     expose_headers=["Authorization"],
+     allow_headers=["Content-Type", "Authorization", "Idempotency-Key"],
+     expose_headers=["Authorization", "Idempotent-Replayed", "Server-Timing"],
      supports_credentials=True)
 #    jwt = JWTManager(app)
+    phase('extensions')
     
     # Register blueprints
     from routes.auth_routes import auth_bp
@@ -30,7 +115,10 @@ def create_app(config_class=Config):
     from routes.schedule_routes import schedule_bp
     from routes.ticket_routes import ticket_bp
     from routes.seat_routes import seat_bp
-#    from routes.payment_routes import payment_bp
+    from routes.ops_routes import ops_bp
+    from routes.batch_routes import batch_bp
+    from routes.job_routes import job_bp
+    from routes.payment_routes import payment_bp
     from routes.web_routes import web_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -40,7 +128,10 @@ def create_app(config_class=Config):
     app.register_blueprint(schedule_bp, url_prefix='/api/schedules')
     app.register_blueprint(ticket_bp, url_prefix='/api/tickets')
     app.register_blueprint(seat_bp, url_prefix='/api/seats')
-#    app.register_blueprint(payment_bp, url_prefix='/api/payments')
+    app.register_blueprint(ops_bp, url_prefix='/api/ops')
+    app.register_blueprint(batch_bp, url_prefix='/api/batch')
+    app.register_blueprint(job_bp, url_prefix='/api/jobs')
+    app.register_blueprint(payment_bp, url_prefix='/api/payments')
     app.register_blueprint(web_bp)  # Frontend routes
     
     # Error handlers
@@ -66,18 +157,17 @@ def create_app(config_class=Config):
 #    def expired_token_callback(jwt_header, jwt_payload):
 #        return jsonify({'error': 'Token has expired'}), 401
     
-    # Database initialization
-    with app.app_context():
-        from sqlalchemy import inspect
-        inspector = inspect(db.engine)
-        existing_tables = inspector.get_table_names()
+    phase('blueprints')
     
-        if not existing_tables:
-            db.create_all()
-            print("Database tables created successfully!")
-        else:
-            print(f"Database ready ({len(existing_tables)} tables exist)")
+    # Schema version check (migrations are applied by migrate.py, not here)
+    if app.config.get('SCHEMA_VERSION_CHECK') != 'off':
+        check_schema_version(app)
+    phase('schema_check')
 
+    # Background maintenance (expired seat holds, idempotency keys)
+    if start_background:
+        start_background_tasks(app)
+    phase('background')
     
     @app.route('/')
     def index():
@@ -92,18 +182,23 @@ def create_app(config_class=Config):
                 'schedules': '/api/schedules',
                 'tickets': '/api/tickets',
                 'seats': '/api/seats',
-#                'payments': '/api/payments',
+                'ops': '/api/ops',
+                'jobs': '/api/jobs',
+                'payments': '/api/payments',
                 'web': '/'
             }
         })
     
+    timings['total'] = round((time.perf_counter() - started) * 1000, 2)
+    app.extensions['startup_timings'] = timings
+    print(f"App ready in {timings['total']} ms (" +
+          ', '.join(f'{name} {ms} ms' for name, ms in timings.items() if name != 'total') + ')')
+    
     return app
 
 
-app = create_app()
-
 if __name__ == '__main__':
-#    app = create_app()
+    app = create_app()
     app.run(host='0.0.0.0', port=5000, debug=False)
 
 
@@ -0,0 +1,8 @@
+"""
+ASGI entry point (async deployment mode): uvicorn asgi:app --workers 2 --host 0.0.0.0 --port 5000
+
+Async read endpoints in front of the Flask app; see async_app.py.
+"""
+from async_app import create_asgi_app
+
+app = create_asgi_app()
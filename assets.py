@@ -0,0 +1,87 @@
+"""
+Static Assets - content fingerprints and long-lived caching for static/
+
+Templates link static files with asset_url('css/base.css'), which appends
+a fingerprint of the file's content (?v=<hash>). A request carrying the
+current fingerprint can never see different bytes, so it is served with
+Cache-Control: public, max-age=<a year>, immutable; any other static
+request gets Flask's default revalidation. Compressible fingerprinted
+files are compressed once per encoding and kept in memory.
+
+Fingerprints are computed at startup: deploy new static files with a
+restart (as with templates).
+"""
+import hashlib
+import os
+import threading
+from flask import request, url_for
+from compression import choose_encoding, compress_bytes
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt')
+
+
+class Assets:
+    """Fingerprints of the files under a static folder, and their compressed bodies"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.fingerprints = {}
+        self._compressed = {}
+        self._lock = threading.Lock()
+        if folder and os.path.isdir(folder):
+            for root, _, files in os.walk(folder):
+                for name in files:
+                    path = os.path.join(root, name)
+                    filename = os.path.relpath(path, folder).replace(os.sep, '/')
+                    with open(path, 'rb') as f:
+                        self.fingerprints[filename] = hashlib.sha256(f.read()).hexdigest()[:12]
+
+    def url(self, filename):
+        """URL of a static file, fingerprinted when the file exists"""
+        fingerprint = self.fingerprints.get(filename)
+        if fingerprint is None:
+            return url_for('static', filename=filename)
+        return url_for('static', filename=filename, v=fingerprint)
+
+    def compressed(self, filename, encoding):
+        """Compressed content of a static file (computed once per encoding)"""
+        key = (filename, encoding)
+        body = self._compressed.get(key)
+        if body is None:
+            with open(os.path.join(self.folder, filename), 'rb') as f:
+                body = compress_bytes(f.read(), encoding)
+            with self._lock:
+                self._compressed[key] = body
+        return body
+
+
+def init_assets(app):
+    """Fingerprint static files, expose asset_url() to templates, cache static responses"""
+    assets = Assets(app.static_folder)
+    app.extensions['assets'] = assets
+    app.jinja_env.globals['asset_url'] = assets.url
+
+    @app.after_request
+    def cache_static_assets(response):
+        if request.endpoint != 'static' or response.status_code != 200:
+            return response
+        filename = request.view_args['filename']
+        fingerprint = assets.fingerprints.get(filename)
+        if fingerprint is None or request.args.get('v') != fingerprint:
+            return response
+
+        response.headers['Cache-Control'] = IMMUTABLE
+        if filename.endswith(COMPRESSIBLE_EXTENSIONS):
+            response.vary.add('Accept-Encoding')
+            encoding = choose_encoding(request)
+            if encoding:
+                body = assets.compressed(filename, encoding)
+                response.close()  # the open static file
+                response.direct_passthrough = False
+                response.set_data(body)
+                response.set_etag(f'{fingerprint}-{encoding}')
+                response.headers['Content-Encoding'] = encoding
+        return response
+
+    return assets
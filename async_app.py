@@ -0,0 +1,79 @@
+"""
+Async Application - Starlette front end for the async deployment mode
+
+The busiest public read endpoints (routes/async_routes.py) run natively on
+async SQLAlchemy with aiomysql (aiosqlite for SQLite), so a slow query
+holds a pool connection but no thread. Every other request, including
+booking, cancellation, holds, admin and the web pages, is passed to the
+Flask app on a pool of ASGI_WSGI_THREADS threads: those paths keep a single
+implementation of their locking, idempotency and hold semantics.
+
+Serve it with asgi.py. Each process owns its own event loop and engines,
+so run one app per process (uvicorn --workers); the sweeper runs in every
+process as under gunicorn.
+"""
+from contextlib import asynccontextmanager
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.routing import Mount
+from uvicorn.middleware.wsgi import WSGIMiddleware
+from app import create_app
+from config import Config
+from routes.async_routes import async_routes
+
+ASYNC_DRIVERS = {'mysql': 'mysql+aiomysql', 'sqlite': 'sqlite+aiosqlite'}
+
+
+def async_database_uri(uri):
+    """The same database through its async driver"""
+    url = make_url(uri)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+def create_async_db_engine(config):
+    """Async engine for the primary database, sized by ASYNC_DB_POOL_*"""
+    url = make_url(config.get('ASYNC_DATABASE_URI') or async_database_uri(config['SQLALCHEMY_DATABASE_URI']))
+    options = {}
+    if url.get_backend_name() != 'sqlite':
+        options = {
+            'pool_size': config['ASYNC_DB_POOL_SIZE'],
+            'max_overflow': config['ASYNC_DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+            'pool_recycle': config['DB_POOL_RECYCLE'],
+            'pool_pre_ping': config['DB_POOL_PRE_PING']
+        }
+    return create_async_engine(url, **options)
+
+
+def create_asgi_app(config_class=Config, flask_app=None):
+    """Starlette app serving the async routes in front of the Flask app"""
+    if flask_app is None:
+        flask_app = create_app(config_class)
+    engine = create_async_db_engine(flask_app.config)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await engine.dispose()
+
+    # Same CORS policy as Flask-CORS in create_app; passed-through requests get Flask's
+    cors = [Middleware(
+        CORSMiddleware,
+        allow_origins=['*'],
+        allow_methods=['GET'],
+        allow_headers=['Content-Type', 'Authorization', 'Idempotency-Key'],
+        expose_headers=['Authorization', 'Idempotent-Replayed', 'Server-Timing'],
+        allow_credentials=True
+    )]
+    wsgi = WSGIMiddleware(flask_app, workers=flask_app.config['ASGI_WSGI_THREADS'])
+
+    app = Starlette(routes=[*async_routes(cors), Mount('/', app=wsgi)], lifespan=lifespan)
+    app.state.flask_app = flask_app
+    app.state.engine = engine
+    app.state.sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    app.state.wsgi = wsgi
+    app.state.metrics = flask_app.config.get('METRICS_ENABLED', True)
+    return app
@@ -0,0 +1,184 @@
+"""
+Benchmark: gthread (wsgi:app) vs async (asgi:app) under concurrent reads
+
+Serves a seeded SQLite database with both deployments, two worker
+processes each (gunicorn gthread with 2 threads as in production, uvicorn
+--workers 2), and drives the public read endpoints with increasing numbers
+of concurrent clients. To stand in for slow MySQL calls every statement
+is delayed by --db-latency-ms on the thread that executes it: a request
+thread under gthread, aiosqlite's connection thread under asyncio.
+
+Reports throughput, p50 and p99 latency and errors per concurrency level.
+The load generator runs on the same host, so give it spare cores or the
+numbers measure CPU contention rather than the serving model.
+
+Usage: python benchmarks/bench_asgi.py [--db-latency-ms 20] [--seconds 5] [--concurrency 4 16 64]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, time as clock, timedelta
+
+import httpx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+ENTRY = '''
+import os, time
+import config
+config.Config.SQLALCHEMY_DATABASE_URI = {uri!r}
+config.Config.DB_REPLICA_URIS = []
+config.Config.SWEEPER_ENABLED = False
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY = float(os.environ.get('BENCH_DB_LATENCY_MS', '0')) / 1000
+
+
+def slow_statement(statement):
+    time.sleep(LATENCY)
+
+
+@event.listens_for(Engine, 'connect')
+def add_latency(dbapi_connection, record):
+    if hasattr(dbapi_connection, 'run_async'):
+        dbapi_connection.run_async(lambda conn: conn.set_trace_callback(slow_statement))
+    else:
+        dbapi_connection.set_trace_callback(slow_statement)
+
+
+from {module} import app  # noqa: E402,F401
+'''
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def seed(uri):
+    """Migrated database with 20 schedules and a seat map for next week"""
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from migrations import upgrade
+    from models import Train, Route, Schedule, Seat
+
+    engine = create_engine(uri)
+    upgrade(engine, log=lambda message: None)
+    journey_date = date.today() + timedelta(days=7)
+    with Session(engine) as session:
+        for i in range(20):
+            train = Train(train_number=f'B{i:03d}', train_name=f'Bench {i}', train_type='express', total_seats=60)
+            route = Route(route_name=f'Route {i}', source_station=f'City {i % 4}',
+                          destination_station=f'Town {i % 5}', distance_km=300, duration_hours=4)
+            session.add_all([train, route])
+            session.flush()
+            session.add(Schedule(train_id=train.id, route_id=route.id, departure_time=clock(8, 0),
+                                 arrival_time=clock(12, 0), frequency='daily', base_fare=100))
+        session.flush()
+        session.add_all(Seat(schedule_id=1, journey_date=journey_date, seat_number=f'S{n}',
+                             seat_type='general', is_available=n % 4 != 0) for n in range(60))
+        session.commit()
+    engine.dispose()
+    return [
+        '/api/trains/',
+        '/api/schedules/',
+        '/api/schedules/search?source=City 1&destination=Town',
+        f'/api/seats/?schedule_id=1&journey_date={journey_date.isoformat()}',
+    ]
+
+
+def start(kind, directory, port, latency_ms):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([directory, ROOT]), BENCH_DB_LATENCY_MS=str(latency_ms))
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    if kind == 'gthread':
+        command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'),
+                   '-b', f'127.0.0.1:{port}', '--workers', '2', '--threads', '2',
+                   '--worker-class', 'gthread', '--timeout', '120', 'bench_wsgi:app']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'bench_asgi:app', '--host', '127.0.0.1',
+                   '--port', str(port), '--workers', '2', '--log-level', 'warning', '--no-access-log']
+    process = subprocess.Popen(command, cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f'http://127.0.0.1:{port}/api/trains/', timeout=5)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.3)
+    process.terminate()
+    raise RuntimeError(f'{kind} server did not start')
+
+
+async def load(port, urls, concurrency, seconds):
+    latencies, errors = [], 0
+    deadline = time.monotonic() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', limits=limits, timeout=30) as client:
+        async def user(offset):
+            nonlocal errors
+            i = offset
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(urls[i % len(urls)])
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+                i += 1
+
+        await asyncio.gather(*(user(n) for n in range(concurrency)))
+
+    latencies.sort()
+    return {
+        'rps': len(latencies) / seconds,
+        'p50': statistics.median(latencies) * 1000,
+        'p99': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'errors': errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db-latency-ms', type=float, default=20)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[4, 16, 64])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        uri = f'sqlite:///{directory}/bench.db'
+        urls = seed(uri)
+        for module in ('wsgi', 'asgi'):
+            with open(os.path.join(directory, f'bench_{module}.py'), 'w') as f:
+                f.write(ENTRY.format(uri=uri, module=module))
+
+        print(f'{args.db_latency_ms:g} ms per statement, {args.seconds:g} s per level, 2 workers each')
+        print(f'{"mode":8} {"clients":>7} {"req/s":>8} {"p50 ms":>8} {"p99 ms":>8} {"errors":>6}')
+        for kind in ('gthread', 'asyncio'):
+            port = free_port()
+            server = start(kind, directory, port, args.db_latency_ms)
+            try:
+                asyncio.run(load(port, urls, 4, 1))  # warm both workers' pools and caches
+                for concurrency in args.concurrency:
+                    result = asyncio.run(load(port, urls, concurrency, args.seconds))
+                    print(f'{kind:8} {concurrency:7d} {result["rps"]:8.1f} {result["p50"]:8.1f} '
+                          f'{result["p99"]:8.1f} {result["errors"]:6d}')
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: admin page load as separate API calls vs one /api/batch call
+
+For the admin dashboard's and the schedules page's API calls (signed in as
+an admin, with --schedules schedules), via the Flask test client:
+
+  * separate - the auth check, then the page's list calls in parallel
+               (two round trips, one request and one session each)
+  * batch    - one POST /api/batch carrying all of them (one round trip)
+
+Load time = server time + --rtt-ms per round trip. Queries are counted per
+page load.
+
+Usage: python benchmarks/bench_batch.py [--schedules 200] [--rtt-ms 150] [--requests 50]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import time as clock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app  # noqa: E402
+from config import TestingConfig  # noqa: E402
+from models import db, User, Train, Route, Schedule  # noqa: E402
+from query_profiler import capture_queries  # noqa: E402
+
+PAGES = {
+    '/admin': ['/api/users/', '/api/trains/', '/api/routes/', '/api/tickets/'],
+    '/admin/schedules': ['/api/trains/', '/api/routes/', '/api/schedules/'],
+}
+
+
+def seed(schedules):
+    admin = User(username='admin', email='admin@example.com', full_name='Admin', role='admin')
+    admin.set_password('adminpass')
+    db.session.add(admin)
+    trains = [Train(train_number=f'B{i:03d}', train_name=f'Bench {i}', train_type='express', total_seats=100)
+              for i in range(20)]
+    routes = [Route(route_name=f'Route {i}', source_station=f'City {i}', destination_station=f'City {i + 1}',
+                    distance_km=100, duration_hours=2) for i in range(20)]
+    db.session.add_all(trains + routes)
+    db.session.flush()
+    db.session.add_all(
+        Schedule(train_id=trains[i % 20].id, route_id=routes[i % 20].id, departure_time=clock(i % 24, 0),
+                 arrival_time=clock((i + 2) % 24, 0), frequency='daily', base_fare=100)
+        for i in range(schedules)
+    )
+    db.session.commit()
+
+
+def timed(load, requests):
+    """(mean ms, queries) of load()"""
+    with capture_queries() as profile:
+        load()
+    started = time.perf_counter()
+    for _ in range(requests):
+        load()
+    return (time.perf_counter() - started) / requests * 1000, profile.count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--schedules', type=int, default=200)
+    parser.add_argument('--rtt-ms', type=float, default=150)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    class BenchConfig(TestingConfig):
+        COMPRESS_ENABLED = False
+
+    app = create_app(BenchConfig, start_background=False)
+    with app.app_context():
+        db.create_all()
+        seed(args.schedules)
+    client = app.test_client()
+    client.post('/api/auth/login', json={'username': 'admin', 'password': 'adminpass'})
+
+    print(f'{args.schedules} schedules, {args.rtt_ms:g} ms round trip, mean of {args.requests} loads')
+    print(f'{"page":18} {"separate ms":>11} {"queries":>7} {"batch ms":>9} {"queries":>7}')
+    for page, paths in PAGES.items():
+        def separate():
+            for path in ['/api/auth/check'] + paths:
+                client.get(path).close()
+
+        def batched():
+            client.post('/api/batch', json={'requests': [{'path': path}
+                                                         for path in ['/api/auth/check'] + paths]}).close()
+
+        separate_ms, separate_queries = timed(separate, args.requests)
+        batch_ms, batch_queries = timed(batched, args.requests)
+        print(f'{page:18} {separate_ms + 2 * args.rtt_ms:11.1f} {separate_queries:7d} '
+              f'{batch_ms + args.rtt_ms:9.1f} {batch_queries:7d}')
+
+
+if __name__ == '__main__':
+    main()
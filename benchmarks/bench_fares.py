@@ -0,0 +1,88 @@
+"""
+Benchmark: pricing schedule-days one at a time vs one vectorized pass
+
+Prices every seat type for a block of schedules x journey dates (10,000
+schedule-days by default) two ways:
+
+  * loop   - a per-row Python implementation of the same formula
+  * numpy  - fares.compute_fares over a (schedules, dates, types) array
+
+Usage: python benchmarks/bench_fares.py [--schedules 200] [--days 50]
+"""
+import argparse
+import bisect
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fares import (  # noqa: E402
+    compute_fares, SEAT_TYPES, SEAT_TYPE_MULTIPLIERS,
+    ADVANCE_DAYS, ADVANCE_FACTORS, LOAD_POINTS, LOAD_FACTORS
+)
+
+
+def interp(x, xs, ys):
+    """Scalar linear interpolation, clamped at the ends like np.interp"""
+    if x <= xs[0]:
+        return ys[0]
+    if x >= xs[-1]:
+        return ys[-1]
+    i = bisect.bisect_right(xs, x)
+    x0, x1, y0, y1 = xs[i - 1], xs[i], ys[i - 1], ys[i]
+    return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+
+
+def run_loop(base_fares, days_out, load):
+    advance_days, advance_factors = ADVANCE_DAYS.tolist(), ADVANCE_FACTORS.tolist()
+    load_points, load_factors = LOAD_POINTS.tolist(), LOAD_FACTORS.tolist()
+    multipliers = SEAT_TYPE_MULTIPLIERS.tolist()
+    table = {}
+    for i, base_fare in enumerate(base_fares):
+        for j, days in enumerate(days_out):
+            advance = interp(max(days, 0), advance_days, advance_factors)
+            table[(i, j)] = {
+                seat_type: round(base_fare * advance * multipliers[k]
+                                 * interp(load[i][j][k], load_points, load_factors), 2)
+                for k, seat_type in enumerate(SEAT_TYPES)
+            }
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--schedules', type=int, default=200)
+    parser.add_argument('--days', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    base_fares = rng.uniform(50, 500, args.schedules).round(2)
+    days_out = np.arange(args.days)
+    load = rng.uniform(0, 1, (args.schedules, args.days, len(SEAT_TYPES)))
+
+    base_list, days_list, load_list = base_fares.tolist(), days_out.tolist(), load.tolist()
+    started = time.perf_counter()
+    table = run_loop(base_list, days_list, load_list)
+    loop_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fares = compute_fares(base_fares, days_out, load)
+    numpy_time = time.perf_counter() - started
+
+    # Same formula, so results agree to the cent (allowing for rounding ties)
+    expected = np.array([[[table[(i, j)][t] for t in SEAT_TYPES]
+                          for j in range(args.days)] for i in range(args.schedules)])
+    assert np.allclose(fares, expected, atol=0.011)
+
+    schedule_days = args.schedules * args.days
+    print(f'{schedule_days:,} schedule-days x {len(SEAT_TYPES)} seat types = {fares.size:,} fares')
+    print(f'  loop  : {loop_time * 1000:9.1f} ms  {schedule_days / loop_time:12,.0f} schedule-days/s')
+    print(f'  numpy : {numpy_time * 1000:9.1f} ms  {schedule_days / numpy_time:12,.0f} schedule-days/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: time to data for pages that render-then-fetch vs embed their data
+
+For the booking, tickets and dashboard pages (signed in, N tickets), via
+the Flask test client:
+
+  * fetch - EMBED_INITIAL_DATA off: the page, then its API calls in the
+            order the page's script makes them
+  * embed - EMBED_INITIAL_DATA on: the page alone
+
+Time to data = server time of every request + one network round trip per
+request (--rtt-ms, 150 ms by default for a mobile connection). Compression
+and the anonymous page cache are off so only embedding is compared.
+
+Usage: python benchmarks/bench_first_paint.py [--tickets 20] [--rtt-ms 150] [--requests 100]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, time as clock, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app  # noqa: E402
+from config import TestingConfig  # noqa: E402
+from models import db, User, Train, Route, Schedule, Ticket  # noqa: E402
+
+# Page, then the API calls its script makes before it can paint (in sequence)
+PAGES = {
+    '/book/1': ['/api/schedules/1'],
+    '/tickets': ['/api/tickets/'],
+    '/dashboard': ['/api/auth/me', '/api/tickets/'],
+}
+
+
+def seed(tickets):
+    user = User(username='bench', email='bench@example.com', full_name='Bench User', role='user')
+    user.set_password('benchpass')
+    train = Train(train_number='B001', train_name='Bench Express', train_type='express', total_seats=100)
+    route = Route(route_name='A to B', source_station='City A', destination_station='City B',
+                  distance_km=300, duration_hours=4)
+    db.session.add_all([user, train, route])
+    db.session.flush()
+    db.session.add(Schedule(train_id=train.id, route_id=route.id, departure_time=clock(8, 0),
+                            arrival_time=clock(12, 0), frequency='daily', base_fare=100))
+    db.session.flush()
+    journey_date = date.today() + timedelta(days=7)
+    db.session.add_all(
+        Ticket(user_id=user.id, schedule_id=1, booking_date=date.today(), journey_date=journey_date,
+               passenger_name=f'Passenger {i}', passenger_age=30, passenger_gender='other',
+               seat_number=f'S{i}', fare=100, status='confirmed', pnr_number=f'PNR{i:06d}')
+        for i in range(tickets)
+    )
+    db.session.commit()
+
+
+def server_ms(client, url, requests):
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(url)
+        assert response.status_code == 200, url
+    return (time.perf_counter() - started) / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tickets', type=int, default=20)
+    parser.add_argument('--rtt-ms', type=float, default=150)
+    parser.add_argument('--requests', type=int, default=100)
+    args = parser.parse_args()
+
+    class BenchConfig(TestingConfig):
+        COMPRESS_ENABLED = False
+        PAGE_CACHE_SECONDS = 0
+
+    app = create_app(BenchConfig, start_background=False)
+    with app.app_context():
+        db.create_all()
+        seed(args.tickets)
+        client = app.test_client()
+        client.post('/api/auth/login', json={'username': 'bench', 'password': 'benchpass'})
+
+        print(f'{args.tickets} tickets, {args.rtt_ms:g} ms round trip, mean of {args.requests} requests')
+        print(f'{"page":12} {"fetch ms":>9} {"embed ms":>9} {"saved":>7}')
+        for page, calls in PAGES.items():
+            app.config['EMBED_INITIAL_DATA'] = False
+            fetch = server_ms(client, page, args.requests) + args.rtt_ms
+            for url in calls:
+                fetch += server_ms(client, url, args.requests) + args.rtt_ms
+            app.config['EMBED_INITIAL_DATA'] = True
+            embed = server_ms(client, page, args.requests) + args.rtt_ms
+            print(f'{page:12} {fetch:9.1f} {embed:9.1f} {fetch - embed:7.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: per-request overhead of the metrics hooks
+
+Serves the same small catalog endpoint (one SELECT over a handful of trains)
+from two otherwise identical apps, with and without init_metrics, through
+the Flask test client, and reports the extra time per request.
+
+Set PROMETHEUS_MULTIPROC_DIR to an empty directory to measure the
+multiprocess (mmap file) store used under gunicorn.
+
+Usage: python benchmarks/bench_metrics.py [--requests 5000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, jsonify  # noqa: E402
+from metrics import init_metrics  # noqa: E402
+from models import db, Train  # noqa: E402
+
+
+def make_app(with_metrics):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(app)
+    if with_metrics:
+        init_metrics(app, db)
+
+    @app.route('/api/trains/')
+    def get_all_trains():
+        return jsonify({'trains': [train.to_dict() for train in Train.query.all()]})
+
+    with app.app_context():
+        db.create_all()
+        for i in range(5):
+            db.session.add(Train(train_number=f'T{i}', train_name=f'Train {i}',
+                                 train_type='express', total_seats=100))
+        db.session.commit()
+    return app
+
+
+def run(app, requests):
+    client = app.test_client()
+    for _ in range(200):
+        client.get('/api/trains/')
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get('/api/trains/')
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    plain, instrumented = make_app(False), make_app(True)
+    # Interleave runs and keep the best of each so drift and noise cancel out
+    plain_time = instrumented_time = float('inf')
+    for _ in range(5):
+        plain_time = min(plain_time, run(plain, args.requests))
+        instrumented_time = min(instrumented_time, run(instrumented, args.requests))
+
+    total = args.requests
+    plain_us = plain_time / total * 1e6
+    instrumented_us = instrumented_time / total * 1e6
+    store = 'multiprocess' if 'PROMETHEUS_MULTIPROC_DIR' in os.environ else 'in-process'
+    print(f'{total:,} requests per run, best of 5 runs, {store} store')
+    print(f'  without metrics : {plain_us:8.1f} us/request')
+    print(f'  with metrics    : {instrumented_us:8.1f} us/request')
+    print(f'  overhead        : {instrumented_us - plain_us:8.1f} us/request '
+          f'({(instrumented_us / plain_us - 1) * 100:.1f}%)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark: outbox dispatch throughput and the latency it adds to booking
+
+  * booking - mean and p95 server time of POST /api/tickets/ with
+              OUTBOX_ENABLED off and on (the event is one more INSERT in
+              the booking transaction)
+  * dispatch - events/s delivered to a local stand-in webhook (keep-alive
+               HTTP/1.1, answers 200) for several OUTBOX_BATCH_SIZE values
+
+Usage: python benchmarks/bench_outbox.py [--bookings 300] [--events 5000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from datetime import date, time as clock, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app  # noqa: E402
+from config import TestingConfig  # noqa: E402
+from models import db, User, Train, Route, Schedule, Seat, OutboxEvent  # noqa: E402
+from outbox import WebhookClient, dispatch_pending  # noqa: E402
+
+
+class Webhook(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def seed(seats):
+    user = User(username='bench', email='bench@example.com', full_name='Bench User', role='user')
+    user.set_password('benchpass')
+    train = Train(train_number='B001', train_name='Bench Express', train_type='express', total_seats=seats)
+    route = Route(route_name='A to B', source_station='City A', destination_station='City B',
+                  distance_km=300, duration_hours=4)
+    db.session.add_all([user, train, route])
+    db.session.flush()
+    schedule = Schedule(train_id=train.id, route_id=route.id, departure_time=clock(8, 0),
+                        arrival_time=clock(12, 0), frequency='daily', base_fare=100)
+    db.session.add(schedule)
+    db.session.flush()
+    journey_date = date.today() + timedelta(days=7)
+    db.session.add_all(Seat(schedule_id=schedule.id, journey_date=journey_date, seat_number=f'S{i}',
+                            seat_type='general', is_available=True) for i in range(seats))
+    db.session.commit()
+    return journey_date
+
+
+def booking_ms(client, journey_date, bookings):
+    times = []
+    for i in range(bookings):
+        started = time.perf_counter()
+        response = client.post('/api/tickets/', json={
+            'schedule_id': 1, 'journey_date': journey_date.isoformat(), 'passenger_name': f'P{i}',
+            'passenger_age': 30, 'passenger_gender': 'other'
+        })
+        times.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 201, response.get_data(as_text=True)
+    return statistics.mean(times), statistics.quantiles(times, n=20)[18]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--bookings', type=int, default=300)
+    parser.add_argument('--events', type=int, default=5000)
+    args = parser.parse_args()
+
+    class BenchConfig(TestingConfig):
+        COMPRESS_ENABLED = False
+
+    app = create_app(BenchConfig, start_background=False)
+    with app.app_context():
+        db.create_all()
+        journey_date = seed(args.bookings * 2 + 10)
+    client = app.test_client()
+    client.post('/api/auth/login', json={'username': 'bench', 'password': 'benchpass'})
+    booking_ms(client, journey_date, 5)  # warm up
+
+    print(f'booking, {args.bookings} requests')
+    print(f'{"outbox":8} {"mean ms":>8} {"p95 ms":>8}')
+    for enabled in (False, True):
+        app.config['OUTBOX_ENABLED'] = enabled
+        mean, p95 = booking_ms(client, journey_date, args.bookings)
+        print(f'{"on" if enabled else "off":8} {mean:8.3f} {p95:8.3f}')
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Webhook)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    webhook = WebhookClient()
+
+    print(f'\ndispatch, {args.events} events')
+    print(f'{"batch":>6} {"events/s":>10}')
+    for batch_size in (1, 10, 100, 500):
+        app.config['OUTBOX_BATCH_SIZE'] = batch_size
+        # A new webhook URL per round, so its cursor starts after the earlier rounds' events
+        app.config['OUTBOX_WEBHOOK_URLS'] = [f'http://127.0.0.1:{server.server_address[1]}/webhook/{batch_size}']
+        dispatch_pending(app, webhook)
+        with app.app_context():
+            db.session.execute(OutboxEvent.__table__.insert(), [
+                {'event_type': 'ticket.booked', 'data': {'ticket': {'id': i, 'pnr_number': f'PNR{i:07d}'}}}
+                for i in range(args.events)
+            ])
+            db.session.commit()
+        started = time.perf_counter()
+        delivered = 0
+        while delivered < args.events:
+            delivered += dispatch_pending(app, webhook)
+        print(f'{batch_size:6d} {delivered / (time.perf_counter() - started):10.0f}')
+    webhook.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: bytes and latency per page, before and after asset extraction,
+compression and the anonymous page cache
+
+For every frontend page, through the Flask test client:
+
+  * before - base.html's CSS and JS inline, rendered on every request,
+             no compression (rebuilt by inlining static/ into the page)
+  * first  - compressed HTML plus the compressed CSS and JS files
+  * repeat - compressed HTML only (the browser keeps the immutable assets)
+
+Latency is the mean server time per request over --requests renders.
+
+Usage: python benchmarks/bench_pages.py [--requests 200] [--encoding br]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app  # noqa: E402
+from config import TestingConfig  # noqa: E402
+
+PAGES = ['/', '/login', '/register', '/search', '/trains', '/tickets', '/dashboard', '/book/1',
+         '/admin', '/admin/trains', '/admin/routes', '/admin/schedules', '/admin/users', '/admin/tickets']
+
+
+class BeforeConfig(TestingConfig):
+    COMPRESS_ENABLED = False
+    PAGE_CACHE_SECONDS = 0
+
+
+class AfterConfig(TestingConfig):
+    COMPRESS_ENABLED = True
+    PAGE_CACHE_SECONDS = 300
+
+
+def inline_assets(app, html):
+    """The page as it was with base.html's assets inline"""
+    def read(path):
+        with open(os.path.join(app.static_folder, path)) as f:
+            return f.read()
+    html = re.sub(r'<link rel="stylesheet" href="/static/([^"?]+)\?v=\w+">',
+                  lambda m: f'<style>\n{read(m.group(1))}</style>', html)
+    return re.sub(r'<script src="/static/([^"?]+)\?v=\w+"></script>',
+                  lambda m: f'<script>\n{read(m.group(1))}</script>', html)
+
+
+def mean_ms(client, path, requests, headers=None):
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get(path, headers=headers).close()
+    return (time.perf_counter() - started) / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--encoding', default='br', choices=['br', 'gzip'])
+    args = parser.parse_args()
+    headers = {'Accept-Encoding': args.encoding}
+
+    before_app = create_app(BeforeConfig, start_background=False)
+    after_app = create_app(AfterConfig, start_background=False)
+    before, after = before_app.test_client(), after_app.test_client()
+
+    html = after.get('/').get_data(as_text=True)
+    asset_bytes = 0
+    for url in re.findall(r'(?:href|src)="(/static/[^"]+)"', html):
+        response = after.get(url, headers=headers)
+        asset_bytes += len(response.get_data())
+        response.close()
+
+    print(f'{args.encoding}, {args.requests} requests per page; assets {asset_bytes} bytes compressed, '
+          f'fetched once per browser')
+    print(f'{"page":18} {"before B":>9} {"first B":>8} {"repeat B":>8} {"before ms":>9} {"after ms":>8}')
+    totals = [0, 0, 0]
+    for path in PAGES:
+        old = len(inline_assets(before_app, before.get(path).get_data(as_text=True)).encode())
+        new = len(after.get(path, headers=headers).get_data())
+        before_ms = mean_ms(before, path, args.requests)
+        after_ms = mean_ms(after, path, args.requests, headers)
+        totals[0] += old
+        totals[1] += new + asset_bytes
+        totals[2] += new
+        print(f'{path:18} {old:9d} {new + asset_bytes:8d} {new:8d} {before_ms:9.3f} {after_ms:8.3f}')
+    print(f'{"all pages":18} {totals[0]:9d} {totals[1]:8d} {totals[2]:8d}')
+
+
+if __name__ == '__main__':
+    main()
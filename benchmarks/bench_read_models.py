@@ -0,0 +1,101 @@
+"""
+Benchmark: ORM list query + to_dict vs column-projected read model rows
+
+Loads N tickets (100,000 by default) from a SQLite file and turns them
+into response dicts two ways:
+
+  * orm   - Ticket.query.all() and ticket.to_dict(), as the list endpoints did
+  * rows  - read_models.TICKETS: a Core select of the serialized columns
+
+Reports wall time, rows/s and peak Python memory (tracemalloc) per 100k
+rows for each path; the memory peak includes the result dicts.
+
+Usage: python benchmarks/bench_read_models.py [--rows 100000] [--repeat 3]
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import insert  # noqa: E402
+from app import create_app  # noqa: E402
+from config import TestingConfig  # noqa: E402
+from models import db, Ticket  # noqa: E402
+from read_models import TICKETS  # noqa: E402
+
+
+def seed(n):
+    now = datetime(2024, 5, 1, 12, 0, 0)
+    rows = [
+        dict(user_id=i % 500 + 1, schedule_id=i % 40 + 1, booking_date=date(2024, 5, 1),
+             journey_date=date(2024, 6, 1 + i % 28), passenger_name=f'Passenger {i}',
+             passenger_age=20 + i % 50, passenger_gender='other', seat_number=f'S{i % 80}',
+             fare=Decimal('412.50'), status='confirmed', pnr_number=f'PNR{i:09d}',
+             segment_mask=0, created_at=now, updated_at=now)
+        for i in range(n)
+    ]
+    db.session.execute(insert(Ticket), rows)
+    db.session.commit()
+
+
+def orm_path():
+    return [ticket.to_dict() for ticket in Ticket.query.all()]
+
+
+def rows_path():
+    return TICKETS.all(TICKETS.select())
+
+
+def measure(f, repeat):
+    """(best seconds, peak MiB) with a fresh session each run"""
+    timings = []
+    for _ in range(repeat):
+        db.session.remove()
+        gc.collect()
+        started = time.perf_counter()
+        result = f()
+        timings.append(time.perf_counter() - started)
+        del result
+    db.session.remove()
+    gc.collect()
+    tracemalloc.start()
+    result = f()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return min(timings), peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        class BenchConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{directory}/read_models.db'
+
+        app = create_app(BenchConfig, start_background=False)
+        with app.app_context():
+            db.create_all()
+            seed(args.rows)
+            assert orm_path()[:100] == rows_path()[:100]
+
+            print(f'{args.rows} tickets, best of {args.repeat}')
+            per_100k = 100000 / args.rows
+            for name, f in (('orm', orm_path), ('rows', rows_path)):
+                seconds, peak = measure(f, args.repeat)
+                print(f'{name:5} {seconds * 1000:8.0f} ms  {args.rows / seconds:9.0f} rows/s  '
+                      f'peak {peak * per_100k:7.1f} MiB per 100k rows')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: mixed-segment booking with per-seat masks vs per-segment bitsets
+
+Simulates one schedule/date with thousands of seats and dozens of stops and
+books a stream of random A->C trips (plus some cancellations) two ways:
+
+  * scan   - walk the per-seat masks as stored in seats.segment_mask
+  * bitmap - SegmentBitmap, one seat bitset per segment
+
+Usage: python benchmarks/bench_segments.py [--seats 2000] [--stops 40] [--ops 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from segments import SegmentBitmap, segment_mask  # noqa: E402
+
+
+def make_workload(stops, ops, seed):
+    """Random trips; short hops are more common than end-to-end trips"""
+    rng = random.Random(seed)
+    segments = stops - 1
+    workload = []
+    for _ in range(ops):
+        start = rng.randrange(segments)
+        length = min(segments - start, int(rng.expovariate(1 / 6)) + 1)
+        workload.append((start, start + length, rng.random() < 0.1))
+    return workload
+
+
+def run_scan(seat_count, workload):
+    masks = [0] * seat_count
+    sold = []
+    booked = 0
+    for start, end, cancel in workload:
+        if cancel and sold:
+            seat, trip = sold.pop()
+            masks[seat] &= ~trip
+            continue
+        trip = segment_mask(start, end)
+        for seat, mask in enumerate(masks):
+            if not mask & trip:
+                masks[seat] = mask | trip
+                sold.append((seat, trip))
+                booked += 1
+                break
+    return booked, masks
+
+
+def run_bitmap(seat_count, segments, workload):
+    bitmap = SegmentBitmap(seat_count, segments)
+    sold = []
+    booked = 0
+    for start, end, cancel in workload:
+        if cancel and sold:
+            bitmap.release(*sold.pop())
+            continue
+        seat = bitmap.first_free(start, end)
+        if seat is not None:
+            bitmap.book(seat, start, end)
+            sold.append((seat, start, end))
+            booked += 1
+    return booked, bitmap
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seats', type=int, default=2000)
+    parser.add_argument('--stops', type=int, default=40)
+    parser.add_argument('--ops', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    segments = args.stops - 1
+    workload = make_workload(args.stops, args.ops, args.seed)
+
+    started = time.perf_counter()
+    scan_booked, masks = run_scan(args.seats, workload)
+    scan_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    bitmap_booked, bitmap = run_bitmap(args.seats, segments, workload)
+    bitmap_time = time.perf_counter() - started
+
+    # Both strategies take the lowest free seat, so they must agree exactly
+    assert scan_booked == bitmap_booked
+    assert [bitmap.seat_mask(i) for i in range(args.seats)] == masks
+
+    started = time.perf_counter()
+    SegmentBitmap.from_masks(masks, segments)
+    load_time = time.perf_counter() - started
+
+    bitmap_bytes = sum(sys.getsizeof(bits) for bits in bitmap.segments)
+    print(f'{args.seats} seats x {segments} segments, {args.ops} operations, {scan_booked} tickets sold')
+    print(f'  scan   : {scan_time * 1000:9.1f} ms  {args.ops / scan_time:12,.0f} ops/s')
+    print(f'  bitmap : {bitmap_time * 1000:9.1f} ms  {args.ops / bitmap_time:12,.0f} ops/s')
+    print(f'  load bitmap from stored masks: {load_time * 1000:.1f} ms')
+    print(f'  storage: {args.seats * 8:,} bytes as BIGINT masks, '
+          f'{bitmap_bytes:,} bytes in memory as segment bitsets')
+
+
+if __name__ == '__main__':
+    main()
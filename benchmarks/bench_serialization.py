@@ -0,0 +1,130 @@
+"""
+Benchmark: hand-written to_dict + stdlib jsonify vs generated serializers + orjson
+
+Serializes N tickets and N schedules (10,000 each by default, schedules
+with their train and route loaded) into a JSON response body:
+
+  * before - the previous hand-written to_dict methods and Flask's default
+             provider (stdlib json, sorted keys), compact and pretty-printed
+  * after  - the generated column serializers and OrjsonProvider, compact
+
+Usage: python benchmarks/bench_serialization.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, time as clock
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from app import create_app  # noqa: E402
+from config import TestingConfig  # noqa: E402
+from models import Ticket, Schedule, Train, Route  # noqa: E402
+
+
+def ticket_to_dict(self):
+    return {
+        'id': self.id,
+        'user_id': self.user_id,
+        'schedule_id': self.schedule_id,
+        'booking_date': self.booking_date.isoformat() if self.booking_date else None,
+        'journey_date': self.journey_date.isoformat() if self.journey_date else None,
+        'passenger_name': self.passenger_name,
+        'passenger_age': self.passenger_age,
+        'passenger_gender': self.passenger_gender,
+        'seat_number': self.seat_number,
+        'from_stop': self.from_stop,
+        'to_stop': self.to_stop,
+        'fare': float(self.fare) if self.fare else 0,
+        'status': self.status,
+        'pnr_number': self.pnr_number,
+        'created_at': self.created_at.isoformat() if self.created_at else None
+    }
+
+
+def schedule_to_dict(self):
+    return {
+        'id': self.id,
+        'train_id': self.train_id,
+        'route_id': self.route_id,
+        'train_name': self.train.train_name if self.train else None,
+        'train_number': self.train.train_number if self.train else None,
+        'source_station': self.route.source_station if self.route else None,
+        'destination_station': self.route.destination_station if self.route else None,
+        'departure_time': self.departure_time.isoformat() if self.departure_time else None,
+        'arrival_time': self.arrival_time.isoformat() if self.arrival_time else None,
+        'frequency': self.frequency,
+        'base_fare': float(self.base_fare) if self.base_fare else 0,
+        'status': self.status,
+        'created_at': self.created_at.isoformat() if self.created_at else None
+    }
+
+
+def make_rows(n):
+    now = datetime(2024, 5, 1, 12, 0, 0, 123456)
+    tickets = [
+        Ticket(id=i, user_id=i % 500, schedule_id=i % 40, booking_date=date(2024, 5, 1),
+               journey_date=date(2024, 6, 1 + i % 28), passenger_name=f'Passenger {i}',
+               passenger_age=20 + i % 50, passenger_gender='other', seat_number=f'S{i % 80}',
+               fare=Decimal('412.50'), status='confirmed', pnr_number=f'PNR{i:08d}', created_at=now)
+        for i in range(n)
+    ]
+    trains = [Train(id=i, train_name=f'Train {i}', train_number=f'T{i:03d}') for i in range(40)]
+    routes = [Route(id=i, source_station=f'City {i}', destination_station=f'Town {i}') for i in range(40)]
+    schedules = [
+        Schedule(id=i, train_id=i % 40, route_id=i % 40, train=trains[i % 40], route=routes[i % 40],
+                 departure_time=clock(6, 30), arrival_time=clock(11, 45), frequency='daily',
+                 base_fare=Decimal('250.00'), status='active', created_at=now)
+        for i in range(n)
+    ]
+    return tickets, schedules
+
+
+def best_of(repeat, f):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = f()
+        timings.append(time.perf_counter() - started)
+    return min(timings), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app(TestingConfig, start_background=False)
+    default = DefaultJSONProvider(app)
+
+    with app.app_context():
+        tickets, schedules = make_rows(args.rows)
+        cases = [
+            ('tickets', tickets, ticket_to_dict),
+            ('schedules', schedules, schedule_to_dict),
+        ]
+        print(f'{args.rows} rows, best of {args.repeat}')
+        for name, rows, legacy in cases:
+            def before(indent=None):
+                payload = {name: [legacy(row) for row in rows], 'count': len(rows)}
+                return default.dumps(payload, indent=indent, separators=None if indent else (',', ':'))
+
+            def after():
+                payload = {name: [row.to_dict() for row in rows], 'count': len(rows)}
+                return app.json.response(payload).get_data()
+
+            pretty, pretty_size = best_of(args.repeat, lambda: before(indent=2))
+            compact, compact_size = best_of(args.repeat, before)
+            fast, fast_size = best_of(args.repeat, after)
+            print(f'{name:9}  before pretty  {pretty * 1000:7.1f} ms  {pretty_size / 1024:7.0f} KiB')
+            print(f'{name:9}  before compact {compact * 1000:7.1f} ms  {compact_size / 1024:7.0f} KiB')
+            print(f'{name:9}  after          {fast * 1000:7.1f} ms  {fast_size / 1024:7.0f} KiB  '
+                  f'({compact / fast:.1f}x vs compact)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: worker startup time
+
+Each run is a fresh interpreter that imports the app, builds it and serves
+one request against a migrated SQLite database, reporting the create_app
+phase breakdown. It is compared with the old path, where importing app.py
+built an app and gunicorn's 'app:create_app()' built a second one, and with
+a worker forked from a preloaded parent (gunicorn --preload), which only
+resets its inherited pool before serving.
+
+Usage: python benchmarks/bench_startup.py [--runs 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+WORKER = r'''
+import json, os, sys, time
+started = time.perf_counter()
+import config
+config.Config.SQLALCHEMY_DATABASE_URI = sys.argv[1]
+config.Config.SWEEPER_ENABLED = False
+from app import create_app, dispose_engines
+imported = time.perf_counter()
+mode = sys.argv[2]
+
+if mode == 'preload':
+    app = create_app(start_background=False)
+    dispose_engines(app)
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        forked = time.perf_counter()
+        dispose_engines(app, close=False)
+        app.test_client().get('/api/trains/')
+        os.write(write, json.dumps({'ready_ms': (time.perf_counter() - forked) * 1000}).encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    print(os.read(read, 65536).decode())
+    sys.exit()
+
+apps = [create_app()]
+if mode == 'double':
+    apps.append(create_app())
+built = time.perf_counter()
+apps[-1].test_client().get('/api/trains/')
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_ms': (built - imported) * 1000,
+    'ready_ms': (time.perf_counter() - started) * 1000,
+    'phases': apps[-1].extensions['startup_timings']
+}))
+'''
+
+
+def run(database, mode):
+    output = subprocess.run(
+        [sys.executable, '-c', WORKER, database, mode], cwd=ROOT, check=True,
+        capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=ROOT)
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = f'sqlite:///{directory}/startup.db'
+        sys.path.insert(0, ROOT)
+        from sqlalchemy import create_engine
+        from migrations import upgrade
+        upgrade(create_engine(database), log=lambda message: None)
+
+        modes = ('single', 'double', 'preload')
+        run(database, 'single')  # warm the page cache and bytecode
+        results = {mode: [] for mode in modes}
+        # Interleave the modes so drift on the machine affects them equally
+        for _ in range(args.runs):
+            for mode in modes:
+                results[mode].append(run(database, mode))
+
+    def median(mode, key):
+        return statistics.median(result[key] for result in results[mode])
+
+    print(f'median of {args.runs} runs, time until the first request is served')
+    print(f'  old: import + two apps  : {median("double", "ready_ms"):8.1f} ms '
+          f'(create {median("double", "create_ms"):.1f} ms)')
+    print(f'  new: import + one app   : {median("single", "ready_ms"):8.1f} ms '
+          f'(import {median("single", "import_ms"):.1f} ms, create {median("single", "create_ms"):.1f} ms)')
+    print(f'  preloaded, after fork   : {median("preload", "ready_ms"):8.1f} ms')
+    print('create_app phases (new):')
+    for name in results['single'][0]['phases']:
+        print(f'  {name:14} {statistics.median(r["phases"][name] for r in results["single"]):8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""
+Load test: replay a mixed booking workload and report latency per endpoint
+
+Virtual users (--concurrency threads) each sign in as a different
+generated user and loop over a weighted mix of requests for --duration
+seconds:
+
+  search  GET /api/schedules/search?source&destination&journey_date
+  seats   GET /api/seats/?schedule_id&journey_date
+  pnr     GET /api/tickets/pnr/<pnr>
+  book    POST /api/tickets/
+  cancel  PUT /api/tickets/<id>/cancel, for a ticket this user booked
+          (a user with nothing to cancel books instead)
+
+Stations, departures and PNRs are sampled from the database, which should
+come from benchmarks/generate_data.py (its users share one password).
+Without --url the app is served in this process from --database-url by a
+threaded werkzeug server; with --url the requests go to a running server
+(gunicorn, docker stack) that uses that database. Requests in the first
+--warmup seconds are not counted.
+
+Reports requests, throughput, p50/p90/p95/p99/max latency and 4xx/5xx
+counts per endpoint, and optionally writes them as JSON (--json).
+
+Usage: python benchmarks/load_test.py [--database-url sqlite:///train_data.db] [--url http://127.0.0.1:5000]
+       [--duration 30] [--concurrency 16] [--mix search=40,seats=25,pnr=20,book=10,cancel=5]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+from urllib.parse import urlencode
+
+import urllib3
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, select, func  # noqa: E402
+from generate_data import PASSWORD, FIRST_NAMES, LAST_NAMES  # noqa: E402
+from models import User, Route, SeatInventory, Ticket  # noqa: E402
+
+DEFAULT_MIX = 'search=40,seats=25,pnr=20,book=10,cancel=5'
+PERCENTILES = (50, 90, 95, 99)
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ('search', 'seats', 'pnr', 'book', 'cancel'):
+            raise argparse.ArgumentTypeError(f'Unknown request type: {name}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def sample(database_url, size, rng):
+    """Stations, departures, PNRs and user count to draw requests from"""
+    engine = create_engine(database_url)
+    with engine.connect() as connection:
+        max_route = connection.execute(select(func.max(Route.id))).scalar() or 0
+        route_ids = [rng.randint(1, max_route) for _ in range(size)]
+        trips = connection.execute(
+            select(Route.source_station, Route.destination_station).where(Route.id.in_(route_ids))
+        ).all()
+
+        dates = connection.execute(
+            select(SeatInventory.journey_date).distinct()
+            .where(SeatInventory.journey_date > date.today()).limit(30)
+        ).scalars().all()
+        max_schedule = connection.execute(select(func.max(SeatInventory.schedule_id))).scalar() or 0
+        departures = [(rng.randint(1, max_schedule), rng.choice(dates)) for _ in range(size)] if dates else []
+
+        max_ticket = connection.execute(select(func.max(Ticket.id))).scalar() or 0
+        pnrs = connection.execute(
+            select(Ticket.pnr_number).where(Ticket.id.in_([rng.randint(1, max_ticket) for _ in range(size)]))
+        ).scalars().all()
+
+        users = connection.execute(select(func.count()).select_from(User.__table__)).scalar()
+    engine.dispose()
+
+    if not (trips and departures and pnrs and users):
+        sys.exit('The database has no routes, seats, tickets or users; run benchmarks/generate_data.py first')
+    return {'trips': trips, 'departures': departures, 'pnrs': pnrs, 'users': users}
+
+
+def serve(database_url):
+    """Serve the app from database_url on a free local port; returns its URL"""
+    import config
+    from werkzeug.serving import make_server
+
+    config.Config.SQLALCHEMY_DATABASE_URI = database_url
+    config.Config.DB_REPLICA_URIS = []
+    config.Config.SWEEPER_ENABLED = False
+    from app import create_app
+
+    app = create_app(config.Config, start_background=False)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+class VirtualUser(threading.Thread):
+    """One signed-in user sending the weighted mix on its own keep-alive connection"""
+
+    def __init__(self, base_url, username, data, mix, seed, stop_at, record):
+        super().__init__(daemon=True)
+        self.http = urllib3.PoolManager(maxsize=1, retries=False, timeout=urllib3.Timeout(total=30))
+        self.base_url = base_url
+        self.username = username
+        self.data = data
+        self.names, self.weights = zip(*mix.items())
+        self.rng = random.Random(seed)
+        self.stop_at = stop_at
+        self.record = record
+        self.cookie = None
+        self.booked = []
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        response = self.http.request(method, self.base_url + path, headers=headers,
+                                     body=json.dumps(body) if body is not None else None)
+        if 'Set-Cookie' in response.headers:
+            self.cookie = response.headers['Set-Cookie'].split(';', 1)[0]
+        return response
+
+    def search(self):
+        source, destination = self.rng.choice(self.data['trips'])
+        journey_date = self.rng.choice(self.data['departures'])[1]
+        fields = urlencode({'source': source, 'destination': destination,
+                            'journey_date': journey_date.isoformat()})
+        return self.request('GET', f'/api/schedules/search?{fields}')
+
+    def seats(self):
+        schedule_id, journey_date = self.rng.choice(self.data['departures'])
+        return self.request('GET', f'/api/seats/?schedule_id={schedule_id}&journey_date={journey_date.isoformat()}')
+
+    def pnr(self):
+        return self.request('GET', f'/api/tickets/pnr/{self.rng.choice(self.data["pnrs"])}')
+
+    def book(self):
+        schedule_id, journey_date = self.rng.choice(self.data['departures'])
+        response = self.request('POST', '/api/tickets/', {
+            'schedule_id': schedule_id,
+            'journey_date': journey_date.isoformat(),
+            'passenger_name': f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}',
+            'passenger_age': self.rng.randint(1, 90),
+            'passenger_gender': self.rng.choice(['male', 'female', 'other'])
+        })
+        if response.status == 201:
+            self.booked.append(response.json()['ticket']['id'])
+        return response
+
+    def cancel(self):
+        return self.request('PUT', f'/api/tickets/{self.booked.pop()}/cancel')
+
+    def run(self):
+        response = self.request('POST', '/api/auth/login', {'username': self.username, 'password': PASSWORD})
+        if response.status != 200:
+            self.record('login', None, response.status)
+            return
+        while time.perf_counter() < self.stop_at:
+            name = self.rng.choices(self.names, self.weights)[0]
+            if name == 'cancel' and not self.booked:
+                name = 'book'
+            started = time.perf_counter()
+            try:
+                status = getattr(self, name)().status
+            except urllib3.exceptions.HTTPError:
+                status = None
+            self.record(name, time.perf_counter() - started, status)
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of a sorted list"""
+    return ordered[max(0, -(-len(ordered) * p // 100) - 1)]
+
+
+def summarize(samples, seconds):
+    report = {}
+    for name, results in sorted(samples.items()):
+        latencies = sorted(latency for latency, status in results if latency is not None)
+        row = {
+            'requests': len(results),
+            'rps': round(len(results) / seconds, 1),
+            '4xx': sum(1 for _, status in results if status and 400 <= status < 500),
+            'errors': sum(1 for _, status in results if status is None or status >= 500)
+        }
+        if latencies:
+            for p in PERCENTILES:
+                row[f'p{p}_ms'] = round(percentile(latencies, p) * 1000, 1)
+            row['max_ms'] = round(latencies[-1] * 1000, 1)
+        report[name] = row
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:///train_data.db'))
+    parser.add_argument('--url', help='a running server (default: serve the app in this process)')
+    parser.add_argument('--duration', type=float, default=30, help='seconds, after the warmup')
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument('--sample-size', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='also write the report to this file')
+    options = parser.parse_args()
+
+    rng = random.Random(options.seed)
+    data = sample(options.database_url, options.sample_size, rng)
+    base_url = (options.url or serve(options.database_url)).rstrip('/')
+
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    started = time.perf_counter()
+    counting_from = started + options.warmup
+
+    def record(name, latency, status):
+        now = time.perf_counter()
+        if name == 'login' or now >= counting_from:
+            with lock:
+                samples[name].append((latency, status))
+
+    print(f'{options.concurrency} users against {base_url} for {options.warmup:g} + {options.duration:g} s')
+    users = [
+        VirtualUser(base_url, f'user{rng.randint(2, data["users"])}', data, options.mix, options.seed + n,
+                    counting_from + options.duration, record)
+        for n in range(options.concurrency)
+    ]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+
+    failed_logins = samples.pop('login', [])
+    report = summarize(samples, options.duration)
+    header = f'{"endpoint":8} {"requests":>9} {"req/s":>8}' + ''.join(f' {f"p{p} ms":>8}' for p in PERCENTILES)
+    print(header + f' {"max ms":>8} {"4xx":>6} {"errors":>6}')
+    for name, row in report.items():
+        print(f'{name:8} {row["requests"]:9d} {row["rps"]:8.1f}'
+              + ''.join(f' {row.get(f"p{p}_ms", 0):8.1f}' for p in PERCENTILES)
+              + f' {row.get("max_ms", 0):8.1f} {row["4xx"]:6d} {row["errors"]:6d}')
+    total = sum(row['requests'] for row in report.values())
+    print(f'total    {total:9d} {total / options.duration:8.1f}')
+    if failed_logins:
+        print(f'{len(failed_logins)} users could not sign in (status {failed_logins[0][1]})')
+
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump({'url': base_url, 'duration': options.duration, 'concurrency': options.concurrency,
+                       'mix': options.mix, 'endpoints': report}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
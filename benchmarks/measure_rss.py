@@ -0,0 +1,123 @@
+"""
+Measure per-worker memory under gunicorn with and without preload
+
+Starts gunicorn (gthread, the production settings from gunicorn.conf.py)
+against a throwaway SQLite database, sends some traffic so every worker
+has imported and touched what a real request touches, then reads
+/proc/<pid>/smaps_rollup for the master and each worker:
+
+  USS - memory only that process uses (Private_Clean + Private_Dirty),
+        what one more worker would cost
+  PSS - its fair share of memory shared with the others
+
+Linux only. Usage: python benchmarks/measure_rss.py [--workers 2] [--requests 200]
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+ENTRY = '''
+import config
+config.Config.SQLALCHEMY_DATABASE_URI = {uri!r}
+config.Config.DB_REPLICA_URIS = []
+from wsgi import app  # noqa: E402,F401
+'''
+
+PATHS = ['/api/trains/', '/api/routes/', '/api/schedules/', '/', '/search', '/api/does-not-exist']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def memory_kb(pid):
+    """(uss, pss) in kB from smaps_rollup"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields['Private_Clean'] + fields['Private_Dirty'], fields['Pss']
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def measure(directory, preload, workers, requests):
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([directory, ROOT]),
+               GUNICORN_PRELOAD='true' if preload else 'false')
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'),
+         '-b', f'127.0.0.1:{port}', '--workers', str(workers), '--threads', '2',
+         '--worker-class', 'gthread', 'bench_entry:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while len(children(master.pid)) < workers or not _up(port):
+            if time.monotonic() > deadline:
+                raise RuntimeError('gunicorn did not start')
+            time.sleep(0.2)
+        for i in range(requests):
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}{PATHS[i % len(PATHS)]}').read()
+            except urllib.error.HTTPError:
+                pass
+        time.sleep(0.5)
+        return memory_kb(master.pid), [memory_kb(pid) for pid in children(master.pid)]
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+
+
+def _up(port):
+    try:
+        urllib.request.urlopen(f'http://127.0.0.1:{port}/api/trains/', timeout=1).read()
+        return True
+    except OSError:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import create_engine
+    from migrations import upgrade
+
+    with tempfile.TemporaryDirectory() as directory:
+        uri = f'sqlite:///{directory}/rss.db'
+        upgrade(create_engine(uri), log=lambda message: None)
+        with open(os.path.join(directory, 'bench_entry.py'), 'w') as f:
+            f.write(ENTRY.format(uri=uri))
+
+        for preload in (False, True):
+            (master_uss, master_pss), workers = measure(directory, preload, args.workers, args.requests)
+            uss = [w[0] for w in workers]
+            pss = [w[1] for w in workers]
+            print(f'preload {"on " if preload else "off"}: master USS {master_uss / 1024:6.1f} MB, '
+                  f'per worker USS {sum(uss) / len(uss) / 1024:6.1f} MB, '
+                  f'PSS {sum(pss) / len(pss) / 1024:6.1f} MB, '
+                  f'total PSS {(master_pss + sum(pss)) / 1024:6.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
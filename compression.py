@@ -0,0 +1,82 @@
+"""
+Response compression helpers - negotiated brotli/gzip content encoding
+
+init_compression() compresses API and HTML responses of at least
+COMPRESS_MIN_SIZE bytes; smaller bodies are not worth the CPU or the
+Content-Encoding round trip.
+"""
+import gzip
+from flask import request
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Encodings in order of preference
+SUPPORTED_ENCODINGS = ['br', 'gzip'] if brotli else ['gzip']
+
+# Text responses; images and archives are compressed already
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'text/html', 'text/css', 'text/plain',
+    'text/javascript', 'application/javascript', 'image/svg+xml'
+}
+
+
+def choose_encoding(request):
+    """Pick the best content encoding the client accepts, or None"""
+    return _best_encoding(request.accept_encodings)
+
+
+def choose_encoding_for_header(header):
+    """choose_encoding() for a raw Accept-Encoding header (non-Flask requests)"""
+    return _best_encoding(parse_accept_header(header))
+
+
+def _best_encoding(accept_encodings):
+    encoding = accept_encodings.best_match(SUPPORTED_ENCODINGS)
+    if encoding and accept_encodings[encoding] > 0:
+        return encoding
+    return None
+
+
+def compress_response(response, request, min_size=0):
+    """Compress a buffered response in place when the client accepts it"""
+    if (response.direct_passthrough
+            or response.status_code != 200
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request)
+    if encoding is None:
+        return response
+
+    response.set_data(compress_bytes(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def compress_bytes(data, encoding):
+    """data compressed with 'br' or 'gzip'"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+def init_compression(app):
+    """Compress text responses of at least COMPRESS_MIN_SIZE bytes"""
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+    min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+
+    @app.after_request
+    def compress_text_response(response):
+        if response.mimetype in COMPRESSIBLE_MIMETYPES and not response.is_streamed:
+            compress_response(response, request, min_size)
+        return response
@@ -3,6 +3,7 @@ Configuration settings for Flask application
 """
 import os
 from datetime import timedelta
+from db_pool import InstrumentedQueuePool
 
 class Config:
     """Base configuration class"""
@@ -24,6 +25,33 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
     
+    # Connection pool, per gunicorn worker process. Each gthread worker runs
+    # --threads request threads plus the sweeper thread, so pool_size should be
+    # threads + 1 with a little overflow for bursts; the MySQL connection budget
+    # is workers x (pool_size + max_overflow). Recycle well below MySQL's
+    # wait_timeout and pre-ping so idle connections are never handed out dead.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '3'))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '2'))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', '10'))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING
+    }
+    
+    # Read replicas (comma-separated URIs), used by @read_only endpoints
+    DB_REPLICA_URIS = [uri.strip() for uri in os.environ.get('DB_REPLICA_URIS', '').split(',') if uri.strip()]
+    REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', '5'))
+    REPLICA_LAG_CHECK_SECONDS = float(os.environ.get('REPLICA_LAG_CHECK_SECONDS', '10'))
+    REPLICA_LAG_FALLBACK = os.environ.get('REPLICA_LAG_FALLBACK', 'primary')  # or 'replica'
+    REPLICA_READ_YOUR_WRITES_SECONDS = float(os.environ.get('REPLICA_READ_YOUR_WRITES_SECONDS', '10'))
+    
     # Session settings
     SESSION_TYPE = 'filesystem'
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
@@ -31,15 +59,115 @@ class Config:
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     
-    # Application settings
+    # JSON settings (serializers.py): compact responses unless JSON_COMPACT is off
     JSON_SORT_KEYS = False
-    JSONIFY_PRETTYPRINT_REGULAR = True
+    JSON_COMPACT = os.environ.get('JSON_COMPACT', 'true').lower() == 'true'
+    
+    # Seat hold settings
+    SEAT_HOLD_MINUTES = int(os.environ.get('SEAT_HOLD_MINUTES', '10'))
+    SEAT_HOLD_MAX_SEATS = int(os.environ.get('SEAT_HOLD_MAX_SEATS', '6'))
+    
+    # Idempotency-Key settings
+    IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', '24'))
+    # How long a first request may run; keep above the gunicorn --timeout (120 s)
+    IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', '150'))
+    
+    # Background sweeper settings
+    SWEEPER_ENABLED = os.environ.get('SWEEPER_ENABLED', 'true').lower() == 'true'
+    SWEEPER_INTERVAL_SECONDS = int(os.environ.get('SWEEPER_INTERVAL_SECONDS', '30'))
+    SWEEPER_BATCH_SIZE = int(os.environ.get('SWEEPER_BATCH_SIZE', '500'))
+    
+    # Background jobs (jobs.py, run by worker.py). A worker claims up to
+    # JOB_BATCH_SIZE due jobs per poll; a job still running after
+    # JOB_LEASE_SECONDS is assumed lost and queued again. JOB_SKIP_LOCKED:
+    # auto (from the server version), true or false
+    JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', '1'))
+    JOB_BATCH_SIZE = int(os.environ.get('JOB_BATCH_SIZE', '10'))
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', '600'))
+    JOB_RETRY_BACKOFF_SECONDS = int(os.environ.get('JOB_RETRY_BACKOFF_SECONDS', '30'))
+    JOB_RETENTION_HOURS = int(os.environ.get('JOB_RETENTION_HOURS', '168'))
+    JOB_SKIP_LOCKED = os.environ.get('JOB_SKIP_LOCKED', 'auto').lower()
+    
+    # Outbox events (outbox.py) delivered by worker.py to comma-separated
+    # webhook URLs in batches, with exponential backoff per failing webhook
+    OUTBOX_ENABLED = os.environ.get('OUTBOX_ENABLED', 'true').lower() == 'true'
+    OUTBOX_WEBHOOK_URLS = [url.strip() for url in os.environ.get('OUTBOX_WEBHOOK_URLS', '').split(',') if url.strip()]
+    OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', '100'))
+    OUTBOX_POLL_SECONDS = float(os.environ.get('OUTBOX_POLL_SECONDS', '0.5'))
+    OUTBOX_TIMEOUT_SECONDS = float(os.environ.get('OUTBOX_TIMEOUT_SECONDS', '10'))
+    OUTBOX_BACKOFF_SECONDS = float(os.environ.get('OUTBOX_BACKOFF_SECONDS', '5'))
+    OUTBOX_MAX_BACKOFF_SECONDS = float(os.environ.get('OUTBOX_MAX_BACKOFF_SECONDS', '300'))
+    OUTBOX_GAP_SECONDS = float(os.environ.get('OUTBOX_GAP_SECONDS', '60'))  # longest transaction that records events
+    OUTBOX_RETENTION_HOURS = int(os.environ.get('OUTBOX_RETENTION_HOURS', '72'))
+    
+    # Payments (payments.py): off by default, tickets are confirmed on booking.
+    # When on, a booked seat stays pending until paid through the gateway and
+    # is released if still unpaid after PAYMENT_TIMEOUT_MINUTES
+    PAYMENTS_ENABLED = os.environ.get('PAYMENTS_ENABLED', 'false').lower() == 'true'
+    PAYMENT_GATEWAY_URL = os.environ.get('PAYMENT_GATEWAY_URL', '')
+    PAYMENT_GATEWAY_API_KEY = os.environ.get('PAYMENT_GATEWAY_API_KEY', '')
+    PAYMENT_GATEWAY_TIMEOUT_SECONDS = float(os.environ.get('PAYMENT_GATEWAY_TIMEOUT_SECONDS', '10'))
+    PAYMENT_WEBHOOK_SECRET = os.environ.get('PAYMENT_WEBHOOK_SECRET', '')
+    PAYMENT_CURRENCY = os.environ.get('PAYMENT_CURRENCY', 'UAH')  # fares are in hryvnia
+    PAYMENT_TIMEOUT_MINUTES = int(os.environ.get('PAYMENT_TIMEOUT_MINUTES', '15'))
+    
+    # POST /api/seats/bulk with more seats than this is queued as a job
+    JOB_INLINE_MAX_SEATS = int(os.environ.get('JOB_INLINE_MAX_SEATS', '200'))
+    
+    # Prometheus metrics at /metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    
+    # Per-request SQL profiling (Server-Timing header, slow/N+1 request log)
+    QUERY_PROFILER_ENABLED = os.environ.get('QUERY_PROFILER_ENABLED', 'true').lower() == 'true'
+    # Server-Timing shows any client query counts and timings, so it is opt-in outside development
+    QUERY_PROFILER_SERVER_TIMING = os.environ.get('QUERY_PROFILER_SERVER_TIMING', 'false').lower() == 'true'
+    QUERY_PROFILER_SLOW_MS = int(os.environ.get('QUERY_PROFILER_SLOW_MS', '500'))
+    QUERY_PROFILER_MAX_QUERIES = int(os.environ.get('QUERY_PROFILER_MAX_QUERIES', '30'))
+    QUERY_PROFILER_REPEAT_THRESHOLD = int(os.environ.get('QUERY_PROFILER_REPEAT_THRESHOLD', '5'))
+    
+    # Slow query log (sampled, parameters redacted, EXPLAIN captured in the background)
+    SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG_ENABLED', 'true').lower() == 'true'
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', '200'))
+    SLOW_QUERY_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_SAMPLE_RATE', '1.0'))
+    SLOW_QUERY_LOG_SIZE = int(os.environ.get('SLOW_QUERY_LOG_SIZE', '200'))
+    SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', 'true').lower() == 'true'
+    
+    # Async deployment mode (asgi.py): async engine pool per process and the
+    # threads that serve requests passed through to the Flask app
+    ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URI')  # default: the primary via aiomysql/aiosqlite
+    ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE', '10'))
+    ASYNC_DB_MAX_OVERFLOW = int(os.environ.get('ASYNC_DB_MAX_OVERFLOW', '5'))
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', '4'))
+    
+    # Startup schema check against migrations/: warn, strict (refuse to start) or off
+    SCHEMA_VERSION_CHECK = os.environ.get('SCHEMA_VERSION_CHECK', 'warn').lower()
+    
+    # Response compression (brotli/gzip) for text responses of at least COMPRESS_MIN_SIZE bytes
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))
+    
+    # Rendered pages cached per worker for anonymous visitors (0 disables)
+    PAGE_CACHE_SECONDS = int(os.environ.get('PAGE_CACHE_SECONDS', '300'))
+    # Pages embedding schedule data; other workers' copies are stale for up to this long
+    PAGE_CACHE_DATA_SECONDS = int(os.environ.get('PAGE_CACHE_DATA_SECONDS', '10'))
+    
+    # Most sub-requests accepted by POST /api/batch
+    BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', '20'))
+    
+    # Embed the first API payload in the booking, tickets and dashboard pages
+    EMBED_INITIAL_DATA = os.environ.get('EMBED_INITIAL_DATA', 'true').lower() == 'true'
+    
+    # Fare engine settings
+    FARE_HORIZON_DAYS = int(os.environ.get('FARE_HORIZON_DAYS', '60'))
+    FARE_CACHE_SECONDS = int(os.environ.get('FARE_CACHE_SECONDS', '60'))
 
 
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     SQLALCHEMY_ECHO = True
+    JSON_COMPACT = False
+    QUERY_PROFILER_SERVER_TIMING = True
 
 
 class ProductionConfig(Config):
@@ -53,6 +181,11 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # in-memory SQLite uses a StaticPool
+    DB_REPLICA_URIS = []
+    SWEEPER_ENABLED = False
+    QUERY_PROFILER_SERVER_TIMING = True
+    SCHEMA_VERSION_CHECK = 'off'  # tests build the schema with db.create_all()
 
 
 # Configuration dictionary
@@ -0,0 +1,121 @@
+"""
+Connection pool instrumentation
+
+InstrumentedQueuePool is a QueuePool that records how long each checkout
+takes (waiting for a free connection, opening a new one and the pre-ping
+included), checkout timeouts, and connect/checkin/invalidate events.
+Together with the pool's own gauges (in use, overflow) this shows when
+worker threads are starved for connections or connections go stale.
+"""
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds (seconds) of the checkout wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolStats:
+    """Thread-safe counters for one engine's pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self.peak_in_use = 0
+
+    def record_checkout(self, waited, in_use):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            self.peak_in_use = max(self.peak_in_use, in_use)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if waited <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+
+    def increment(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'peak_in_use': self.peak_in_use,
+                'wait_seconds_total': round(self.wait_seconds_total, 6),
+                'wait_seconds_max': round(self.wait_seconds_max, 6),
+                'wait_avg_ms': round(self.wait_seconds_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                'wait_histogram': {
+                    **{f'le_{bound}': count for bound, count in zip(WAIT_BUCKETS, self.wait_buckets)},
+                    'le_inf': self.wait_buckets[-1]
+                }
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that keeps PoolStats across engine.dispose()"""
+
+    def __init__(self, *args, **kw):
+        inherited = '_dispatch' in kw
+        super().__init__(*args, **kw)
+        self.stats = PoolStats()
+        if not inherited:
+            # recreate() copies these listeners to the new pool, see below
+            _listen(self, self.stats)
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.increment('timeouts')
+            raise
+        self.stats.record_checkout(time.perf_counter() - started, self.checkedout())
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def _listen(pool, stats):
+    event.listen(pool, 'connect', lambda *args: stats.increment('connects'))
+    event.listen(pool, 'checkin', lambda *args: stats.increment('checkins'))
+    event.listen(pool, 'invalidate', lambda *args: stats.increment('invalidations'))
+
+
+def pool_status(engine):
+    """Gauges and counters for an engine's pool"""
+    pool = engine.pool
+    status = {
+        'pool_class': type(pool).__name__,
+        'instrumented': isinstance(pool, InstrumentedQueuePool)
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+            'checked_in': pool.checkedin(),
+            'in_use': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0)
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        status.update(pool.stats.snapshot())
+    return status
@@ -0,0 +1,195 @@
+"""
+Fare Engine - dynamic fares by seat type, days to departure and load factor
+
+fare = base_fare x seat type multiplier x advance purchase factor x load factor
+
+Fares are computed for many schedules and journey dates at once as NumPy
+arrays of shape (schedules, dates, seat types), with the load factors read
+from seat_inventory in a single query. Results are cached per
+(schedule, journey_date) for FARE_CACHE_SECONDS; bookings and cancellations
+invalidate their entry so the next quote sees the new load.
+"""
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+from models import db, Schedule, SeatInventory
+
+SEAT_TYPES = ('general', 'sleeper', 'AC', 'first_class')
+SEAT_TYPE_MULTIPLIERS = np.array([1.0, 1.3, 1.8, 2.5])
+
+# Days to departure -> factor; booking early is cheaper, the last days cost more
+ADVANCE_DAYS = np.array([0, 3, 7, 14, 30, 60])
+ADVANCE_FACTORS = np.array([1.30, 1.20, 1.10, 1.00, 0.90, 0.85])
+
+# Share of seats sold -> factor; prices rise once a train is three quarters full
+LOAD_POINTS = np.array([0.0, 0.5, 0.75, 0.9, 1.0])
+LOAD_FACTORS = np.array([1.0, 1.0, 1.15, 1.35, 1.5])
+
+
+def compute_fares(base_fares, days_out, load):
+    """Vectorized fare table.
+
+    base_fares: (schedules,), days_out: (dates,), load: (schedules, dates, types)
+    Returns fares rounded to 2 decimals with the same shape as load.
+    """
+    advance = np.interp(np.maximum(days_out, 0), ADVANCE_DAYS, ADVANCE_FACTORS)
+    fares = (
+        np.asarray(base_fares, dtype=float)[:, None, None]
+        * advance[None, :, None]
+        * SEAT_TYPE_MULTIPLIERS[None, None, :]
+        * np.interp(load, LOAD_POINTS, LOAD_FACTORS)
+    )
+    return np.round(fares, 2)
+
+
+class FareCache:
+    """Thread-safe TTL cache of {seat_type: fare} per (schedule_id, journey_date)"""
+
+    def __init__(self, ttl_seconds, max_entries=50000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def update(self, tables):
+        expires = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            if len(self._entries) + len(tables) > self.max_entries:
+                self._entries.clear()
+            for key, fares in tables.items():
+                self._entries[key] = (expires, fares)
+
+    def invalidate(self, schedule_id, journey_date=None):
+        """Drop one date, or every date of a schedule"""
+        with self._lock:
+            if journey_date is not None:
+                self._entries.pop((schedule_id, journey_date), None)
+                return
+            for key in [key for key in self._entries if key[0] == schedule_id]:
+                del self._entries[key]
+
+
+def _cache():
+    cache = current_app.extensions.get('fare_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            'fare_cache', FareCache(current_app.config.get('FARE_CACHE_SECONDS', 60))
+        )
+    return cache
+
+
+def build_fare_tables(schedule_ids, dates):
+    """Price every schedule x date x seat type in one pass.
+
+    Returns {(schedule_id, journey_date): {seat_type: fare}}. Only seat types
+    with seats on that date are listed, unless the date has no seats yet.
+    """
+    base_fares = dict(db.session.execute(
+        select(Schedule.id, Schedule.base_fare).where(Schedule.id.in_(schedule_ids))
+    ).all())
+    schedule_ids = [schedule_id for schedule_id in schedule_ids if schedule_id in base_fares]
+    if not schedule_ids or not dates:
+        return {}
+
+    schedule_index = {schedule_id: i for i, schedule_id in enumerate(schedule_ids)}
+    date_index = {journey_date: i for i, journey_date in enumerate(dates)}
+    type_index = {seat_type: i for i, seat_type in enumerate(SEAT_TYPES)}
+    shape = (len(schedule_ids), len(dates), len(SEAT_TYPES))
+    available = np.zeros(shape)
+    occupied = np.zeros(shape)
+
+    rows = db.session.execute(
+        select(
+            SeatInventory.schedule_id, SeatInventory.journey_date, SeatInventory.seat_type,
+            SeatInventory.available, SeatInventory.occupied
+        ).where(
+            SeatInventory.schedule_id.in_(schedule_ids),
+            SeatInventory.journey_date.between(min(dates), max(dates))
+        )
+    )
+    for schedule_id, journey_date, seat_type, seats_free, seats_taken in rows:
+        if journey_date not in date_index:
+            continue
+        index = (schedule_index[schedule_id], date_index[journey_date], type_index[seat_type])
+        available[index] = seats_free
+        occupied[index] = seats_taken
+
+    total = available + occupied
+    load = np.divide(occupied, total, out=np.zeros(shape), where=total > 0)
+    today = date.today()
+    days_out = np.array([(journey_date - today).days for journey_date in dates])
+    fares = compute_fares([base_fares[schedule_id] for schedule_id in schedule_ids], days_out, load)
+
+    has_seats = total > 0
+    priced = has_seats | ~has_seats.any(axis=2, keepdims=True)
+    tables = {}
+    for i, schedule_id in enumerate(schedule_ids):
+        for j, journey_date in enumerate(dates):
+            tables[(schedule_id, journey_date)] = {
+                seat_type: float(fares[i, j, k])
+                for k, seat_type in enumerate(SEAT_TYPES) if priced[i, j, k]
+            }
+    return tables
+
+
+def warm_fares(schedule_ids, dates):
+    """Price and cache a block of schedules and dates"""
+    tables = build_fare_tables(schedule_ids, dates)
+    _cache().update(tables)
+    return tables
+
+
+def get_fares(schedule_ids, journey_date):
+    """Fare tables for a date, {schedule_id: {seat_type: fare}}.
+
+    Cache misses are priced together over the whole horizon, so later
+    searches for the other dates of those schedules are cache hits.
+    """
+    cache = _cache()
+    result = {}
+    missing = []
+    for schedule_id in schedule_ids:
+        fares = cache.get((schedule_id, journey_date))
+        if fares is None:
+            missing.append(schedule_id)
+        else:
+            result[schedule_id] = fares
+
+    if missing:
+        today = date.today()
+        horizon = current_app.config.get('FARE_HORIZON_DAYS', 60)
+        if today <= journey_date < today + timedelta(days=horizon):
+            dates = [today + timedelta(days=offset) for offset in range(horizon)]
+        else:
+            dates = [journey_date]
+        tables = warm_fares(missing, dates)
+        for schedule_id in missing:
+            if (schedule_id, journey_date) in tables:
+                result[schedule_id] = tables[(schedule_id, journey_date)]
+    return result
+
+
+def quote_fare(schedule_id, journey_date, seat_type=None):
+    """Current fare for one seat as a Decimal; the cheapest type when seat_type is None"""
+    fares = get_fares([schedule_id], journey_date).get(schedule_id)
+    if not fares:
+        return None
+    fare = fares.get(seat_type) if seat_type else None
+    if fare is None:
+        fare = min(fares.values())
+    return Decimal(str(fare))
+
+
+def invalidate_fares(schedule_id, journey_date=None):
+    """Forget cached fares after the load or the base fare changed"""
+    _cache().invalidate(int(schedule_id), journey_date)
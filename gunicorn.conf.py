@@ -0,0 +1,61 @@
+"""
+Gunicorn settings shared by every deployment (loaded automatically from the
+working directory); the bind, workers and threads stay on the command line.
+
+Serve wsgi:app. The app is preloaded (GUNICORN_PRELOAD=false to turn it
+off): imports, mapper configuration and compiled templates are built once
+in the master and shared copy-on-write by the workers. Before forking, the
+master closes its connections and moves everything it allocated into the
+gc's permanent generation (gc.freeze), so collections in the workers do
+not write to, and un-share, those pages; each worker forgets the inherited
+pool. Background threads (the sweeper) never survive a fork, so every
+worker starts its own once the app is loaded.
+
+benchmarks/measure_rss.py reports per-worker memory with and without it.
+"""
+import gc
+import os
+import shutil
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+
+def on_starting(server):
+    """Start each deployment with an empty Prometheus multiprocess store"""
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def when_ready(server):
+    """Preloaded app: finish lazy work, close DB connections and freeze the heap before forking"""
+    if server.cfg.preload_app:
+        from app import dispose_engines, warm_up
+        app = server.app.wsgi()
+        warm_up(app)
+        dispose_engines(app)
+        gc.collect()
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    """Preloaded app: drop the pool inherited from the master without closing its sockets"""
+    if server.cfg.preload_app:
+        from app import dispose_engines
+        dispose_engines(server.app.wsgi(), close=False)
+
+
+def post_worker_init(worker):
+    """Start this worker's background threads and report its startup time"""
+    from app import start_background_tasks
+    start_background_tasks(worker.wsgi)
+    timings = worker.wsgi.extensions.get('startup_timings', {})
+    worker.log.info('Worker %s ready (create_app %s ms)', worker.pid, timings.get('total'))
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges from the aggregated metrics"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
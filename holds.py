@@ -0,0 +1,160 @@
+"""
+Seat Hold Helpers - temporary seat reservations with a TTL
+
+A hold is stored directly on the seat row (hold_token, held_by, held_until),
+so converting a hold into a ticket is a single indexed lookup by token and
+expired holds can be released with batched UPDATE statements.
+"""
+import secrets
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, update, or_, and_
+from models import db, Seat
+from inventory import InventoryChanges
+
+
+class HoldUnavailableError(Exception):
+    """Raised when the requested seats cannot be held"""
+
+
+def _claimable(now):
+    """Seats that are free, or whose hold lapsed without being booked"""
+    return or_(
+        Seat.is_available == True,
+        and_(Seat.ticket_id.is_(None), Seat.held_until < now)
+    )
+
+
+def create_hold(user_id, schedule_id, journey_date, seat_numbers=None,
+                count=1, seat_type=None, minutes=None):
+    """Hold specific seats (or any `count` seats) for the given user.
+
+    Returns (hold_token, expires_at, seats). The caller commits.
+    """
+    now = datetime.utcnow()
+    minutes = minutes or current_app.config['SEAT_HOLD_MINUTES']
+    expires_at = now + timedelta(minutes=minutes)
+
+    query = select(Seat.id, Seat.seat_type, Seat.is_available).where(
+        Seat.schedule_id == schedule_id,
+        Seat.journey_date == journey_date,
+        _claimable(now)
+    )
+    if seat_numbers:
+        query = query.where(Seat.seat_number.in_(seat_numbers))
+        wanted = len(set(seat_numbers))
+    else:
+        if seat_type:
+            query = query.where(Seat.seat_type == seat_type)
+        query = query.order_by(Seat.seat_number).limit(count)
+        wanted = count
+
+    candidates = db.session.execute(query.with_for_update()).all()
+    if len(candidates) < wanted:
+        raise HoldUnavailableError('Requested seats are not available')
+    seat_ids = [row.id for row in candidates]
+
+    # Re-check the claim condition in the UPDATE so concurrent holders lose cleanly
+    token = secrets.token_hex(16)
+    result = db.session.execute(
+        update(Seat)
+        .where(Seat.id.in_(seat_ids), _claimable(now))
+        .values(is_available=False, hold_token=token, held_by=user_id, held_until=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(seat_ids):
+        db.session.rollback()
+        raise HoldUnavailableError('Requested seats were taken by another booking')
+
+    # Lapsed holds being re-claimed were already counted as occupied
+    changes = InventoryChanges()
+    for row in candidates:
+        if row.is_available:
+            changes.add_counts(schedule_id, journey_date, row.seat_type, available=-1, occupied=1)
+    changes.apply()
+
+    seats = Seat.query.filter_by(hold_token=token).order_by(Seat.seat_number).all()
+    return token, expires_at, seats
+
+
+def release_hold(hold_token, user_id):
+    """Release an unexpired hold early. Returns the number of seats released."""
+    held = and_(Seat.hold_token == hold_token, Seat.held_by == user_id, Seat.ticket_id.is_(None))
+    return _release(held)
+
+
+def _release(condition):
+    """Free the held seats matching `condition` and credit them back to the counters"""
+    seats = db.session.execute(
+        select(Seat.id, Seat.schedule_id, Seat.journey_date, Seat.seat_type)
+        .where(condition)
+        .with_for_update()
+    ).all()
+    if not seats:
+        return 0
+
+    db.session.execute(
+        update(Seat)
+        .where(Seat.id.in_([seat.id for seat in seats]))
+        .values(is_available=True, hold_token=None, held_by=None, held_until=None)
+        .execution_options(synchronize_session=False)
+    )
+
+    changes = InventoryChanges()
+    for seat in seats:
+        changes.add_counts(seat.schedule_id, seat.journey_date, seat.seat_type, available=1, occupied=-1)
+    changes.apply()
+    return len(seats)
+
+
+def claim_held_seat(hold_token, user_id, seat_number=None):
+    """Take one seat out of a live hold for booking, or None if the hold is gone.
+
+    The hold columns are cleared on the returned seat; the caller assigns the
+    ticket and commits in the same transaction.
+    """
+    query = Seat.query.filter(
+        Seat.hold_token == hold_token,
+        Seat.held_by == user_id,
+        Seat.held_until >= datetime.utcnow()
+    )
+    if seat_number:
+        query = query.filter(Seat.seat_number == seat_number)
+
+    seat = query.order_by(Seat.seat_number).with_for_update().first()
+    if seat:
+        seat.hold_token = None
+        seat.held_by = None
+        seat.held_until = None
+    return seat
+
+
+def release_expired_holds(batch_size=500, now=None):
+    """Release lapsed holds in batches, committing after each batch.
+
+    Each batch picks ids through the held_until index and frees them with one
+    UPDATE, so the sweep never locks more than `batch_size` rows at a time.
+    """
+    now = now or datetime.utcnow()
+    expired = and_(Seat.held_until < now, Seat.ticket_id.is_(None))
+    released = 0
+
+    while True:
+        seat_ids = db.session.execute(
+            select(Seat.id).where(expired).limit(batch_size)
+        ).scalars().all()
+        if not seat_ids:
+            break
+
+        released += _release(and_(Seat.id.in_(seat_ids), expired))
+        db.session.commit()
+
+        if len(seat_ids) < batch_size:
+            break
+
+    return released
+
+
+def sweep_expired_holds():
+    """Sweeper task: release expired holds using the configured batch size"""
+    return release_expired_holds(current_app.config['SWEEPER_BATCH_SIZE'])
@@ -0,0 +1,167 @@
+"""
+Idempotency-Key support for write endpoints
+
+The first request with a given key reserves a row in idempotency_keys, runs
+the handler and stores its response. Retries with the same key are answered
+from the stored response without running the handler again. 5xx and 409
+responses are not stored; the key is freed so the request can be retried.
+
+The reserved row carries a lease of IDEMPOTENCY_LEASE_SECONDS. A retry
+while it runs gets 409 with Retry-After. If the row is still unanswered past
+its lease, the process died mid-request (OOM, SIGKILL, worker timeout), maybe
+after the handler committed. Running it again could book twice, and waiting
+would block the key until it expires. The retry gets a 409 without
+Retry-After instead, telling the client to look up what happened (e.g. its
+tickets) before trying again with a new key.
+"""
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import request, jsonify, current_app, make_response
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from models import db, IdempotencyKey
+from routes.auth_helpers import get_current_user_id
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+def _request_hash():
+    """Fingerprint of the request so a key cannot be reused for a different call"""
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.path.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _replay(record):
+    """Rebuild the stored response"""
+    response = current_app.response_class(
+        record.response_body,
+        status=record.status_code,
+        mimetype='application/json'
+    )
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def _in_progress():
+    """409 for a key whose first request has not finished; Retry-After marks it as retryable"""
+    response = jsonify({'error': 'A request with this Idempotency-Key is still in progress'})
+    response.status_code = 409
+    response.headers['Retry-After'] = '1'
+    return response
+
+
+def _abandoned():
+    """409 for a key whose first request died before storing its response"""
+    return jsonify({
+        'error': 'The first request with this Idempotency-Key did not finish and may have been applied; '
+                 'check before retrying with a new key'
+    }), 409
+
+
+def idempotent(f):
+    """Decorator making a login-protected write endpoint safe to retry"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        user_id = get_current_user_id()
+        if not key or user_id is None:
+            return f(*args, **kwargs)
+
+        if len(key) > 64:
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} must be at most 64 characters'}), 400
+
+        now = datetime.utcnow()
+        request_hash = _request_hash()
+
+        record = IdempotencyKey.query.filter_by(user_id=user_id, idempotency_key=key).first()
+        if record and record.expires_at <= now:
+            db.session.delete(record)
+            db.session.commit()
+            record = None
+
+        if record:
+            if record.request_hash != request_hash:
+                return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'}), 422
+            if record.status_code is None:
+                if record.locked_until is None or record.locked_until <= now:
+                    return _abandoned()
+                return _in_progress()
+            return _replay(record)
+
+        # Reserve the key before running the handler so concurrent retries collide here
+        ttl = timedelta(hours=current_app.config['IDEMPOTENCY_KEY_TTL_HOURS'])
+        record = IdempotencyKey(
+            user_id=user_id,
+            idempotency_key=key,
+            request_hash=request_hash,
+            locked_until=now + timedelta(seconds=current_app.config['IDEMPOTENCY_LEASE_SECONDS']),
+            expires_at=now + ttl
+        )
+        db.session.add(record)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return _in_progress()
+        record_id = record.id
+
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == record_id))
+            db.session.commit()
+            raise
+
+        # A refused request must not have what it changed committed with its key
+        if response.status_code >= 400:
+            db.session.rollback()
+
+        # Server errors and conflicts with the current state (an expired seat
+        # hold, a payment in progress) are not stored, so the client may retry them
+        if response.status_code >= 500 or response.status_code == 409:
+            db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == record_id))
+        else:
+            db.session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.id == record_id)
+                .values(status_code=response.status_code, response_body=response.get_data(as_text=True))
+            )
+        db.session.commit()
+
+        return response
+    return decorated_function
+
+
+def purge_expired_keys(batch_size=500, now=None):
+    """Delete expired idempotency keys in batches, committing after each batch"""
+    now = now or datetime.utcnow()
+    purged = 0
+
+    while True:
+        key_ids = db.session.execute(
+            select(IdempotencyKey.id).where(IdempotencyKey.expires_at < now).limit(batch_size)
+        ).scalars().all()
+        if not key_ids:
+            break
+
+        result = db.session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.id.in_(key_ids))
+        )
+        db.session.commit()
+        purged += result.rowcount
+
+        if len(key_ids) < batch_size:
+            break
+
+    return purged
+
+
+def sweep_expired_keys():
+    """Sweeper task: purge expired idempotency keys using the configured batch size"""
+    return purge_expired_keys(current_app.config['SWEEPER_BATCH_SIZE'])
@@ -3,9 +3,10 @@
 USE train_booking_db;
 
 -- This file is executed automatically when the MySQL container starts for the first time
--- The tables will be created by SQLAlchemy when the Flask app starts
+-- The tables are created by the schema migrations (python migrate.py, see
+-- migrations/), which docker-compose runs before the app and the worker start
 
--- Note: We don't create tables here as SQLAlchemy will handle that
+-- Note: We don't create tables here as the migrations handle that
 -- This file can be used for additional initialization if needed
 
 SELECT 'Database initialized successfully' as message;
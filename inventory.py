@@ -0,0 +1,196 @@
+"""
+Seat Inventory - denormalized availability counters per schedule/date/seat type
+
+Writers describe seat state changes with InventoryChanges and apply them in
+the same transaction as the seat update; readers get counts from a primary
+key lookup on seat_inventory instead of counting seat rows.
+"""
+from collections import defaultdict
+from sqlalchemy import select, update, func, case, tuple_
+from models import db, Seat, SeatInventory
+from segments import segment_mask
+
+
+class InventoryChanges:
+    """Accumulates counter deltas so each (schedule, date, type) is written once"""
+
+    def __init__(self):
+        self._deltas = defaultdict(lambda: [0, 0])
+
+    def add_counts(self, schedule_id, journey_date, seat_type, available=0, occupied=0):
+        """Add raw deltas for one counter row"""
+        delta = self._deltas[(int(schedule_id), journey_date, seat_type)]
+        delta[0] += available
+        delta[1] += occupied
+
+    def add(self, seat):
+        """Count a seat in its current state"""
+        self._count(seat, 1)
+
+    def remove(self, seat):
+        """Uncount a seat in its current state (call before changing it)"""
+        self._count(seat, -1)
+
+    def _count(self, seat, sign):
+        if seat.is_available:
+            self.add_counts(seat.schedule_id, seat.journey_date, seat.seat_type, available=sign)
+        else:
+            self.add_counts(seat.schedule_id, seat.journey_date, seat.seat_type, occupied=sign)
+
+    def apply(self):
+        """Write the accumulated deltas; the caller commits"""
+        for key, (available, occupied) in self._deltas.items():
+            if available or occupied:
+                _apply_delta(key, available, occupied)
+        self._deltas.clear()
+
+
+def release_ticket_seat(ticket, changes):
+    """Give back the seat (or the trip's segments of it) a ticket holds; the caller commits"""
+    if not ticket.seat_number:
+        return None
+    seat = Seat.query.filter_by(
+        schedule_id=ticket.schedule_id,
+        journey_date=ticket.journey_date,
+        seat_number=ticket.seat_number
+    ).first()
+    if seat:
+        changes.remove(seat)
+        if ticket.from_stop is not None:
+            seat.segment_mask &= ~segment_mask(ticket.from_stop, ticket.to_stop)
+            seat.is_available = seat.segment_mask == 0 and seat.hold_token is None
+        else:
+            seat.is_available = True
+            seat.ticket_id = None
+        changes.add(seat)
+    return seat
+
+
+def _key_filter(key):
+    schedule_id, journey_date, seat_type = key
+    return (
+        (SeatInventory.schedule_id == schedule_id)
+        & (SeatInventory.journey_date == journey_date)
+        & (SeatInventory.seat_type == seat_type)
+    )
+
+
+def _apply_delta(key, available, occupied):
+    """Increment one counter row in place, creating it from the seats if missing"""
+    result = db.session.execute(
+        update(SeatInventory)
+        .where(_key_filter(key))
+        .values(
+            available=SeatInventory.available + available,
+            occupied=SeatInventory.occupied + occupied
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        # First touch for this key (or a pre-existing deployment): seed from the
+        # seat rows, which already include this transaction's flushed changes
+        db.session.flush()
+        _upsert_counts(_count_seats(key) or {key: (0, 0)})
+
+
+def _count_seats(*keys):
+    """Recount seat rows for the given keys (all keys when none given)"""
+    query = select(
+        Seat.schedule_id,
+        Seat.journey_date,
+        Seat.seat_type,
+        func.sum(case((Seat.is_available == True, 1), else_=0)),
+        func.sum(case((Seat.is_available == True, 0), else_=1))
+    ).group_by(Seat.schedule_id, Seat.journey_date, Seat.seat_type)
+    if keys:
+        query = query.where(tuple_(Seat.schedule_id, Seat.journey_date, Seat.seat_type).in_(keys))
+
+    return {
+        (schedule_id, journey_date, seat_type): (int(available), int(occupied))
+        for schedule_id, journey_date, seat_type, available, occupied in db.session.execute(query)
+    }
+
+
+def _upsert_counts(counts):
+    """Set absolute counts, inserting rows that do not exist yet"""
+    dialect = db.session.get_bind().dialect.name
+    for (schedule_id, journey_date, seat_type), (available, occupied) in counts.items():
+        values = {
+            'schedule_id': schedule_id,
+            'journey_date': journey_date,
+            'seat_type': seat_type,
+            'available': available,
+            'occupied': occupied
+        }
+        if dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert
+            stmt = insert(SeatInventory).values(**values)
+            stmt = stmt.on_duplicate_key_update(available=available, occupied=occupied)
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(SeatInventory).values(**values).on_conflict_do_update(
+                index_elements=['schedule_id', 'journey_date', 'seat_type'],
+                set_={'available': available, 'occupied': occupied}
+            )
+        else:
+            db.session.merge(SeatInventory(**values))
+            continue
+        db.session.execute(stmt)
+
+
+def get_inventory(schedule_id, journey_date):
+    """Counter rows for one schedule and date"""
+    return SeatInventory.query.filter_by(
+        schedule_id=schedule_id,
+        journey_date=journey_date
+    ).order_by(SeatInventory.seat_type).all()
+
+
+def get_available_counts(schedule_ids, journey_date):
+    """Total available seats per schedule for a date, in one query"""
+    if not schedule_ids:
+        return {}
+    rows = db.session.execute(
+        select(SeatInventory.schedule_id, func.sum(SeatInventory.available))
+        .where(
+            SeatInventory.schedule_id.in_(schedule_ids),
+            SeatInventory.journey_date == journey_date
+        )
+        .group_by(SeatInventory.schedule_id)
+    )
+    return {schedule_id: int(available) for schedule_id, available in rows}
+
+
+def check_inventory(repair=False):
+    """Recompute every counter from the seat table in bulk and report drift.
+
+    With repair=True the counters are overwritten with the recomputed values
+    and counter rows with no seats left are zeroed. The caller commits.
+    """
+    expected = _count_seats()
+    stored = {
+        (row.schedule_id, row.journey_date, row.seat_type): (row.available, row.occupied)
+        for row in SeatInventory.query.all()
+    }
+
+    drift = []
+    fixes = {}
+    for key in sorted(set(expected) | set(stored)):
+        want = expected.get(key, (0, 0))
+        have = stored.get(key)
+        if have == want or (have is None and want == (0, 0)):
+            continue
+        schedule_id, journey_date, seat_type = key
+        drift.append({
+            'schedule_id': schedule_id,
+            'journey_date': journey_date.isoformat(),
+            'seat_type': seat_type,
+            'expected': {'available': want[0], 'occupied': want[1]},
+            'stored': {'available': have[0], 'occupied': have[1]} if have else None
+        })
+        fixes[key] = want
+
+    if repair and fixes:
+        _upsert_counts(fixes)
+
+    return drift
@@ -0,0 +1,313 @@
+"""
+Background Jobs - a database-backed queue for work that should not hold a
+request thread
+
+enqueue() adds a row to the jobs table in the caller's transaction, so a job
+exists exactly when the request that queued it commits. The worker
+(worker.py) claims due jobs in batches, highest priority first, and runs
+each handler registered with @job. A handler's database changes are
+committed together with the job's 'done' status; a handler that raises is
+retried with exponential backoff until max_attempts, then marked failed.
+
+Claiming selects due job ids and flips them to 'running' with an UPDATE
+that re-checks status = 'queued', so two workers never run the same job.
+Where the database has SELECT ... FOR UPDATE SKIP LOCKED (MySQL 8,
+MariaDB 10.6, PostgreSQL) the select also skips rows another worker is
+claiming instead of waiting on them; MySQL 5.7 relies on the UPDATE alone.
+A running job whose lease lapses (the worker died) is queued again by the
+sweeper. While a handler runs, a LeaseKeeper thread renews the lease, so
+a slow job is not taken for dead. A job is finished with an UPDATE that
+checks it is still locked by this worker, in the handler's transaction. If
+the lease was lost anyway (the worker stalled for longer than the lease),
+the handler's changes are rolled back and the job is left to its new owner.
+"""
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, update, delete
+from models import db, Job
+
+logger = logging.getLogger(__name__)
+
+# Handlers by job name, filled in by @job
+JOBS = {}
+
+
+class JobHandler:
+    """A registered job function and its defaults"""
+
+    def __init__(self, name, func, max_attempts, batched):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+        self.batched = batched
+
+
+def job(name, max_attempts=3, batched=False):
+    """Register a job handler.
+
+    The handler gets the job's payload (a list of payloads if batched, and
+    then returns a list of results) and runs in an app context; it does not
+    commit.
+    """
+    def register(func):
+        JOBS[name] = JobHandler(name, func, max_attempts, batched)
+        return func
+    return register
+
+
+def enqueue(name, payload=None, priority=0, delay_seconds=0, max_attempts=None):
+    """Queue a job in the current transaction and return it (the caller commits)"""
+    if name not in JOBS:
+        raise ValueError(f'Unknown job: {name}')
+    record = Job(
+        name=name,
+        payload=payload,
+        priority=priority,
+        max_attempts=max_attempts or JOBS[name].max_attempts,
+        run_at=datetime.utcnow() + timedelta(seconds=delay_seconds)
+    )
+    db.session.add(record)
+    return record
+
+
+def supports_skip_locked(engine):
+    """Whether the database accepts FOR UPDATE SKIP LOCKED"""
+    setting = current_app.config.get('JOB_SKIP_LOCKED', 'auto')
+    if setting != 'auto':
+        return setting == 'true'
+    dialect = engine.dialect
+    if dialect.name == 'postgresql':
+        return True
+    if dialect.name != 'mysql':
+        return False
+    version = dialect.server_version_info or (0,)
+    if getattr(dialect, 'is_mariadb', False):
+        return version >= (10, 6)
+    return version >= (8, 0, 1)
+
+
+def claim_jobs(worker_id, limit, now=None):
+    """Mark up to `limit` due jobs as running for worker_id and return them"""
+    now = now or datetime.utcnow()
+    query = select(Job.id).where(
+        Job.status == 'queued',
+        Job.run_at <= now
+    ).order_by(Job.priority.desc(), Job.run_at, Job.id).limit(limit)
+    if supports_skip_locked(db.engine):
+        query = query.with_for_update(skip_locked=True)
+
+    job_ids = db.session.execute(query).scalars().all()
+    if not job_ids:
+        db.session.rollback()
+        return []
+
+    lease = timedelta(seconds=current_app.config['JOB_LEASE_SECONDS'])
+    db.session.execute(
+        update(Job)
+        .where(Job.id.in_(job_ids), Job.status == 'queued')
+        .values(status='running', locked_by=worker_id, locked_until=now + lease,
+                attempts=Job.attempts + 1, started_at=now)
+    )
+    db.session.commit()
+
+    return Job.query.filter(
+        Job.id.in_(job_ids),
+        Job.status == 'running',
+        Job.locked_by == worker_id
+    ).order_by(Job.priority.desc(), Job.run_at, Job.id).all()
+
+
+class LeaseLost(Exception):
+    """Raised when a job's lease passed to another worker while it ran"""
+
+
+def renew_leases(connection, job_ids, worker_id, lease_seconds, now=None):
+    """Push back the lease of running jobs still locked by worker_id; returns how many"""
+    now = now or datetime.utcnow()
+    return connection.execute(
+        update(Job)
+        .where(Job.id.in_(job_ids), Job.status == 'running', Job.locked_by == worker_id)
+        .values(locked_until=now + timedelta(seconds=lease_seconds))
+    ).rowcount
+
+
+class LeaseKeeper(threading.Thread):
+    """Renews the lease of jobs while their handler runs, on its own connection"""
+
+    def __init__(self, engine, job_ids, worker_id, lease_seconds):
+        super().__init__(name='job-lease', daemon=True)
+        self.engine = engine
+        self.job_ids = job_ids
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.lease_seconds / 3):
+            try:
+                with self.engine.begin() as connection:
+                    renew_leases(connection, self.job_ids, self.worker_id, self.lease_seconds)
+            except Exception:
+                logger.exception('Could not renew the lease of jobs %s', self.job_ids)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def _finish(record, result, worker_id, now):
+    """Mark a job done if worker_id still holds it (the caller commits)"""
+    finished = db.session.execute(
+        update(Job)
+        .where(Job.id == record.id, Job.status == 'running', Job.locked_by == worker_id)
+        .values(status='done', result=result, locked_by=None, locked_until=None, finished_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if finished != 1:
+        raise LeaseLost(f'Job {record.id} is no longer locked by {worker_id}')
+
+
+def _fail(job_id, error, now, retry=True, worker_id=None):
+    """Queue the job again after a backoff, or mark it failed after its last attempt"""
+    record = db.session.get(Job, job_id)
+    if worker_id and (record.status != 'running' or record.locked_by != worker_id):
+        db.session.rollback()  # another worker owns it now
+        return
+    record.last_error = error[:2000]
+    record.locked_by = None
+    record.locked_until = None
+    if retry and record.attempts < record.max_attempts:
+        backoff = current_app.config['JOB_RETRY_BACKOFF_SECONDS'] * 2 ** (record.attempts - 1)
+        record.status = 'queued'
+        record.run_at = now + timedelta(seconds=backoff)
+    else:
+        record.status = 'failed'
+        record.finished_at = now
+    db.session.commit()
+
+
+def _run(handler, records, worker_id):
+    """Run one handler call for records (one record unless batched)"""
+    job_ids = [record.id for record in records]
+    keeper = LeaseKeeper(db.engine, job_ids, worker_id, current_app.config['JOB_LEASE_SECONDS'])
+    keeper.start()
+    try:
+        if handler.batched:
+            results = handler.func([record.payload for record in records])
+            if len(results) != len(records):
+                raise ValueError(f'{handler.name} returned {len(results)} results for {len(records)} jobs')
+        else:
+            results = [handler.func(records[0].payload)]
+        keeper.stop()
+        now = datetime.utcnow()
+        for record, result in zip(records, results):
+            _finish(record, result, worker_id, now)
+        db.session.commit()
+    except LeaseLost as e:
+        db.session.rollback()
+        logger.warning('Job %s %s discarded: %s', handler.name, job_ids, e)
+    except Exception as e:
+        keeper.stop()
+        db.session.rollback()
+        logger.exception('Job %s %s failed', handler.name, job_ids)
+        now = datetime.utcnow()
+        for job_id in job_ids:
+            _fail(job_id, f'{type(e).__name__}: {e}', now, worker_id=worker_id)
+
+
+def run_jobs(records, worker_id):
+    """Run jobs claimed by worker_id; batched handlers get all their claimed jobs in one call"""
+    batches = {}
+    for record in records:
+        handler = JOBS.get(record.name)
+        if handler is None:
+            _fail(record.id, f'No handler for job {record.name}', datetime.utcnow(), retry=False,
+                  worker_id=worker_id)
+        elif handler.batched:
+            batches.setdefault(handler.name, []).append(record)
+        else:
+            _run(handler, [record], worker_id)
+    for name, batch in batches.items():
+        _run(JOBS[name], batch, worker_id)
+
+
+def run_pending(app, worker_id=None, limit=None):
+    """Claim and run one batch of due jobs; returns how many were claimed"""
+    with app.app_context():
+        try:
+            worker_id = worker_id or default_worker_id()
+            records = claim_jobs(worker_id, limit or app.config['JOB_BATCH_SIZE'])
+            run_jobs(records, worker_id)
+            return len(records)
+        finally:
+            db.session.remove()
+
+
+def default_worker_id():
+    """host:pid:thread, unique per worker thread"""
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'[:64]
+
+
+def work(app, stop_event, worker_id=None):
+    """Run jobs until stop_event is set, polling when the queue is empty"""
+    worker_id = worker_id or default_worker_id()
+    poll = app.config['JOB_POLL_SECONDS']
+    while not stop_event.is_set():
+        try:
+            claimed = run_pending(app, worker_id)
+        except Exception:
+            logger.exception('Job worker %s could not poll the queue', worker_id)
+            claimed = 0
+        if not claimed:
+            stop_event.wait(poll)
+
+
+def requeue_stale_jobs(now=None):
+    """Queue again (or fail) running jobs whose worker lease lapsed"""
+    now = now or datetime.utcnow()
+    stale = (Job.status == 'running', Job.locked_until < now)
+    failed = db.session.execute(
+        update(Job)
+        .where(*stale, Job.attempts >= Job.max_attempts)
+        .values(status='failed', locked_by=None, locked_until=None, finished_at=now,
+                last_error='Worker lease expired')
+    ).rowcount
+    requeued = db.session.execute(
+        update(Job)
+        .where(*stale)
+        .values(status='queued', locked_by=None, locked_until=None, run_at=now)
+    ).rowcount
+    db.session.commit()
+    return requeued + failed
+
+
+def purge_finished_jobs(batch_size=500, now=None):
+    """Delete done and failed jobs past the retention period, in batches"""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(hours=current_app.config['JOB_RETENTION_HOURS'])
+    purged = 0
+
+    while True:
+        job_ids = db.session.execute(
+            select(Job.id).where(Job.finished_at < cutoff).limit(batch_size)
+        ).scalars().all()
+        if not job_ids:
+            break
+
+        result = db.session.execute(delete(Job).where(Job.id.in_(job_ids)))
+        db.session.commit()
+        purged += result.rowcount
+
+        if len(job_ids) < batch_size:
+            break
+
+    return purged
+
+
+def sweep_jobs():
+    """Sweeper task: requeue jobs of dead workers and purge old finished jobs"""
+    return requeue_stale_jobs() + purge_finished_jobs(current_app.config['SWEEPER_BATCH_SIZE'])
@@ -0,0 +1,165 @@
+"""
+Application Metrics - Prometheus metrics exposed at /metrics
+
+Recorded per request: request count and latency by blueprint/endpoint/status,
+number of SQL statements and time spent in the database (from the request's
+query_profiler.QueryProfile). Connection pool
+gauges and counters are copied from db_pool.PoolStats at most once a second
+per worker.
+
+Under gunicorn set PROMETHEUS_MULTIPROC_DIR (before the app is imported) so
+every worker writes its samples to memory-mapped files in that directory;
+/metrics then aggregates all workers, whichever one serves the scrape. The
+directory is wiped on startup and dead workers are marked in
+gunicorn.conf.py.
+"""
+import os
+import time
+from flask import Blueprint, Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess
+)
+from db_pool import InstrumentedQueuePool
+from query_profiler import QueryProfile
+
+LABELS = ['method', 'blueprint', 'endpoint', 'status']
+ENDPOINT_LABELS = ['blueprint', 'endpoint']
+
+REQUESTS = Counter(
+    'train_http_requests_total', 'HTTP requests', LABELS
+)
+REQUEST_LATENCY = Histogram(
+    'train_http_request_duration_seconds', 'HTTP request latency', LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+REQUEST_QUERIES = Histogram(
+    'train_http_request_db_queries', 'SQL statements per request', ENDPOINT_LABELS,
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+REQUEST_DB_TIME = Histogram(
+    'train_http_request_db_seconds', 'Time spent in the database per request', ENDPOINT_LABELS,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+POOL_CONNECTIONS = Gauge(
+    'train_db_pool_connections', 'Pool connections by state', ['state'],
+    multiprocess_mode='livesum'
+)
+POOL_COUNTERS = {
+    name: Counter(f'train_db_pool_{name}_total', description)
+    for name, description in (
+        ('checkouts', 'Connection checkouts'),
+        ('timeouts', 'Checkouts that timed out waiting for a connection'),
+        ('connects', 'New DBAPI connections opened'),
+        ('invalidations', 'Connections invalidated (failed pre-ping, errors)')
+    )
+}
+POOL_WAIT = Counter(
+    'train_db_pool_checkout_wait_seconds_total', 'Time spent checking out connections'
+)
+POOL_SYNC_SECONDS = 1.0
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of all metrics"""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+class _PoolSync:
+    """Turns cumulative PoolStats into Prometheus counter increments"""
+
+    def __init__(self):
+        self.last_sync = 0.0
+        self.reported = {}
+
+    def sync(self, engine):
+        now = time.monotonic()
+        if now - self.last_sync < POOL_SYNC_SECONDS:
+            return
+        self.last_sync = now
+        pool = engine.pool
+        if not isinstance(pool, InstrumentedQueuePool):
+            return
+
+        POOL_CONNECTIONS.labels('in_use').set(pool.checkedout())
+        POOL_CONNECTIONS.labels('checked_in').set(pool.checkedin())
+        POOL_CONNECTIONS.labels('overflow').set(max(pool.overflow(), 0))
+
+        stats = pool.stats
+        current = {name: getattr(stats, name) for name in POOL_COUNTERS}
+        current['wait_seconds_total'] = stats.wait_seconds_total
+        reported = self.reported.get(id(stats), {})
+        for name, counter in POOL_COUNTERS.items():
+            delta = current[name] - reported.get(name, 0)
+            if delta > 0:
+                counter.inc(delta)
+        wait_delta = current['wait_seconds_total'] - reported.get('wait_seconds_total', 0.0)
+        if wait_delta > 0:
+            POOL_WAIT.inc(wait_delta)
+        self.reported[id(stats)] = current
+
+
+_pool_sync = _PoolSync()
+
+# Labelled children per (method, blueprint, endpoint, status), so the hot path
+# skips the label lookups; endpoints come from the URL map, so this is bounded
+_children = {}
+
+
+def _label_children(key):
+    method, blueprint, endpoint, status = key
+    return (
+        REQUESTS.labels(method, blueprint, endpoint, status),
+        REQUEST_LATENCY.labels(method, blueprint, endpoint, status),
+        REQUEST_QUERIES.labels(blueprint, endpoint),
+        REQUEST_DB_TIME.labels(blueprint, endpoint)
+    )
+
+
+def record_request(method, blueprint, endpoint, status, seconds, queries=None, db_seconds=None):
+    """Record one request; query count and DB time are optional"""
+    key = (method, blueprint or '', endpoint or 'unmatched', str(status))
+    children = _children.get(key)
+    if children is None:
+        children = _children.setdefault(key, _label_children(key))
+    requests_total, latency, query_count, db_time = children
+
+    requests_total.inc()
+    latency.observe(seconds)
+    if queries is not None:
+        query_count.observe(queries)
+        db_time.observe(db_seconds)
+
+
+def init_metrics(app, db):
+    """Register request hooks and the /metrics endpoint"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    @app.before_request
+    def start_request_metrics():
+        g._request_started = time.perf_counter()
+        if g.get('_query_profile') is None:
+            g._query_profile = QueryProfile()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.get('_request_started')
+        if started is None or request.endpoint == 'metrics.get_metrics':
+            return response
+        profile = g._query_profile
+        record_request(request.method, request.blueprint, request.endpoint, response.status_code,
+                       time.perf_counter() - started, profile.count, profile.seconds)
+        _pool_sync.sync(db.engine)
+        return response
+
+    app.register_blueprint(metrics_bp)
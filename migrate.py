@@ -1,10 +1,34 @@
+"""
+Apply pending schema migrations (see migrations/)
+
+Usage: python migrate.py [--target VERSION] [--list]
+"""
+import argparse
 from app import create_app
 from app import db
+from migrations import applied_versions, discover, upgrade
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply pending schema migrations')
+    parser.add_argument('--target', type=int, help='stop after this version')
+    parser.add_argument('--list', action='store_true', help='show migrations and whether they are applied')
+    args = parser.parse_args()
+
+    app = create_app(start_background=False)
+    with app.app_context():
+        if args.list:
+            with db.engine.connect() as connection:
+                done = applied_versions(connection)
+            for version, module in discover():
+                status = 'applied' if version in done else 'pending'
+                print(f'{version:04d} {status:8} {module.__doc__.strip().splitlines()[0]}')
+            return
 
-app = create_app()
+        print("Running DB migrations...")
+        applied = upgrade(db.engine, target=args.target)
+        print(f"Migrations completed ({len(applied)} applied).")
 
-with app.app_context():
-    print("Running DB migrations...")
-    db.create_all()
-    print("Migrations completed.")
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""
+Schema Migrations - versioned, forward-only migration scripts
+
+Every module in this package named vNNNN_<description>.py is one migration
+with an `upgrade(connection)` function; NNNN is its version. Applied
+versions are recorded in the schema_migrations table and pending ones run
+in order, each followed by a commit of its version row. That commit is not
+atomic with the migration on MySQL, where every DDL statement commits
+implicitly: a crash between a migration's DDL and its version row leaves
+the change applied but unrecorded, and the migration runs again.
+There are no downgrades: a bad migration is fixed by a later one.
+
+Every script must therefore be idempotent, also when a previous run
+stopped halfway. v0001 creates whatever tables are missing from the current
+models, so a fresh database already has the changes of later scripts too;
+the helpers below check before they alter. On MySQL, DDL runs as
+online ALTERs (ALGORITHM=INPLACE, LOCK=NONE) so the app keeps reading and
+writing, and data changes on large tables go through `chunks()`, which
+commits after every batch so no long transaction holds row locks.
+
+At startup the app only compares MAX(version) with the newest script here.
+"""
+import importlib
+import pkgutil
+from datetime import datetime
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, and_, func, inspect, or_, select, text
+)
+from sqlalchemy.exc import DBAPIError
+
+CHUNK_SIZE = 500
+LOCK_NAME = 'schema_migrations'
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations', metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+
+def _script_names():
+    return sorted(
+        info.name for info in pkgutil.iter_modules(__path__)
+        if info.name[:1] == 'v' and info.name[1:5].isdigit()
+    )
+
+
+def discover():
+    """(version, module) for every migration script, oldest first"""
+    return [(int(name[1:5]), importlib.import_module(f'{__name__}.{name}')) for name in _script_names()]
+
+
+def latest_version():
+    """Version of the newest script, without importing any of them"""
+    names = _script_names()
+    return int(names[-1][1:5]) if names else 0
+
+
+def schema_version(connection):
+    """Highest applied version in one query; 0 if migrations never ran"""
+    try:
+        return connection.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+    except DBAPIError:
+        connection.rollback()
+        return 0
+
+
+def applied_versions(connection):
+    """Versions recorded in schema_migrations (empty if the table is missing)"""
+    if not inspect(connection).has_table('schema_migrations'):
+        return set()
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def upgrade(engine, target=None, log=print):
+    """Apply pending migrations up to `target` (default: all); returns the versions applied"""
+    with engine.connect() as connection:
+        mysql = connection.dialect.name == 'mysql'
+        if mysql:
+            # One migrator at a time, e.g. when several deploy jobs start together
+            if not connection.execute(text('SELECT GET_LOCK(:name, 600)'), {'name': LOCK_NAME}).scalar():
+                raise RuntimeError('Timed out waiting for the migration lock')
+        try:
+            metadata.create_all(connection)
+            connection.commit()
+            done = applied_versions(connection)
+
+            applied = []
+            for version, module in discover():
+                if version in done or (target is not None and version > target):
+                    continue
+                description = (module.__doc__ or module.__name__).strip().splitlines()[0]
+                log(f'Applying {version:04d}: {description}')
+                module.upgrade(connection)
+                connection.execute(schema_migrations.insert().values(
+                    version=version, description=description[:200], applied_at=datetime.utcnow()
+                ))
+                connection.commit()
+                applied.append(version)
+            return applied
+        finally:
+            if mysql:
+                connection.execute(text('SELECT RELEASE_LOCK(:name)'), {'name': LOCK_NAME})
+
+
+def _online(connection, ddl):
+    if connection.dialect.name == 'mysql':
+        ddl += ', ALGORITHM=INPLACE, LOCK=NONE'
+    connection.execute(text(ddl))
+
+
+def create_index(connection, table, name, columns, unique=False):
+    """Add an index unless one with that name exists; returns True if created"""
+    if name in {index['name'] for index in inspect(connection).get_indexes(table)}:
+        return False
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    if connection.dialect.name == 'mysql':
+        _online(connection, f'ALTER TABLE {table} ADD {kind} {name} ({", ".join(columns)})')
+    else:
+        connection.execute(text(f'CREATE {kind} {name} ON {table} ({", ".join(columns)})'))
+    return True
+
+
+def add_column(connection, table, name, definition):
+    """Add a column unless it exists; `definition` is the DDL after the name"""
+    if name in {column['name'] for column in inspect(connection).get_columns(table)}:
+        return False
+    _online(connection, f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+    return True
+
+
+def chunks(connection, keys, batch_size=None):
+    """Yield batches of rows from `keys`, committing after each batch.
+
+    `keys` is a select of the columns to page by (unique together); batches
+    are fetched by keyset pagination in that column order, so each is an
+    index range scan however far the migration has got. Work done on a
+    batch is committed before the next one is read.
+    """
+    batch_size = batch_size or CHUNK_SIZE
+    columns = list(keys.selected_columns)
+    last = None
+    while True:
+        query = keys.order_by(*columns).limit(batch_size)
+        if last is not None:
+            query = query.where(_after(columns, last))
+        batch = connection.execute(query).all()
+        if not batch:
+            return
+        yield batch
+        connection.commit()
+        last = tuple(batch[-1])
+
+
+def _after(columns, values):
+    """(a, b, ...) > (x, y, ...) spelled out, which every dialect can use an index for"""
+    first, rest = columns[0], columns[1:]
+    if not rest:
+        return first > values[0]
+    return or_(first > values[0], and_(first == values[0], _after(rest, values[1:])))
@@ -0,0 +1,6 @@
+"""Create missing tables from the models (the schema create_all used to build)"""
+from models import db
+
+
+def upgrade(connection):
+    db.metadata.create_all(connection, checkfirst=True)
@@ -0,0 +1,18 @@
+"""Composite indexes for seat and ticket lookups on the booking paths
+
+seats (schedule_id, journey_date, seat_number) is already covered by the
+unique_seat_schedule_date constraint and tickets.pnr_number by its unique
+index, so only the missing access paths are added.
+"""
+from migrations import create_index
+
+
+def upgrade(connection):
+    # First free seat for a booking, free seat counts for a schedule/date
+    create_index(connection, 'seats', 'ix_seats_schedule_date_available',
+                 ['schedule_id', 'journey_date', 'is_available'])
+    # "My tickets"
+    create_index(connection, 'tickets', 'ix_tickets_user_id', ['user_id'])
+    # Manifests and occupancy per departure
+    create_index(connection, 'tickets', 'ix_tickets_schedule_date_status',
+                 ['schedule_id', 'journey_date', 'status'])
@@ -0,0 +1,34 @@
+"""Seat hold and segment columns on databases created before they existed
+
+Older deployments built `seats` and `tickets` with create_all before seat
+holds and segment booking, and create_all never alters existing tables.
+All new columns are nullable or have a default, so they are added online
+without backfilling; every existing seat is whole-route (segment_mask 0).
+"""
+from sqlalchemy import inspect, text
+from migrations import add_column, create_index
+
+
+def upgrade(connection):
+    add_column(connection, 'seats', 'segment_mask', 'BIGINT NOT NULL DEFAULT 0')
+    add_column(connection, 'seats', 'hold_token', 'VARCHAR(32) NULL')
+    add_column(connection, 'seats', 'held_by', 'INTEGER NULL REFERENCES users (id) ON DELETE SET NULL')
+    held_by_keys = [key for key in inspect(connection).get_foreign_keys('seats')
+                    if key['constrained_columns'] == ['held_by']]
+    if connection.dialect.name == 'mysql' and not held_by_keys:
+        # MySQL ignores inline REFERENCES; the constraint is only added online
+        # with foreign key checks off (held_by only ever holds user ids)
+        connection.execute(text('SET foreign_key_checks = 0'))
+        try:
+            connection.execute(text(
+                'ALTER TABLE seats ADD CONSTRAINT fk_seats_held_by FOREIGN KEY (held_by) '
+                'REFERENCES users (id) ON DELETE SET NULL, ALGORITHM=INPLACE, LOCK=NONE'
+            ))
+        finally:
+            connection.execute(text('SET foreign_key_checks = 1'))
+    add_column(connection, 'seats', 'held_until', 'DATETIME NULL')
+    create_index(connection, 'seats', 'ix_seats_hold_token', ['hold_token'])
+    create_index(connection, 'seats', 'ix_seats_held_until', ['held_until'])
+
+    add_column(connection, 'tickets', 'from_stop', 'SMALLINT NULL')
+    add_column(connection, 'tickets', 'to_stop', 'SMALLINT NULL')
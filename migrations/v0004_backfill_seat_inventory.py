@@ -0,0 +1,34 @@
+"""Backfill seat_inventory counters for departures that have none
+
+Runs in chunks of departures (schedule_id, journey_date) so the seats
+table is never locked as a whole. Rows the app seeded meanwhile are kept:
+inserts skip existing keys.
+"""
+from sqlalchemy import case, column, func, insert, select, table, tuple_
+from migrations import chunks
+
+seats = table('seats', column('schedule_id'), column('journey_date'), column('seat_type'),
+              column('is_available'))
+seat_inventory = table('seat_inventory', column('schedule_id'), column('journey_date'),
+                       column('seat_type'), column('available'), column('occupied'))
+
+
+def upgrade(connection):
+    departures = select(seats.c.schedule_id, seats.c.journey_date).distinct()
+    for batch in chunks(connection, departures):
+        counts = select(
+            seats.c.schedule_id,
+            seats.c.journey_date,
+            seats.c.seat_type,
+            func.sum(case((seats.c.is_available == True, 1), else_=0)),  # noqa: E712
+            func.sum(case((seats.c.is_available == True, 0), else_=1))  # noqa: E712
+        ).where(
+            tuple_(seats.c.schedule_id, seats.c.journey_date).in_([tuple(row) for row in batch])
+        ).group_by(seats.c.schedule_id, seats.c.journey_date, seats.c.seat_type)
+
+        connection.execute(
+            insert(seat_inventory)
+            .from_select(['schedule_id', 'journey_date', 'seat_type', 'available', 'occupied'], counts)
+            .prefix_with('IGNORE', dialect='mysql')
+            .prefix_with('OR IGNORE', dialect='sqlite')
+        )
@@ -0,0 +1,10 @@
+"""Background job queue table (jobs.py)
+
+A new table, so creating it is online; databases built after the model
+was added already have it.
+"""
+from models import Job
+
+
+def upgrade(connection):
+    Job.__table__.create(connection, checkfirst=True)
@@ -0,0 +1,11 @@
+"""Outbox tables for webhook delivery of domain events (outbox.py)
+
+New tables only, so this is online; databases built after the models
+were added already have them.
+"""
+from models import OutboxEvent, OutboxCursor
+
+
+def upgrade(connection):
+    OutboxEvent.__table__.create(connection, checkfirst=True)
+    OutboxCursor.__table__.create(connection, checkfirst=True)
@@ -0,0 +1,6 @@
+"""Index for finding pending tickets by age (unpaid ticket expiry)"""
+from migrations import create_index
+
+
+def upgrade(connection):
+    create_index(connection, 'tickets', 'ix_tickets_status_created', ['status', 'created_at'])
@@ -0,0 +1,6 @@
+"""Lease column for in-flight idempotency keys"""
+from migrations import add_column
+
+
+def upgrade(connection):
+    add_column(connection, 'idempotency_keys', 'locked_until', 'DATETIME NULL')
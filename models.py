@@ -4,8 +4,10 @@ SQLAlchemy Models for Train Booking System
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
+from replicas import RoutingSession
+from serializers import column_serializer
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     """User model for authentication and profile management"""
@@ -33,17 +35,9 @@ class User(db.Model):
         """Verify password"""
         return check_password_hash(self.password_hash, password)
     
-    def to_dict(self):
-        """Convert model to dictionary"""
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'full_name': self.full_name,
-            'phone': self.phone,
-            'role': self.role,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    to_dict = column_serializer(
+        'id', 'username', 'email', 'full_name', 'phone', 'role', 'created_at'
+    )
 
 
 class Train(db.Model):
@@ -62,17 +56,9 @@ class Train(db.Model):
     # Relationships
     schedules = db.relationship('Schedule', backref='train', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
-        """Convert model to dictionary"""
-        return {
-            'id': self.id,
-            'train_number': self.train_number,
-            'train_name': self.train_name,
-            'train_type': self.train_type,
-            'total_seats': self.total_seats,
-            'status': self.status,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    to_dict = column_serializer(
+        'id', 'train_number', 'train_name', 'train_type', 'total_seats', 'status', 'created_at'
+    )
 
 
 class Route(db.Model):
@@ -91,19 +77,34 @@ class Route(db.Model):
     
     # Relationships
     schedules = db.relationship('Schedule', backref='route', lazy=True, cascade='all, delete-orphan')
+    stops = db.relationship('RouteStop', backref='route', lazy=True, cascade='all, delete-orphan',
+                            order_by='RouteStop.stop_order')
     
-    def to_dict(self):
+    _column_dict = column_serializer(
+        'id', 'route_name', 'source_station', 'destination_station', 'distance_km', 'duration_hours',
+        'status', 'created_at'
+    )
+    
+    def to_dict(self, include_stops=False):
         """Convert model to dictionary"""
-        return {
-            'id': self.id,
-            'route_name': self.route_name,
-            'source_station': self.source_station,
-            'destination_station': self.destination_station,
-            'distance_km': float(self.distance_km) if self.distance_km else 0,
-            'duration_hours': float(self.duration_hours) if self.duration_hours else 0,
-            'status': self.status,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+        data = self._column_dict()
+        if include_stops:
+            data['stops'] = [stop.station_name for stop in self.stops]
+        return data
+
+
+class RouteStop(db.Model):
+    """Intermediate station on a route, in travel order"""
+    __tablename__ = 'route_stops'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    route_id = db.Column(db.Integer, db.ForeignKey('routes.id', ondelete='CASCADE'), nullable=False)
+    stop_order = db.Column(db.SmallInteger, nullable=False)
+    station_name = db.Column(db.String(100), nullable=False, index=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('route_id', 'stop_order', name='unique_route_stop_order'),
+    )
 
 
 class Schedule(db.Model):
@@ -124,24 +125,22 @@ class Schedule(db.Model):
     # Relationships
     tickets = db.relationship('Ticket', backref='schedule', lazy=True, cascade='all, delete-orphan')
     seats = db.relationship('Seat', backref='schedule', lazy=True, cascade='all, delete-orphan')
+    inventory = db.relationship('SeatInventory', lazy=True, cascade='all, delete-orphan')
+    
+    _column_dict = column_serializer(
+        'id', 'train_id', 'route_id', 'departure_time', 'arrival_time', 'frequency', 'base_fare',
+        'status', 'created_at'
+    )
     
     def to_dict(self):
         """Convert model to dictionary"""
-        return {
-            'id': self.id,
-            'train_id': self.train_id,
-            'route_id': self.route_id,
-            'train_name': self.train.train_name if self.train else None,
-            'train_number': self.train.train_number if self.train else None,
-            'source_station': self.route.source_station if self.route else None,
-            'destination_station': self.route.destination_station if self.route else None,
-            'departure_time': self.departure_time.isoformat() if self.departure_time else None,
-            'arrival_time': self.arrival_time.isoformat() if self.arrival_time else None,
-            'frequency': self.frequency,
-            'base_fare': float(self.base_fare) if self.base_fare else 0,
-            'status': self.status,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+        data = self._column_dict()
+        train, route = self.train, self.route
+        data['train_name'] = train.train_name if train else None
+        data['train_number'] = train.train_number if train else None
+        data['source_station'] = route.source_station if route else None
+        data['destination_station'] = route.destination_station if route else None
+        return data
 
 
 class Ticket(db.Model):
@@ -149,7 +148,7 @@ class Ticket(db.Model):
     __tablename__ = 'tickets'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     schedule_id = db.Column(db.Integer, db.ForeignKey('schedules.id', ondelete='CASCADE'), nullable=False)
     booking_date = db.Column(db.Date, nullable=False)
     journey_date = db.Column(db.Date, nullable=False, index=True)
@@ -157,6 +156,8 @@ class Ticket(db.Model):
     passenger_age = db.Column(db.Integer, nullable=False)
     passenger_gender = db.Column(db.Enum('male', 'female', 'other', name='gender_types'), nullable=False)
     seat_number = db.Column(db.String(10))
+    from_stop = db.Column(db.SmallInteger)  # NULL means the whole route
+    to_stop = db.Column(db.SmallInteger)
     fare = db.Column(db.Numeric(10, 2), nullable=False)
     status = db.Column(db.Enum('confirmed', 'cancelled', 'pending', 'waitlisted', name='ticket_status'), default='pending')
     pnr_number = db.Column(db.String(20), unique=True, nullable=False, index=True)
@@ -167,23 +168,16 @@ class Ticket(db.Model):
     payments = db.relationship('Payment', backref='ticket', lazy=True, cascade='all, delete-orphan')
     seat = db.relationship('Seat', backref='ticket', lazy=True, uselist=False)
     
-    def to_dict(self):
-        """Convert model to dictionary"""
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'schedule_id': self.schedule_id,
-            'booking_date': self.booking_date.isoformat() if self.booking_date else None,
-            'journey_date': self.journey_date.isoformat() if self.journey_date else None,
-            'passenger_name': self.passenger_name,
-            'passenger_age': self.passenger_age,
-            'passenger_gender': self.passenger_gender,
-            'seat_number': self.seat_number,
-            'fare': float(self.fare) if self.fare else 0,
-            'status': self.status,
-            'pnr_number': self.pnr_number,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    __table_args__ = (
+        db.Index('ix_tickets_schedule_date_status', 'schedule_id', 'journey_date', 'status'),
+        db.Index('ix_tickets_status_created', 'status', 'created_at'),
+    )
+    
+    to_dict = column_serializer(
+        'id', 'user_id', 'schedule_id', 'booking_date', 'journey_date', 'passenger_name',
+        'passenger_age', 'passenger_gender', 'seat_number', 'from_stop', 'to_stop', 'fare', 'status',
+        'pnr_number', 'created_at'
+    )
 
 
 class Seat(db.Model):
@@ -196,26 +190,38 @@ class Seat(db.Model):
     seat_number = db.Column(db.String(10), nullable=False)
     seat_type = db.Column(db.Enum('sleeper', 'AC', 'general', 'first_class', name='seat_types'), nullable=False)
     is_available = db.Column(db.Boolean, default=True, index=True)
+    segment_mask = db.Column(db.BigInteger, nullable=False, default=0)  # bit i set = segment i sold
     ticket_id = db.Column(db.Integer, db.ForeignKey('tickets.id', ondelete='SET NULL'))
+    hold_token = db.Column(db.String(32), index=True)
+    held_by = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'))
+    held_until = db.Column(db.DateTime, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     __table_args__ = (
         db.UniqueConstraint('schedule_id', 'journey_date', 'seat_number', name='unique_seat_schedule_date'),
+        db.Index('ix_seats_schedule_date_available', 'schedule_id', 'journey_date', 'is_available'),
     )
     
-    def to_dict(self):
-        """Convert model to dictionary"""
-        return {
-            'id': self.id,
-            'schedule_id': self.schedule_id,
-            'journey_date': self.journey_date.isoformat() if self.journey_date else None,
-            'seat_number': self.seat_number,
-            'seat_type': self.seat_type,
-            'is_available': self.is_available,
-            'ticket_id': self.ticket_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    to_dict = column_serializer(
+        'id', 'schedule_id', 'journey_date', 'seat_number', 'seat_type', 'is_available', 'ticket_id',
+        'created_at'
+    )
+
+
+class SeatInventory(db.Model):
+    """Denormalized seat counts per schedule, journey date and seat type"""
+    __tablename__ = 'seat_inventory'
+    
+    schedule_id = db.Column(db.Integer, db.ForeignKey('schedules.id', ondelete='CASCADE'), primary_key=True)
+    journey_date = db.Column(db.Date, primary_key=True)
+    seat_type = db.Column(db.Enum('sleeper', 'AC', 'general', 'first_class', name='seat_types'), primary_key=True)
+    available = db.Column(db.Integer, nullable=False, default=0)
+    occupied = db.Column(db.Integer, nullable=False, default=0)
+    
+    to_dict = column_serializer(
+        'schedule_id', 'journey_date', 'seat_type', 'available', 'occupied'
+    )
 
 
 class Payment(db.Model):
@@ -232,16 +238,86 @@ class Payment(db.Model):
     payment_date = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
-        """Convert model to dictionary"""
-        return {
-            'id': self.id,
-            'ticket_id': self.ticket_id,
-            'user_id': self.user_id,
-            'amount': float(self.amount) if self.amount else 0,
-            'payment_method': self.payment_method,
-            'payment_status': self.payment_status,
-            'transaction_id': self.transaction_id,
-            'payment_date': self.payment_date.isoformat() if self.payment_date else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    to_dict = column_serializer(
+        'id', 'ticket_id', 'user_id', 'amount', 'payment_method', 'payment_status', 'transaction_id',
+        'payment_date', 'created_at'
+    )
+
+
+class IdempotencyKey(db.Model):
+    """Stored responses for retried write requests (Idempotency-Key header)"""
+    __tablename__ = 'idempotency_keys'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    idempotency_key = db.Column(db.String(64), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.SmallInteger)  # NULL while the first request is in flight
+    response_body = db.Column(db.Text)
+    locked_until = db.Column(db.DateTime)  # in-flight lease; past it the first request died
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'idempotency_key', name='unique_idempotency_user_key'),
+    )
+
+
+class Job(db.Model):
+    """Background job queued for the worker (jobs.py)"""
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON)
+    status = db.Column(db.Enum('queued', 'running', 'done', 'failed', name='job_status'), nullable=False, default='queued')
+    priority = db.Column(db.SmallInteger, nullable=False, default=0)  # higher runs first
+    attempts = db.Column(db.SmallInteger, nullable=False, default=0)
+    max_attempts = db.Column(db.SmallInteger, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(64))
+    locked_until = db.Column(db.DateTime)
+    result = db.Column(db.JSON)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime, index=True)
+    
+    __table_args__ = (
+        db.Index('ix_jobs_claim', 'status', 'priority', 'run_at'),
+    )
+    
+    to_dict = column_serializer(
+        'id', 'name', 'status', 'priority', 'attempts', 'max_attempts', 'run_at', 'result', 'last_error',
+        'created_at', 'started_at', 'finished_at'
+    )
+
+
+class OutboxEvent(db.Model):
+    """Domain event written in the transaction that caused it (outbox.py)"""
+    __tablename__ = 'outbox_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(64), nullable=False)
+    data = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    to_dict = column_serializer('id', 'event_type', 'data', 'created_at')
+
+
+class OutboxCursor(db.Model):
+    """Delivery position of one webhook in the outbox"""
+    __tablename__ = 'outbox_cursors'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(500), nullable=False, unique=True)
+    last_event_id = db.Column(db.Integer, nullable=False, default=0)
+    failures = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    locked_by = db.Column(db.String(64))
+    locked_until = db.Column(db.DateTime)
+    delivered_at = db.Column(db.DateTime)
+    
+    to_dict = column_serializer(
+        'url', 'last_event_id', 'failures', 'next_attempt_at', 'last_error', 'delivered_at'
+    )
@@ -0,0 +1,227 @@
+"""
+Transactional Outbox - domain events for webhooks (n8n workflows)
+
+record_event() adds a row to outbox_events in the caller's transaction, so
+an event exists exactly when the booking, cancellation or registration that
+caused it commits, and costs the request one INSERT in a transaction it
+already has. It sends nothing.
+
+The dispatcher (run by worker.py) delivers events to every URL in
+OUTBOX_WEBHOOK_URLS, oldest first, as POST {"events": [...]} batches of up
+to OUTBOX_BATCH_SIZE over pooled keep-alive connections. Each webhook has a
+cursor row with the last event id it acknowledged (any 2xx), so a failing
+webhook backs off (OUTBOX_BACKOFF_SECONDS doubling up to
+OUTBOX_MAX_BACKOFF_SECONDS) without holding up the others. Delivery is at
+least once: a batch that failed, or whose reply was lost, is sent again, so
+receivers should skip event ids they have seen. A dispatcher leases a
+cursor before sending, so two workers do not deliver the same batch.
+
+Ids are assigned at INSERT, not at commit, so a missing id can be a
+transaction that is still open (the sweeper expires tickets 500 to a
+transaction). Delivery stops before a gap in the ids until the event after
+it is OUTBOX_GAP_SECONDS old; by then the missing id is taken to have been
+rolled back and the cursor moves past it.
+
+A new webhook starts after the newest event. The sweeper deletes events
+every cursor has acknowledged once they are older than
+OUTBOX_RETENTION_HOURS, except the newest, so ids never go backwards. With
+no cursors nothing is deleted; the cursor of a webhook that is removed from
+OUTBOX_WEBHOOK_URLS holds events back until its row is deleted.
+"""
+import logging
+from datetime import datetime, timedelta
+import urllib3
+from flask import current_app
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.exc import IntegrityError
+from models import db, OutboxEvent, OutboxCursor
+from jobs import default_worker_id
+
+logger = logging.getLogger(__name__)
+
+
+def record_event(event_type, data):
+    """Add an event to the current transaction (the caller commits)"""
+    if not current_app.config.get('OUTBOX_ENABLED', True):
+        return None
+    event = OutboxEvent(event_type=event_type, data=data)
+    db.session.add(event)
+    return event
+
+
+class WebhookError(Exception):
+    """Raised when a webhook does not acknowledge a batch"""
+
+
+class WebhookClient:
+    """POSTs JSON over a pool of keep-alive connections per host"""
+
+    def __init__(self, timeout=10, pool_size=2):
+        self.http = urllib3.PoolManager(
+            num_pools=16,
+            maxsize=pool_size,
+            retries=False,  # the cursor's backoff decides when to try again
+            timeout=urllib3.Timeout(total=timeout),
+            headers={'Content-Type': 'application/json', 'User-Agent': 'train-booking-outbox'}
+        )
+
+    def post(self, url, body):
+        try:
+            response = self.http.request('POST', url, body=body)
+        except urllib3.exceptions.HTTPError as e:
+            raise WebhookError(f'{type(e).__name__}: {e}') from e
+        if not 200 <= response.status < 300:
+            raise WebhookError(f'HTTP {response.status}: {response.data[:200].decode(errors="replace")}')
+
+    def close(self):
+        self.http.clear()
+
+
+def get_cursor(url):
+    """The webhook's cursor, created after the newest event if it has none"""
+    cursor = OutboxCursor.query.filter_by(url=url).first()
+    if cursor:
+        return cursor
+    newest = db.session.execute(select(func.max(OutboxEvent.id))).scalar() or 0
+    db.session.add(OutboxCursor(url=url, last_event_id=newest))
+    try:
+        db.session.commit()
+    except IntegrityError:  # another dispatcher created it first
+        db.session.rollback()
+    return OutboxCursor.query.filter_by(url=url).first()
+
+
+def _lease(cursor, worker_id, now):
+    """Take the cursor for one delivery; False if another dispatcher holds it"""
+    lease = timedelta(seconds=current_app.config['OUTBOX_TIMEOUT_SECONDS'] * 3)
+    taken = db.session.execute(
+        update(OutboxCursor)
+        .where(
+            OutboxCursor.id == cursor.id,
+            (OutboxCursor.locked_until.is_(None)) | (OutboxCursor.locked_until < now)
+        )
+        .values(locked_by=worker_id, locked_until=now + lease)
+    ).rowcount
+    db.session.commit()
+    return taken == 1
+
+
+def settled_events(events, last_event_id, now):
+    """The leading events that can be delivered without skipping an open transaction"""
+    settled = now - timedelta(seconds=current_app.config['OUTBOX_GAP_SECONDS'])
+    expected = last_event_id + 1
+    for index, event in enumerate(events):
+        if event.id != expected and event.created_at > settled:
+            return events[:index]
+        expected = event.id + 1
+    return events
+
+
+def deliver(client, url, worker_id=None, now=None):
+    """Send the webhook its next batch; returns how many events it acknowledged"""
+    now = now or datetime.utcnow()
+    config = current_app.config
+    cursor = get_cursor(url)
+    if cursor.next_attempt_at and cursor.next_attempt_at > now:
+        return 0
+
+    events = db.session.execute(
+        select(OutboxEvent)
+        .where(OutboxEvent.id > cursor.last_event_id)
+        .order_by(OutboxEvent.id)
+        .limit(config['OUTBOX_BATCH_SIZE'])
+    ).scalars().all()
+    events = settled_events(events, cursor.last_event_id, now)
+    if not events or not _lease(cursor, worker_id or default_worker_id(), now):
+        db.session.rollback()
+        return 0
+
+    body = current_app.json.dumps({'events': [event.to_dict() for event in events]})
+    values = {'locked_by': None, 'locked_until': None}
+    try:
+        client.post(url, body)
+    except WebhookError as e:
+        failures = cursor.failures + 1
+        backoff = min(config['OUTBOX_BACKOFF_SECONDS'] * 2 ** (failures - 1), config['OUTBOX_MAX_BACKOFF_SECONDS'])
+        logger.warning('Webhook %s failed (%d in a row), retrying in %ss: %s', url, failures, backoff, e)
+        values.update(failures=failures, last_error=str(e)[:2000],
+                      next_attempt_at=datetime.utcnow() + timedelta(seconds=backoff))
+        delivered = 0
+    else:
+        values.update(last_event_id=events[-1].id, failures=0, last_error=None, next_attempt_at=None,
+                      delivered_at=datetime.utcnow())
+        delivered = len(events)
+
+    db.session.execute(update(OutboxCursor).where(OutboxCursor.id == cursor.id).values(**values))
+    db.session.commit()
+    return delivered
+
+
+def dispatch_pending(app, client, worker_id=None):
+    """One delivery round for every configured webhook; returns events acknowledged"""
+    delivered = 0
+    with app.app_context():
+        try:
+            for url in app.config['OUTBOX_WEBHOOK_URLS']:
+                try:
+                    delivered += deliver(client, url, worker_id)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception('Outbox delivery to %s failed', url)
+        finally:
+            db.session.remove()
+    return delivered
+
+
+def dispatch(app, stop_event, worker_id=None):
+    """Deliver events until stop_event is set, polling once every webhook is caught up"""
+    client = WebhookClient(app.config['OUTBOX_TIMEOUT_SECONDS'])
+    poll = app.config['OUTBOX_POLL_SECONDS']
+    try:
+        while not stop_event.is_set():
+            if not dispatch_pending(app, client, worker_id):
+                stop_event.wait(poll)
+    finally:
+        client.close()
+
+
+def purge_delivered_events(batch_size=500, now=None):
+    """Delete events every webhook cursor has acknowledged, past the retention period"""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(hours=current_app.config['OUTBOX_RETENTION_HOURS'])
+    # The cursors, not this process's config, say what has been delivered: the
+    # sweeper runs on the web tier, which may not list the worker's webhooks
+    acknowledged, cursors = db.session.execute(
+        select(func.min(OutboxCursor.last_event_id), func.count(OutboxCursor.id))
+    ).one()
+    if not cursors:
+        return 0
+    urls = current_app.config['OUTBOX_WEBHOOK_URLS']
+    if urls and OutboxCursor.query.filter(OutboxCursor.url.in_(urls)).count() < len(urls):
+        return 0  # a webhook has not started yet
+    # The newest event is always kept: with the table empty, MySQL 5.7 (after a
+    # restart) and SQLite would hand out ids again that cursors have passed
+    newest = db.session.execute(select(func.max(OutboxEvent.id))).scalar() or 0
+    query = select(OutboxEvent.id).where(
+        OutboxEvent.created_at < cutoff, OutboxEvent.id < newest, OutboxEvent.id <= acknowledged
+    )
+    purged = 0
+
+    while True:
+        event_ids = db.session.execute(query.order_by(OutboxEvent.id).limit(batch_size)).scalars().all()
+        if not event_ids:
+            break
+
+        result = db.session.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(event_ids)))
+        db.session.commit()
+        purged += result.rowcount
+
+        if len(event_ids) < batch_size:
+            break
+
+    return purged
+
+
+def sweep_outbox():
+    """Sweeper task: purge delivered outbox events using the configured batch size"""
+    return purge_delivered_events(current_app.config['SWEEPER_BATCH_SIZE'])
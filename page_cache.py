@@ -0,0 +1,88 @@
+"""
+Page Cache - rendered pages for anonymous visitors
+
+Pages are static shells filled in by the browser from the API, plus public
+data embedded for the first paint, so a page rendered for one anonymous
+visitor is valid for all of them: it is kept per worker for
+PAGE_CACHE_SECONDS, already compressed for each content encoding asked
+for. Views that change embedded data call clear_page_cache(), which only
+reaches the worker that served the change, so pages embedding data that
+can change (the booking page's schedule and fare) are kept for the short
+PAGE_CACHE_DATA_SECONDS instead: other workers catch up within that.
+"""
+import threading
+import time
+from functools import wraps
+from flask import current_app, request, session
+from compression import choose_encoding, compress_response
+
+
+class PageCache:
+    """Thread-safe TTL cache of (body, content encoding) per (path, encoding)"""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key, value, ttl_seconds):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _page_cache():
+    cache = current_app.extensions.get('page_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('page_cache', PageCache())
+    return cache
+
+
+def cached_page(f=None, ttl_setting='PAGE_CACHE_SECONDS'):
+    """Serve anonymous visitors a rendering of the page cached for config[ttl_setting] seconds.
+
+    Use as @cached_page, or @cached_page(ttl_setting=...) for a shorter lived page.
+    """
+    if f is None:
+        return lambda f: cached_page(f, ttl_setting)
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        ttl_seconds = current_app.config.get(ttl_setting)
+        if not ttl_seconds or 'user_id' in session:
+            return f(*args, **kwargs)
+        cache = _page_cache()
+        key = (request.path, choose_encoding(request))
+        entry = cache.get(key)
+        if entry is None:
+            response = current_app.make_response(f(*args, **kwargs))
+            if current_app.config.get('COMPRESS_ENABLED', True):
+                compress_response(response, request, current_app.config.get('COMPRESS_MIN_SIZE', 1024))
+            entry = (response.get_data(), response.headers.get('Content-Encoding'))
+            cache.set(key, entry, ttl_seconds)
+        
+        body, encoding = entry
+        response = current_app.response_class(body, mimetype='text/html')
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response
+    return decorated_function
+
+
+def clear_page_cache():
+    """Forget this worker's cached pages after data they embed changed"""
+    cache = current_app.extensions.get('page_cache')
+    if cache is not None:
+        cache.clear()
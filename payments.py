@@ -0,0 +1,258 @@
+"""
+Payments - payment intents, gateway calls and reconciliation
+
+With PAYMENTS_ENABLED, a booked seat stays 'pending' until it is paid for:
+
+  1. POST /api/payments/ stores a pending Payment and queues
+     payments.create_intent, which creates the gateway intent and keeps
+     its id as the payment's transaction_id
+  2. POST /api/payments/<id>/confirm queues payments.confirm
+  3. the gateway reports the outcome to POST /api/payments/callback;
+     each event is queued for payments.reconcile, a batched job that
+     settles every claimed event with one lookup of their payments and
+     confirms the paid tickets
+
+Gateway calls only ever run in the worker (jobs.py), so no request waits
+on the gateway, and a failed call is retried with the job's backoff. Every
+call carries an Idempotency-Key, so a retry cannot charge or refund twice.
+Tickets still unpaid PAYMENT_TIMEOUT_MINUTES after booking are cancelled
+and their seats released by the sweeper, in batches. A payment that
+succeeds for a ticket that already expired or was cancelled is refunded.
+
+Gateway API (any service that follows it; tests use a local stub):
+  POST {PAYMENT_GATEWAY_URL}/intents {reference, amount, currency} -> {id}
+  POST {PAYMENT_GATEWAY_URL}/intents/<id>/confirm {payment_method}
+  POST {PAYMENT_GATEWAY_URL}/intents/<id>/refund {amount}
+  callbacks: {"events": [{"id", "type", "intent_id"}]}, type one of
+  payment.succeeded, payment.failed, refund.succeeded, signed with
+  X-Gateway-Signature: sha256=HMAC-SHA256(PAYMENT_WEBHOOK_SECRET, body)
+"""
+import hashlib
+import hmac
+import json
+from datetime import datetime, timedelta
+import urllib3
+from flask import current_app
+from sqlalchemy import select, update, and_, exists
+from models import db, Payment, Ticket
+from inventory import InventoryChanges, release_ticket_seat
+from jobs import job, enqueue
+from outbox import record_event
+
+SIGNATURE_HEADER = 'X-Gateway-Signature'
+
+
+class GatewayError(Exception):
+    """Raised when the payment gateway rejects or fails a call"""
+
+
+class GatewayClient:
+    """JSON calls to the payment gateway over pooled keep-alive connections"""
+
+    def __init__(self, base_url, api_key=None, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        headers = {'Content-Type': 'application/json'}
+        if api_key:
+            headers['Authorization'] = f'Bearer {api_key}'
+        self.http = urllib3.PoolManager(
+            maxsize=4,
+            retries=False,  # the job's backoff decides when to try again
+            timeout=urllib3.Timeout(total=timeout),
+            headers=headers
+        )
+
+    def call(self, path, body, idempotency_key):
+        try:
+            response = self.http.request('POST', self.base_url + path, body=json.dumps(body),
+                                         headers={**self.http.headers, 'Idempotency-Key': idempotency_key})
+        except urllib3.exceptions.HTTPError as e:
+            raise GatewayError(f'{type(e).__name__}: {e}') from e
+        if not 200 <= response.status < 300:
+            raise GatewayError(f'HTTP {response.status}: {response.data[:200].decode(errors="replace")}')
+        return json.loads(response.data) if response.data else {}
+
+
+def get_gateway():
+    """This process's gateway client"""
+    gateway = current_app.extensions.get('payment_gateway')
+    if gateway is None:
+        config = current_app.config
+        if not config['PAYMENT_GATEWAY_URL']:
+            raise GatewayError('PAYMENT_GATEWAY_URL is not configured')
+        gateway = GatewayClient(config['PAYMENT_GATEWAY_URL'], config['PAYMENT_GATEWAY_API_KEY'],
+                                config['PAYMENT_GATEWAY_TIMEOUT_SECONDS'])
+        current_app.extensions['payment_gateway'] = gateway
+    return gateway
+
+
+def payments_enabled():
+    return current_app.config.get('PAYMENTS_ENABLED', False)
+
+
+def verify_signature(body, signature):
+    """Whether a callback body carries a valid signature"""
+    secret = current_app.config['PAYMENT_WEBHOOK_SECRET']
+    if not secret or not signature:
+        return False
+    expected = 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def create_payment(ticket, payment_method):
+    """Start paying for a ticket: a pending Payment and its intent job (the caller commits)"""
+    payment = Payment(
+        ticket_id=ticket.id,
+        user_id=ticket.user_id,
+        amount=ticket.fare,
+        payment_method=payment_method,
+        payment_status='pending'
+    )
+    db.session.add(payment)
+    db.session.flush()
+    enqueue('payments.create_intent', {'payment_id': payment.id}, priority=5)
+    return payment
+
+
+def refund_ticket(ticket):
+    """Queue refunds of a ticket's completed payments (the caller commits)"""
+    for payment in ticket.payments:
+        if payment.payment_status == 'completed':
+            enqueue('payments.refund', {'payment_id': payment.id}, priority=5)
+
+
+@job('payments.create_intent', max_attempts=5)
+def create_intent_job(payload):
+    """Job: create the gateway intent for a payment"""
+    payment = Payment.query.get(payload['payment_id'])
+    if payment.transaction_id or payment.payment_status != 'pending':
+        return {'intent_id': payment.transaction_id}
+    intent = get_gateway().call('/intents', {
+        'reference': f'payment-{payment.id}',
+        'amount': float(payment.amount),
+        'currency': current_app.config['PAYMENT_CURRENCY']
+    }, idempotency_key=f'payment-{payment.id}-intent')
+    payment.transaction_id = intent['id']
+    return {'intent_id': intent['id']}
+
+
+@job('payments.confirm', max_attempts=5)
+def confirm_job(payload):
+    """Job: ask the gateway to charge a payment (the outcome arrives by callback)"""
+    payment = Payment.query.get(payload['payment_id'])
+    if payment.payment_status != 'pending':
+        return {'skipped': payment.payment_status}
+    if not payment.transaction_id:
+        raise GatewayError('Intent not created yet')  # retried after create_intent
+    get_gateway().call(f'/intents/{payment.transaction_id}/confirm', {
+        'payment_method': payment.payment_method
+    }, idempotency_key=f'payment-{payment.id}-confirm')
+    return {'confirmed': payment.transaction_id}
+
+
+@job('payments.refund', max_attempts=5)
+def refund_job(payload):
+    """Job: refund a completed payment (the outcome arrives by callback)"""
+    payment = Payment.query.get(payload['payment_id'])
+    if payment.payment_status != 'completed':
+        return {'skipped': payment.payment_status}
+    get_gateway().call(f'/intents/{payment.transaction_id}/refund', {
+        'amount': float(payment.amount)
+    }, idempotency_key=f'payment-{payment.id}-refund')
+    return {'refund_requested': payment.transaction_id}
+
+
+@job('payments.reconcile', batched=True)
+def reconcile_job(events):
+    """Job: apply a batch of gateway callback events; returns the outcome of each"""
+    intent_ids = {event['intent_id'] for event in events}
+    payments = {
+        payment.transaction_id: payment
+        for payment in Payment.query.filter(Payment.transaction_id.in_(intent_ids)).all()
+    }
+    tickets = {
+        ticket.id: ticket
+        for ticket in Ticket.query.filter(Ticket.id.in_({p.ticket_id for p in payments.values()})).all()
+    } if payments else {}
+
+    now = datetime.utcnow()
+    outcomes = []
+    for event in events:
+        payment = payments.get(event['intent_id'])
+        if payment is None:
+            outcomes.append('unknown intent')
+            continue
+        ticket = tickets[payment.ticket_id]
+
+        if event['type'] == 'payment.succeeded' and payment.payment_status in ('pending', 'failed'):
+            payment.payment_status = 'completed'
+            payment.payment_date = now
+            # Guarded, as the unpaid-ticket sweeper may have cancelled it since it was read
+            confirmed = ticket.status == 'pending' and db.session.execute(
+                update(Ticket)
+                .where(Ticket.id == ticket.id, Ticket.status == 'pending')
+                .values(status='confirmed')
+            ).rowcount == 1
+            if confirmed:
+                record_event('ticket.paid', {'ticket': ticket.to_dict(), 'payment_id': payment.id})
+                outcomes.append('confirmed')
+            else:  # expired or cancelled while the payment was in flight
+                enqueue('payments.refund', {'payment_id': payment.id}, priority=5)
+                outcomes.append('refunding')
+        elif event['type'] == 'payment.failed' and payment.payment_status == 'pending':
+            payment.payment_status = 'failed'
+            outcomes.append('failed')
+        elif event['type'] == 'refund.succeeded' and payment.payment_status == 'completed':
+            payment.payment_status = 'refunded'
+            outcomes.append('refunded')
+        else:
+            outcomes.append('ignored')  # repeated or out of order
+    return outcomes
+
+
+def expire_unpaid_tickets(batch_size=500, now=None):
+    """Cancel tickets left unpaid past the payment timeout and release their seats, in batches"""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(minutes=current_app.config['PAYMENT_TIMEOUT_MINUTES'])
+    paid = exists().where(and_(Payment.ticket_id == Ticket.id, Payment.payment_status == 'completed'))
+    unpaid = and_(
+        Ticket.status == 'pending',
+        Ticket.seat_number.isnot(None),
+        Ticket.created_at < cutoff,
+        ~paid
+    )
+    expired = 0
+
+    while True:
+        ticket_ids = db.session.execute(
+            select(Ticket.id).where(unpaid).limit(batch_size)
+        ).scalars().all()
+        if not ticket_ids:
+            break
+
+        tickets = Ticket.query.filter(Ticket.id.in_(ticket_ids), unpaid).with_for_update().all()
+        changes = InventoryChanges()
+        for ticket in tickets:
+            release_ticket_seat(ticket, changes)
+            ticket.status = 'cancelled'
+            record_event('ticket.expired', {'ticket': ticket.to_dict()})
+        changes.apply()
+        db.session.execute(
+            update(Payment)
+            .where(Payment.ticket_id.in_(ticket_ids), Payment.payment_status == 'pending')
+            .values(payment_status='failed')
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        expired += len(tickets)
+
+        if len(ticket_ids) < batch_size:
+            break
+
+    return expired
+
+
+def sweep_unpaid_tickets():
+    """Sweeper task: expire unpaid tickets using the configured batch size"""
+    if not payments_enabled():
+        return 0
+    return expire_unpaid_tickets(current_app.config['SWEEPER_BATCH_SIZE'])
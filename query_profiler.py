@@ -0,0 +1,145 @@
+"""
+Query Profiler - per-request SQL statement counts, DB time and N+1 detection
+
+One pair of engine-wide cursor listeners feeds a QueryProfile stored on
+flask.g for the current app context. Per request it keeps the statement
+count, total DB time and how often each statement ran; statements are
+fingerprinted (whitespace and expanded IN lists collapsed) only when the
+request is reported, so the hot path is a counter and a dict increment.
+
+After each request the profile is sent in a Server-Timing header and
+requests over QUERY_PROFILER_SLOW_MS, QUERY_PROFILER_MAX_QUERIES or with a
+statement repeated QUERY_PROFILER_REPEAT_THRESHOLD times (the N+1 pattern)
+are logged to the 'query_profiler' logger.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('query_profiler')
+
+IN_LIST_PATTERN = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+\s*\)')
+LITERAL_PATTERN = re.compile(r"\b\d+\b|'(?:[^']|'')*'")
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def fingerprint(statement):
+    """Normalize a statement so executions of the same query compare equal"""
+    statement = WHITESPACE_PATTERN.sub(' ', statement).strip()
+    statement = IN_LIST_PATTERN.sub('(?+)', statement)
+    return LITERAL_PATTERN.sub('?', statement)
+
+
+class QueryProfile:
+    """Statements executed in one request or capture block"""
+    __slots__ = ('count', 'seconds', 'statements')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.seconds += elapsed
+        self.statements[statement] += 1
+
+    def fingerprints(self):
+        """Execution counts per fingerprint, most repeated first"""
+        counts = Counter()
+        for statement, count in self.statements.items():
+            counts[fingerprint(statement)] += count
+        return counts.most_common()
+
+    def repeated(self, threshold):
+        """Fingerprints executed at least `threshold` times"""
+        return [(sql, count) for sql, count in self.fingerprints() if count >= threshold]
+
+
+_captures = []
+_statement_listeners = []
+
+
+def add_statement_listener(listener):
+    """Call listener(conn, statement, parameters, executemany, elapsed) after every statement"""
+    _statement_listeners.append(listener)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    if has_app_context():
+        profile = g.get('_query_profile')
+        if profile is not None:
+            profile.record(statement, elapsed)
+    for profile in _captures:
+        profile.record(statement, elapsed)
+    for listener in _statement_listeners:
+        listener(conn, statement, parameters, executemany, elapsed)
+
+
+def current_profile():
+    """The current request's QueryProfile, or None"""
+    return g.get('_query_profile') if has_app_context() else None
+
+
+@contextmanager
+def capture_queries():
+    """Collect every statement run inside the block, in any context"""
+    profile = QueryProfile()
+    _captures.append(profile)
+    try:
+        yield profile
+    finally:
+        _captures.remove(profile)
+
+
+def init_query_profiler(app):
+    """Start a profile per request; report it in Server-Timing and the log"""
+    if not app.config.get('QUERY_PROFILER_ENABLED', True):
+        return
+    server_timing = app.config.get('QUERY_PROFILER_SERVER_TIMING', False)
+    slow_seconds = app.config.get('QUERY_PROFILER_SLOW_MS', 500) / 1000
+    max_queries = app.config.get('QUERY_PROFILER_MAX_QUERIES', 30)
+    repeat_threshold = app.config.get('QUERY_PROFILER_REPEAT_THRESHOLD', 5)
+
+    @app.before_request
+    def start_query_profile():
+        g._query_profile = QueryProfile()
+        g._query_profile_started = time.perf_counter()
+
+    @app.after_request
+    def report_query_profile(response):
+        profile = g.get('_query_profile')
+        if profile is None:
+            return response
+        elapsed = time.perf_counter() - g._query_profile_started
+
+        if server_timing:
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={profile.seconds * 1000:.2f};desc="{profile.count} queries", '
+                f'app;dur={elapsed * 1000:.2f}'
+            )
+
+        # Fingerprints are only computed for requests that could be reported
+        if elapsed >= slow_seconds or profile.count >= min(max_queries, repeat_threshold):
+            repeated = profile.repeated(repeat_threshold)
+            if elapsed >= slow_seconds or profile.count > max_queries or repeated:
+                logger.warning(
+                    '%s %s: %.1f ms, %d queries, %.1f ms in db%s',
+                    request.method, request.path, elapsed * 1000, profile.count,
+                    profile.seconds * 1000,
+                    ''.join(f'\n  repeated x{count}: {sql}' for sql, count in repeated)
+                )
+        return response
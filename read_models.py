@@ -0,0 +1,60 @@
+"""
+Read Models - column-projected list queries without ORM instances
+
+A ReadModel selects exactly the columns a model's generated serializer
+returns (see serializers.py) as a Core select(). Rows come back as
+SQLAlchemy Row tuples, never enter the session's identity map, and are
+turned into the same dicts to_dict() would produce by a row serializer
+generated once per model.
+
+The select runs through db.session, so @read_only endpoints still read
+from a replica and the query profiler still counts it. Extra columns
+needed by the view but not by the response (e.g. Seat.segment_mask) can be
+appended to the select; they are ignored by to_dict() and readable by name
+on the row.
+"""
+from sqlalchemy import inspect, select
+from models import db, User, Train, Route, Ticket, Seat
+from serializers import compile_row_serializer
+
+
+class ReadModel:
+    """Serialized columns of model, read as rows"""
+
+    def __init__(self, model, serializer='to_dict'):
+        self.model = model
+        self.serializer = serializer
+        self._columns = None
+        self._to_dict = None
+
+    def _compile(self):
+        names = getattr(self.model, self.serializer).__columns__
+        columns = inspect(self.model).columns
+        self._columns = [columns[name] for name in names]
+        self._to_dict = compile_row_serializer(self.model, names)
+
+    def select(self, *extra):
+        """select() of the serialized columns, then any extra columns"""
+        if self._columns is None:
+            self._compile()
+        return select(*self._columns, *extra)
+
+    def to_dict(self, row):
+        """The dict the model's serializer would return for this row"""
+        if self._to_dict is None:
+            self._compile()
+        return self._to_dict(row)
+
+    def all(self, query):
+        """Run query in the current session and return serialized rows"""
+        if self._to_dict is None:
+            self._compile()
+        to_dict = self._to_dict
+        return [to_dict(row) for row in db.session.execute(query)]
+
+
+USERS = ReadModel(User)
+TRAINS = ReadModel(Train)
+ROUTES = ReadModel(Route, '_column_dict')
+TICKETS = ReadModel(Ticket)
+SEATS = ReadModel(Seat)
@@ -0,0 +1,170 @@
+"""
+Read Replica Routing - send read-only endpoints to replica databases
+
+Replica engines are created from DB_REPLICA_URIS with the same engine
+options as the primary. Endpoints decorated with @read_only route their ORM
+reads to a healthy replica; everything else, any flush, DML and
+SELECT ... FOR UPDATE stays on the primary.
+
+Read-your-writes: a flush during a request stamps the user's session, and
+for REPLICA_READ_YOUR_WRITES_SECONDS afterwards that user's reads stay on
+the primary. Replica lag is measured every REPLICA_LAG_CHECK_SECONDS by a
+background thread per process (start_background_tasks), so a slow or
+unreachable replica never holds up a request: routing only reads the last
+measurement, and a replica not measured yet is not used. When no replica
+is within REPLICA_MAX_LAG_SECONDS, REPLICA_LAG_FALLBACK decides between the
+primary ('primary') and the least lagged replica ('replica').
+"""
+import random
+import threading
+import time
+from functools import wraps
+from flask import current_app, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+
+LAST_WRITE_KEY = '_db_last_write'
+
+
+class RoutingSession(Session):
+    """Session that reads from the replica chosen for the current request"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        replica = self.info.get('replica')
+        if (replica is None
+                or bind is not None
+                or self._flushing
+                or getattr(clause, 'is_dml', False)
+                or getattr(clause, '_for_update_arg', None) is not None
+                or engine is not self._db.engines[None]):
+            return engine
+        return replica
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _remember_write(db_session, flush_context):
+    """Pin the rest of this request, and this user for a while, to the primary"""
+    db_session.info.pop('replica', None)
+    # Without replicas every read is on the primary; don't re-send the cookie for nothing
+    if has_request_context() and get_router() is not None:
+        session[LAST_WRITE_KEY] = time.time()
+
+
+def measure_lag(engine):
+    """Seconds the replica is behind its primary (inf if replication is broken)"""
+    if engine.dialect.name != 'mysql':
+        return 0.0
+    with engine.connect() as connection:
+        status = connection.execute(text('SHOW SLAVE STATUS')).mappings().first()
+    if status is None:
+        return 0.0
+    lag = status.get('Seconds_Behind_Master')
+    return float('inf') if lag is None else float(lag)
+
+
+class ReplicaRouter:
+    """Picks a replica engine for read-only requests, tracking replica lag"""
+
+    def __init__(self, engines, max_lag, check_interval, fallback):
+        self.engines = engines
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.fallback = fallback
+        self.measure_lag = measure_lag
+        self._lag = {}  # engine -> seconds, replaced whole by refresh()
+
+    def refresh(self):
+        """Measure every replica's lag; unreachable replicas report inf"""
+        for engine in self.engines:
+            try:
+                lag = self.measure_lag(engine)
+            except Exception:
+                lag = float('inf')
+            self._lag[engine] = lag
+
+    def start(self):
+        """Refresh lag now and every check_interval in a daemon thread; returns the thread"""
+        stop_event = threading.Event()
+
+        def loop():
+            while True:
+                self.refresh()
+                if stop_event.wait(self.check_interval):
+                    break
+
+        thread = threading.Thread(target=loop, name='replica-lag', daemon=True)
+        thread.stop_event = stop_event
+        thread.start()
+        return thread
+
+    def lag(self, engine):
+        """Last measured lag for one replica; None before the first measurement"""
+        return self._lag.get(engine)
+
+    def choose(self):
+        """A replica engine to read from, or None to use the primary"""
+        lags = [(self.lag(engine), engine) for engine in self.engines]
+        lags = [(lag, engine) for lag, engine in lags if lag is not None]
+        healthy = [engine for lag, engine in lags if lag <= self.max_lag]
+        if healthy:
+            return random.choice(healthy)
+        if self.fallback == 'replica':
+            reachable = [(lag, engine) for lag, engine in lags if lag != float('inf')]
+            if reachable:
+                return min(reachable, key=lambda item: item[0])[1]
+        return None
+
+    def status(self):
+        """Lag and health per replica"""
+        replicas = []
+        for engine in self.engines:
+            lag = self.lag(engine)
+            replicas.append({
+                'url': engine.url.render_as_string(hide_password=True),
+                'lag_seconds': None if lag is None or lag == float('inf') else lag,
+                'healthy': lag is not None and lag <= self.max_lag
+            })
+        return replicas
+
+
+def init_replicas(app):
+    """Create the replica engines and router for an app, if any are configured"""
+    uris = app.config.get('DB_REPLICA_URIS') or []
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    app.extensions['replica_router'] = ReplicaRouter(
+        [create_engine(uri, **options) for uri in uris],
+        max_lag=app.config.get('REPLICA_MAX_LAG_SECONDS', 5),
+        check_interval=app.config.get('REPLICA_LAG_CHECK_SECONDS', 10),
+        fallback=app.config.get('REPLICA_LAG_FALLBACK', 'primary')
+    ) if uris else None
+
+
+def get_router():
+    """The app's ReplicaRouter, or None when no replicas are configured"""
+    return current_app.extensions.get('replica_router')
+
+
+def read_only(f):
+    """Decorator to serve a read-only endpoint from a replica when possible"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        router = get_router()
+        if router is None:
+            return f(*args, **kwargs)
+
+        last_write = session.get(LAST_WRITE_KEY)
+        window = current_app.config.get('REPLICA_READ_YOUR_WRITES_SECONDS', 10)
+        if last_write and time.time() - last_write < window:
+            return f(*args, **kwargs)
+
+        db_session = current_app.extensions['sqlalchemy'].session
+        replica = router.choose()
+        if replica is None:
+            return f(*args, **kwargs)
+        db_session.info['replica'] = replica
+        try:
+            return f(*args, **kwargs)
+        finally:
+            db_session.info.pop('replica', None)
+    return decorated_function
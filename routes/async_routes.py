@@ -0,0 +1,333 @@
+"""
+Async Read Routes - native async versions of the busiest public read endpoints
+
+Served by asgi.py on async SQLAlchemy. Each endpoint returns the same
+status codes and JSON as the Flask view it shadows (named in its
+docstring), which stays the reference implementation. Request variants
+not handled here (trip-specific or compact seat maps) are handed to the
+Flask app unchanged.
+"""
+import time
+from datetime import datetime
+from functools import wraps
+from itsdangerous import BadSignature
+from sqlalchemy import select, func
+from sqlalchemy.orm import joinedload, contains_eager
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.routing import Route
+from compression import choose_encoding_for_header, compress_bytes
+from fares import get_fares
+from metrics import record_request
+from models import User, Train, Route as TrainRoute, Schedule, Ticket, Seat, SeatInventory
+from read_models import TRAINS, ROUTES, TICKETS, SEATS
+
+
+class Passthrough(Response):
+    """Hand the request to the Flask app as if no async route had matched"""
+
+    def __init__(self, request):
+        self.request = request
+
+    async def __call__(self, scope, receive, send):
+        await self.request.app.state.wsgi(scope, receive, send)
+
+
+def json_response(request, payload, status=200):
+    """JSON response encoded by the Flask app's JSON provider and compressed as init_compression() would"""
+    flask_app = request.app.state.flask_app
+    config = flask_app.config
+    body = (flask_app.json.dumps(payload) + '\n').encode()
+    headers = {}
+    if (status == 200 and config.get('COMPRESS_ENABLED', True)
+            and len(body) >= config.get('COMPRESS_MIN_SIZE', 1024)):
+        headers['Vary'] = 'Accept-Encoding'
+        encoding = choose_encoding_for_header(request.headers.get('Accept-Encoding'))
+        if encoding:
+            body = compress_bytes(body, encoding)
+            headers['Content-Encoding'] = encoding
+    return Response(body, status_code=status, headers=headers, media_type='application/json')
+
+
+def flask_session(request):
+    """The Flask session in the request's cookie ({} if missing or invalid)"""
+    flask_app = request.app.state.flask_app
+    cookie = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return {}
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    try:
+        return serializer.loads(cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return {}
+
+
+def endpoint(blueprint, name):
+    """Turn uncaught errors into the Flask views' 500 body and record request metrics"""
+    def decorator(f):
+        @wraps(f)
+        async def decorated_function(request):
+            started = time.perf_counter()
+            try:
+                response = await f(request)
+            except Exception as e:
+                response = json_response(request, {'error': str(e)}, 500)
+            if not isinstance(response, Passthrough) and request.app.state.metrics:
+                record_request(request.method, blueprint, f'{blueprint}.{name}',
+                               response.status_code, time.perf_counter() - started)
+            return response
+        return decorated_function
+    return decorator
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+@endpoint('trains', 'get_all_trains')
+async def get_all_trains(request):
+    """Async GET /api/trains/ (train_routes.get_all_trains)"""
+    status = request.query_params.get('status')
+    train_type = request.query_params.get('train_type')
+
+    query = TRAINS.select()
+    if status:
+        query = query.where(Train.status == status)
+    if train_type:
+        query = query.where(Train.train_type == train_type)
+
+    async with request.app.state.sessionmaker() as session:
+        trains = [TRAINS.to_dict(row) for row in await session.execute(query)]
+
+    return json_response(request, {
+        'trains': trains,
+        'count': len(trains)
+    })
+
+
+@endpoint('trains', 'search_trains')
+async def search_trains(request):
+    """Async GET /api/trains/search (train_routes.search_trains)"""
+    query_str = request.query_params.get('q', '')
+    if not query_str:
+        return json_response(request, {'error': 'Search query is required'}, 400)
+
+    query = select(Train).where(
+        (Train.train_number.like(f'%{query_str}%')) |
+        (Train.train_name.like(f'%{query_str}%'))
+    )
+    async with request.app.state.sessionmaker() as session:
+        trains = (await session.scalars(query)).all()
+
+    return json_response(request, {
+        'trains': [train.to_dict() for train in trains],
+        'count': len(trains)
+    })
+
+
+@endpoint('routes', 'get_all_routes')
+async def get_all_routes(request):
+    """Async GET /api/routes/ (route_routes.get_all_routes)"""
+    status = request.query_params.get('status')
+    source = request.query_params.get('source')
+    destination = request.query_params.get('destination')
+
+    query = ROUTES.select()
+    if status:
+        query = query.where(TrainRoute.status == status)
+    if source:
+        query = query.where(TrainRoute.source_station.like(f'%{source}%'))
+    if destination:
+        query = query.where(TrainRoute.destination_station.like(f'%{destination}%'))
+
+    async with request.app.state.sessionmaker() as session:
+        routes = [ROUTES.to_dict(row) for row in await session.execute(query)]
+
+    return json_response(request, {
+        'routes': routes,
+        'count': len(routes)
+    })
+
+
+def int_param(request, name):
+    """Like Flask's request.args.get(name, type=int): None when missing or not an int"""
+    try:
+        return int(request.query_params[name])
+    except (KeyError, ValueError):
+        return None
+
+
+@endpoint('schedules', 'get_all_schedules')
+async def get_all_schedules(request):
+    """Async GET /api/schedules/ (schedule_routes.get_all_schedules)"""
+    train_id = int_param(request, 'train_id')
+    route_id = int_param(request, 'route_id')
+    status = request.query_params.get('status')
+
+    query = select(Schedule).options(joinedload(Schedule.train), joinedload(Schedule.route))
+    if train_id:
+        query = query.where(Schedule.train_id == train_id)
+    if route_id:
+        query = query.where(Schedule.route_id == route_id)
+    if status:
+        query = query.where(Schedule.status == status)
+
+    async with request.app.state.sessionmaker() as session:
+        schedules = (await session.scalars(query)).all()
+
+    return json_response(request, {
+        'schedules': [schedule.to_dict() for schedule in schedules],
+        'count': len(schedules)
+    })
+
+
+def _cached_fares(flask_app, schedule_ids, journey_date):
+    with flask_app.app_context():
+        return get_fares(schedule_ids, journey_date)
+
+
+@endpoint('schedules', 'search_schedules')
+async def search_schedules(request):
+    """Async GET /api/schedules/search (schedule_routes.search_schedules)"""
+    source = request.query_params.get('source')
+    destination = request.query_params.get('destination')
+    journey_date = request.query_params.get('journey_date')
+
+    if not source or not destination:
+        return json_response(request, {'error': 'Source and destination are required'}, 400)
+    try:
+        journey_date_obj = parse_date(journey_date) if journey_date else None
+    except ValueError:
+        return json_response(request, {'error': 'Invalid date format. Use YYYY-MM-DD'}, 400)
+
+    query = select(Schedule).join(Schedule.route).options(
+        contains_eager(Schedule.route), joinedload(Schedule.train)
+    ).where(
+        TrainRoute.source_station.like(f'%{source}%'),
+        TrainRoute.destination_station.like(f'%{destination}%'),
+        Schedule.status == 'active'
+    )
+    async with request.app.state.sessionmaker() as session:
+        schedules = (await session.scalars(query)).all()
+        results = [schedule.to_dict() for schedule in schedules]
+
+        if journey_date_obj:
+            schedule_ids = [s.id for s in schedules]
+            counts = {}
+            if schedule_ids:
+                rows = await session.execute(
+                    select(SeatInventory.schedule_id, func.sum(SeatInventory.available))
+                    .where(
+                        SeatInventory.schedule_id.in_(schedule_ids),
+                        SeatInventory.journey_date == journey_date_obj
+                    )
+                    .group_by(SeatInventory.schedule_id)
+                )
+                counts = {schedule_id: int(available) for schedule_id, available in rows}
+            # Fare tables are cached per worker; a miss is priced on a thread
+            fares = await run_in_threadpool(
+                _cached_fares, request.app.state.flask_app, schedule_ids, journey_date_obj
+            )
+            for result in results:
+                result['seats_available'] = counts.get(result['id'], 0)
+                result['fares'] = fares.get(result['id'], {})
+                result['fare_from'] = min(result['fares'].values()) if result['fares'] else None
+
+    return json_response(request, {
+        'schedules': results,
+        'count': len(results)
+    })
+
+
+@endpoint('seats', 'get_available_seats')
+async def get_available_seats(request):
+    """Async GET /api/seats/ (seat_routes.get_available_seats) for whole-route maps"""
+    params = request.query_params
+    if params.get('from_station') or params.get('to_station') or params.get('format') == 'compact':
+        return Passthrough(request)
+
+    schedule_id = int_param(request, 'schedule_id')
+    journey_date = params.get('journey_date')
+    if not schedule_id or not journey_date:
+        return json_response(request, {'error': 'schedule_id and journey_date are required'}, 400)
+    try:
+        journey_date_obj = parse_date(journey_date)
+    except ValueError:
+        return json_response(request, {'error': 'Invalid date format. Use YYYY-MM-DD'}, 400)
+
+    async with request.app.state.sessionmaker() as session:
+        seats = (await session.execute(
+            SEATS.select().where(Seat.schedule_id == schedule_id, Seat.journey_date == journey_date_obj)
+        )).all()
+
+    available = [SEATS.to_dict(seat) for seat in seats if seat.is_available]
+    occupied = [SEATS.to_dict(seat) for seat in seats if not seat.is_available]
+
+    return json_response(request, {
+        'available_seats': available,
+        'occupied_seats': occupied,
+        'total_available': len(available),
+        'total_occupied': len(occupied)
+    })
+
+
+@endpoint('tickets', 'get_user_tickets')
+async def get_user_tickets(request):
+    """Async GET /api/tickets/ (ticket_routes.get_user_tickets)"""
+    current_user_id = flask_session(request).get('user_id')
+    if current_user_id is None:
+        return json_response(request, {'error': 'Authentication required'}, 401)
+
+    async with request.app.state.sessionmaker() as session:
+        current_user = await session.get(User, current_user_id)
+
+        # Admin can see all tickets, users see only their own
+        query = TICKETS.select()
+        if current_user.role != 'admin':
+            query = query.where(Ticket.user_id == current_user_id)
+        tickets = [TICKETS.to_dict(row) for row in await session.execute(query)]
+
+    return json_response(request, {
+        'tickets': tickets,
+        'count': len(tickets)
+    })
+
+
+@endpoint('tickets', 'get_ticket_by_pnr')
+async def get_ticket_by_pnr(request):
+    """Async GET /api/tickets/pnr/<pnr> (ticket_routes.get_ticket_by_pnr)"""
+    query = select(Ticket).options(
+        joinedload(Ticket.schedule).joinedload(Schedule.train),
+        joinedload(Ticket.schedule).joinedload(Schedule.route)
+    ).where(Ticket.pnr_number == request.path_params['pnr']).limit(1)
+
+    async with request.app.state.sessionmaker() as session:
+        ticket = (await session.scalars(query)).first()
+
+    if not ticket:
+        return json_response(request, {'error': 'Ticket not found'}, 404)
+
+    schedule = ticket.schedule
+    ticket_dict = ticket.to_dict()
+    ticket_dict['schedule'] = schedule.to_dict() if schedule else None
+
+    return json_response(request, {
+        'ticket': ticket_dict
+    })
+
+
+def async_routes(middleware=None):
+    """Starlette routes for the async endpoints (GET only; other methods fall through)"""
+    return [
+        Route(path, view, methods=['GET'], middleware=middleware)
+        for path, view in (
+            ('/api/trains/', get_all_trains),
+            ('/api/trains/search', search_trains),
+            ('/api/routes/', get_all_routes),
+            ('/api/schedules/', get_all_schedules),
+            ('/api/schedules/search', search_schedules),
+            ('/api/seats/', get_available_seats),
+            ('/api/tickets/', get_user_tickets),
+            ('/api/tickets/pnr/{pnr}', get_ticket_by_pnr),
+        )
+    ]
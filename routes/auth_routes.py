@@ -3,6 +3,7 @@ Authentication Routes - Login, Register, Logout (Session-based)
 """
 from flask import Blueprint, request, jsonify, session
 from models import db, User
+from outbox import record_event
 from functools import wraps
 
 auth_bp = Blueprint('auth', __name__)
@@ -63,6 +64,8 @@ def register():
         user.set_password(data['password'])
         
         db.session.add(user)
+        db.session.flush()
+        record_event('user.registered', {'user': user.to_dict()})
         db.session.commit()
         
         return jsonify({
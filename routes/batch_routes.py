@@ -0,0 +1,77 @@
+"""
+Batch Routes - several GET requests in one round trip
+
+POST /api/batch with {"requests": [{"path": "/api/trains/"}, ...]} runs each
+sub-request's view in this request's app context, so they all share one
+database session (and its connection, and its identity map: the admin
+check loads the user once). Identical sub-requests run once. The reply
+lists a {"status", "body"} per sub-request, in order.
+
+Only GET is accepted: sub-requests are reads, so a failure in one cannot
+leave another half-applied. Request hooks (metrics, profiler,
+compression) run once, for the batch.
+"""
+from flask import Blueprint, request, jsonify, current_app
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+
+batch_bp = Blueprint('batch', __name__)
+
+
+def run_subrequest(path):
+    """Dispatch GET path as the current user, without request hooks; (status, body)"""
+    builder = EnvironBuilder(
+        path=path,
+        base_url=request.host_url,
+        headers={'Cookie': request.headers.get('Cookie', '')},
+        environ_base={'REMOTE_ADDR': request.remote_addr}
+    )
+    try:
+        with current_app.request_context(builder.get_environ()):
+            try:
+                rv = current_app.dispatch_request()
+            except HTTPException as e:  # 404/405 from routing, through the app's error handlers
+                rv = current_app.handle_http_exception(e)
+            response = current_app.make_response(rv)
+    finally:
+        builder.close()
+
+    if response.is_json:
+        return response.status_code, response.get_json()
+    return response.status_code, response.get_data(as_text=True)
+
+
+@batch_bp.route('', methods=['POST'])
+def batch():
+    """Run a list of GET sub-requests and return their responses"""
+    try:
+        data = request.get_json(silent=True) or {}
+        subrequests = data.get('requests')
+
+        if not isinstance(subrequests, list) or not subrequests:
+            return jsonify({'error': 'requests must be a non-empty list'}), 400
+        max_requests = current_app.config.get('BATCH_MAX_REQUESTS', 20)
+        if len(subrequests) > max_requests:
+            return jsonify({'error': f'At most {max_requests} requests per batch'}), 400
+
+        paths = []
+        for subrequest in subrequests:
+            path = subrequest.get('path') if isinstance(subrequest, dict) else None
+            if not isinstance(path, str) or not path.startswith('/api/') or path.startswith('/api/batch'):
+                return jsonify({'error': 'Each request needs a path under /api/ (not /api/batch)'}), 400
+            if subrequest.get('method', 'GET').upper() != 'GET':
+                return jsonify({'error': 'Only GET requests can be batched'}), 400
+            paths.append(path)
+
+        # Identical sub-requests are answered once
+        results = {}
+        for path in paths:
+            if path not in results:
+                results[path] = run_subrequest(path)
+
+        return jsonify({
+            'responses': [{'status': results[path][0], 'body': results[path][1]} for path in paths]
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
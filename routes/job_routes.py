@@ -0,0 +1,47 @@
+"""
+Job Routes - status of background jobs (jobs.py)
+"""
+from flask import Blueprint, request, jsonify
+from models import Job
+from routes.auth_helpers import admin_required
+
+job_bp = Blueprint('jobs', __name__)
+
+
+@job_bp.route('/', methods=['GET'])
+@admin_required
+def get_jobs():
+    """List recent jobs, optionally by status (admin only)"""
+    try:
+        query = Job.query
+        status = request.args.get('status')
+        if status:
+            query = query.filter_by(status=status)
+        limit = request.args.get('limit', 50, type=int)
+        
+        jobs = query.order_by(Job.id.desc()).limit(max(1, min(limit, 500))).all()
+        
+        return jsonify({
+            'jobs': [job.to_dict() for job in jobs],
+            'count': len(jobs)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@job_bp.route('/<int:job_id>', methods=['GET'])
+@admin_required
+def get_job(job_id):
+    """Get a job's status and result (admin only)"""
+    try:
+        job = Job.query.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        return jsonify({
+            'job': job.to_dict()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
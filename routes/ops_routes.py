@@ -0,0 +1,94 @@
+"""
+Operations Routes - runtime health and capacity metrics
+"""
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import func
+from models import db, OutboxEvent, OutboxCursor
+from routes.auth_helpers import admin_required
+from db_pool import pool_status
+from replicas import get_router
+from slow_queries import get_slow_query_log
+
+ops_bp = Blueprint('ops', __name__)
+
+
+@ops_bp.route('/pool', methods=['GET'])
+@admin_required
+def get_pool_status():
+    """Get connection pool gauges and checkout metrics (admin only)"""
+    try:
+        return jsonify({
+            'pool': pool_status(db.engine)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@ops_bp.route('/replicas', methods=['GET'])
+@admin_required
+def get_replica_status():
+    """Get read replica lag and health (admin only)"""
+    try:
+        router = get_router()
+        
+        return jsonify({
+            'replicas': router.status() if router else [],
+            'max_lag_seconds': router.max_lag if router else None,
+            'fallback': router.fallback if router else None
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@ops_bp.route('/slow-queries', methods=['GET'])
+@admin_required
+def get_slow_queries():
+    """Get the slowest query fingerprints with plans and recent slow statements (admin only)"""
+    try:
+        log = get_slow_query_log()
+        if log is None:
+            return jsonify({'error': 'Slow query log is disabled'}), 404
+        
+        limit = request.args.get('limit', 50, type=int)
+        
+        return jsonify(log.snapshot(limit=max(1, min(limit, 500)))), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@ops_bp.route('/slow-queries', methods=['DELETE'])
+@admin_required
+def clear_slow_queries():
+    """Clear the slow query log (admin only)"""
+    try:
+        log = get_slow_query_log()
+        if log is None:
+            return jsonify({'error': 'Slow query log is disabled'}), 404
+        
+        log.clear()
+        
+        return jsonify({'message': 'Slow query log cleared'}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@ops_bp.route('/outbox', methods=['GET'])
+@admin_required
+def get_outbox_status():
+    """Get webhook delivery positions and backlog (admin only)"""
+    try:
+        newest = db.session.query(func.max(OutboxEvent.id)).scalar() or 0
+        urls = current_app.config['OUTBOX_WEBHOOK_URLS']
+        cursors = OutboxCursor.query.filter(OutboxCursor.url.in_(urls)).all() if urls else []
+        
+        return jsonify({
+            'newest_event_id': newest,
+            'webhooks': [dict(cursor.to_dict(), pending=newest - cursor.last_event_id) for cursor in cursors]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
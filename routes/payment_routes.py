@@ -0,0 +1,173 @@
+"""
+Payment Routes - pay for a booked ticket (see payments.py)
+
+Every endpoint answers as soon as its job is queued; the gateway is only
+called by the worker. Disabled (404) unless PAYMENTS_ENABLED.
+"""
+from functools import wraps
+from flask import Blueprint, request, jsonify
+from models import db, Payment, Ticket
+from routes.auth_helpers import login_required, admin_required, get_current_user
+from idempotency import idempotent
+from jobs import enqueue
+from payments import payments_enabled, create_payment, verify_signature, SIGNATURE_HEADER
+
+payment_bp = Blueprint('payments', __name__)
+
+PAYMENT_METHODS = ('credit_card', 'debit_card', 'upi', 'netbanking', 'wallet')
+
+
+def payments_required(f):
+    """Decorator answering 404 while payments are disabled"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not payments_enabled():
+            return jsonify({'error': 'Payments are disabled'}), 404
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def _own_payment(payment_id):
+    """(payment, error response) for the current user's payment or any payment for admins"""
+    payment = Payment.query.get(payment_id)
+    if not payment:
+        return None, (jsonify({'error': 'Payment not found'}), 404)
+    user = get_current_user()
+    if user.role != 'admin' and payment.user_id != user.id:
+        return None, (jsonify({'error': 'Access denied'}), 403)
+    return payment, None
+
+
+@payment_bp.route('/', methods=['POST'])
+@payments_required
+@login_required
+@idempotent
+def create_payment_intent():
+    """Start paying for a pending ticket"""
+    try:
+        data = request.get_json()
+        
+        if 'ticket_id' not in data or data.get('payment_method') not in PAYMENT_METHODS:
+            return jsonify({'error': f'ticket_id and payment_method ({", ".join(PAYMENT_METHODS)}) are required'}), 400
+        
+        ticket = Ticket.query.get(data['ticket_id'])
+        user = get_current_user()
+        if not ticket or ticket.user_id != user.id:
+            return jsonify({'error': 'Ticket not found'}), 404
+        
+        if ticket.status != 'pending' or not ticket.seat_number:
+            return jsonify({'error': 'Only booked, unpaid tickets can be paid for'}), 400
+        
+        if any(payment.payment_status in ('pending', 'completed') for payment in ticket.payments):
+            return jsonify({'error': 'Ticket already has a payment in progress'}), 409
+        
+        payment = create_payment(ticket, data['payment_method'])
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Payment created',
+            'payment': payment.to_dict()
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@payment_bp.route('/<int:payment_id>', methods=['GET'])
+@payments_required
+@login_required
+def get_payment(payment_id):
+    """Get payment status"""
+    try:
+        payment, error = _own_payment(payment_id)
+        if error:
+            return error
+        
+        return jsonify({
+            'payment': payment.to_dict()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@payment_bp.route('/<int:payment_id>/confirm', methods=['POST'])
+@payments_required
+@login_required
+def confirm_payment(payment_id):
+    """Charge a pending payment; the ticket is confirmed when the gateway reports success"""
+    try:
+        payment, error = _own_payment(payment_id)
+        if error:
+            return error
+        
+        if payment.payment_status != 'pending':
+            return jsonify({'error': f'Payment is {payment.payment_status}'}), 400
+        
+        enqueue('payments.confirm', {'payment_id': payment.id}, priority=5)
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Payment is being processed',
+            'payment': payment.to_dict()
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@payment_bp.route('/<int:payment_id>/refund', methods=['POST'])
+@payments_required
+@admin_required
+def refund_payment(payment_id):
+    """Refund a completed payment (admin only)"""
+    try:
+        payment = Payment.query.get(payment_id)
+        if not payment:
+            return jsonify({'error': 'Payment not found'}), 404
+        
+        if payment.payment_status != 'completed':
+            return jsonify({'error': f'Payment is {payment.payment_status}'}), 400
+        
+        enqueue('payments.refund', {'payment_id': payment.id}, priority=5)
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Refund requested',
+            'payment': payment.to_dict()
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@payment_bp.route('/callback', methods=['POST'])
+@payments_required
+def gateway_callback():
+    """Accept signed gateway events; they are applied in batches by the worker"""
+    try:
+        body = request.get_data()
+        if not verify_signature(body, request.headers.get(SIGNATURE_HEADER)):
+            return jsonify({'error': 'Invalid signature'}), 403
+        
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Body must be a JSON object'}), 400
+        events = data.get('events', [data])
+        if not isinstance(events, list) or not all(isinstance(event, dict) and event.get('type') and event.get('intent_id') for event in events):
+            return jsonify({'error': 'Each event needs a type and an intent_id'}), 400
+        
+        for event in events:
+            enqueue('payments.reconcile', {
+                'id': event.get('id'), 'type': event['type'], 'intent_id': event['intent_id']
+            }, priority=5)
+        db.session.commit()
+        
+        return jsonify({'queued': len(events)}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
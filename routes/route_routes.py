@@ -2,13 +2,39 @@
 Route Management Routes - CRUD operations for routes
 """
 from flask import Blueprint, request, jsonify, session
-from models import db, User, Route
+from models import db, User, Route, RouteStop, Schedule, Seat
 from routes.auth_helpers import login_required, admin_required
+from replicas import read_only
+from segments import MAX_SEGMENTS
+from read_models import ROUTES
+from page_cache import clear_page_cache
 
 route_bp = Blueprint('routes', __name__)
 
 
+def set_route_stops(route, stops):
+    """Replace a route's intermediate stops; returns an error message or None"""
+    if not isinstance(stops, list) or not all(isinstance(stop, str) and stop for stop in stops):
+        return 'stops must be a list of station names'
+    if len(stops) + 1 > MAX_SEGMENTS:
+        return f'A route can have at most {MAX_SEGMENTS - 1} intermediate stops'
+    
+    # Renumbering stops would shift the segment bits of seats already sold
+    if route.id and Seat.query.join(Schedule).filter(
+        Schedule.route_id == route.id,
+        Seat.segment_mask != 0
+    ).first():
+        return 'Cannot change stops while segment tickets are sold on this route'
+    
+    if route.id:
+        route.stops.clear()
+        db.session.flush()
+    route.stops = [RouteStop(stop_order=i, station_name=name) for i, name in enumerate(stops, start=1)]
+    return None
+
+
 @route_bp.route('/', methods=['GET'])
+@read_only
 def get_all_routes():
     """Get all routes - public access"""
     try:
@@ -17,19 +43,19 @@ def get_all_routes():
         source = request.args.get('source')
         destination = request.args.get('destination')
         
-        query = Route.query
+        query = ROUTES.select()
         
         if status:
-            query = query.filter_by(status=status)
+            query = query.where(Route.status == status)
         if source:
-            query = query.filter(Route.source_station.like(f'%{source}%'))
+            query = query.where(Route.source_station.like(f'%{source}%'))
         if destination:
-            query = query.filter(Route.destination_station.like(f'%{destination}%'))
+            query = query.where(Route.destination_station.like(f'%{destination}%'))
         
-        routes = query.all()
+        routes = ROUTES.all(query)
         
         return jsonify({
-            'routes': [route.to_dict() for route in routes],
+            'routes': routes,
             'count': len(routes)
         }), 200
         
@@ -47,7 +73,7 @@ def get_route(route_id):
             return jsonify({'error': 'Route not found'}), 404
         
         return jsonify({
-            'route': route.to_dict()
+            'route': route.to_dict(include_stops=True)
         }), 200
         
     except Exception as e:
@@ -78,12 +104,17 @@ def create_route():
             status=data.get('status', 'active')
         )
         
+        if 'stops' in data:
+            error = set_route_stops(route, data['stops'])
+            if error:
+                return jsonify({'error': error}), 400
+        
         db.session.add(route)
         db.session.commit()
         
         return jsonify({
             'message': 'Route created successfully',
-            'route': route.to_dict()
+            'route': route.to_dict(include_stops=True)
         }), 201
         
     except Exception as e:
@@ -115,12 +146,18 @@ def update_route(route_id):
             route.duration_hours = data['duration_hours']
         if 'status' in data:
             route.status = data['status']
+        if 'stops' in data:
+            error = set_route_stops(route, data['stops'])
+            if error:
+                db.session.rollback()
+                return jsonify({'error': error}), 400
         
         db.session.commit()
+        clear_page_cache()
         
         return jsonify({
             'message': 'Route updated successfully',
-            'route': route.to_dict()
+            'route': route.to_dict(include_stops=True)
         }), 200
         
     except Exception as e:
@@ -139,6 +176,7 @@ def delete_route(route_id):
         
         db.session.delete(route)
         db.session.commit()
+        clear_page_cache()
         
         return jsonify({
             'message': 'Route deleted successfully'
@@ -1,15 +1,21 @@
 """
 Schedule Management Routes - CRUD operations for schedules
 """
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app
 from models import db, User, Schedule, Train, Route
 from routes.auth_helpers import login_required, admin_required
-from datetime import datetime
+from replicas import read_only
+from inventory import get_available_counts
+from fares import get_fares, warm_fares, invalidate_fares
+from page_cache import clear_page_cache
+from sqlalchemy.orm import joinedload, contains_eager
+from datetime import datetime, date, timedelta
 
 schedule_bp = Blueprint('schedules', __name__)
 
 
 @schedule_bp.route('/', methods=['GET'])
+@read_only
 def get_all_schedules():
     """Get all schedules (public access)"""
     try:
@@ -18,7 +24,8 @@ def get_all_schedules():
         route_id = request.args.get('route_id', type=int)
         status = request.args.get('status')
         
-        query = Schedule.query
+        # to_dict reads the train and route, load them in the same query
+        query = Schedule.query.options(joinedload(Schedule.train), joinedload(Schedule.route))
         
         if train_id:
             query = query.filter_by(train_id=train_id)
@@ -38,17 +45,25 @@ def get_all_schedules():
         return jsonify({'error': str(e)}), 500
 
 
+def schedule_detail(schedule_id):
+    """Serialized schedule with its train and route fields (None if not found)"""
+    schedule = Schedule.query.options(
+        joinedload(Schedule.train), joinedload(Schedule.route)
+    ).filter_by(id=schedule_id).first()
+    return schedule.to_dict() if schedule else None
+
+
 @schedule_bp.route('/<int:schedule_id>', methods=['GET'])
 def get_schedule(schedule_id):
     """Get schedule by ID (public access)"""
     try:
-        schedule = Schedule.query.get(schedule_id)
+        schedule = schedule_detail(schedule_id)
         
         if not schedule:
             return jsonify({'error': 'Schedule not found'}), 404
         
         return jsonify({
-            'schedule': schedule.to_dict()
+            'schedule': schedule
         }), 200
         
     except Exception as e:
@@ -132,6 +147,9 @@ def update_schedule(schedule_id):
             schedule.status = data['status']
         
         db.session.commit()
+        if 'base_fare' in data:
+            invalidate_fares(schedule.id)
+        clear_page_cache()
         
         return jsonify({
             'message': 'Schedule updated successfully',
@@ -156,6 +174,8 @@ def delete_schedule(schedule_id):
         
         db.session.delete(schedule)
         db.session.commit()
+        invalidate_fares(schedule_id)
+        clear_page_cache()
         
         return jsonify({
             'message': 'Schedule deleted successfully'
@@ -166,26 +186,78 @@ def delete_schedule(schedule_id):
         return jsonify({'error': str(e)}), 500
 
 
+@schedule_bp.route('/<int:schedule_id>/fares', methods=['GET'])
+def get_schedule_fares(schedule_id):
+    """Get the fare table for a schedule over a range of dates (public access)"""
+    try:
+        schedule = Schedule.query.get(schedule_id)
+        if not schedule:
+            return jsonify({'error': 'Schedule not found'}), 404
+        
+        start_date = request.args.get('start_date')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else date.today()
+        days = request.args.get('days', type=int) or current_app.config.get('FARE_HORIZON_DAYS', 60)
+        if not 1 <= days <= 366:
+            return jsonify({'error': 'days must be between 1 and 366'}), 400
+        
+        dates = [start_date + timedelta(days=offset) for offset in range(days)]
+        tables = warm_fares([schedule_id], dates)
+        
+        return jsonify({
+            'schedule_id': schedule_id,
+            'base_fare': float(schedule.base_fare),
+            'fares': [
+                {'journey_date': journey_date.isoformat(), 'fares': tables[(schedule_id, journey_date)]}
+                for journey_date in dates
+            ]
+        }), 200
+        
+    except ValueError as ve:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @schedule_bp.route('/search', methods=['GET'])
+@read_only
 def search_schedules():
     """Search schedules by source and destination"""
     try:
         source = request.args.get('source')
         destination = request.args.get('destination')
+        journey_date = request.args.get('journey_date')
         
         if not source or not destination:
             return jsonify({'error': 'Source and destination are required'}), 400
         
-        schedules = Schedule.query.join(Route).filter(
+        schedules = Schedule.query.join(Route).options(
+            contains_eager(Schedule.route), joinedload(Schedule.train)
+        ).filter(
             Route.source_station.like(f'%{source}%'),
             Route.destination_station.like(f'%{destination}%'),
             Schedule.status == 'active'
         ).all()
         
+        results = [schedule.to_dict() for schedule in schedules]
+        
+        # Seats left come from the inventory counters and fares from the
+        # cached fare tables, not from per-row work
+        if journey_date:
+            journey_date_obj = datetime.strptime(journey_date, '%Y-%m-%d').date()
+            schedule_ids = [s.id for s in schedules]
+            counts = get_available_counts(schedule_ids, journey_date_obj)
+            fares = get_fares(schedule_ids, journey_date_obj)
+            for result in results:
+                result['seats_available'] = counts.get(result['id'], 0)
+                result['fares'] = fares.get(result['id'], {})
+                result['fare_from'] = min(result['fares'].values()) if result['fares'] else None
+        
         return jsonify({
-            'schedules': [schedule.to_dict() for schedule in schedules],
-            'count': len(schedules)
+            'schedules': results,
+            'count': len(results)
         }), 200
         
+    except ValueError as ve:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
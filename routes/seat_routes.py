@@ -1,15 +1,28 @@
 """
 Seat Management Routes - CRUD operations for seats
 """
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app
 from models import db, User, Seat, Schedule
-from routes.auth_helpers import login_required, admin_required
+from routes.auth_helpers import login_required, admin_required, get_current_user_id
+from replicas import read_only
+from holds import create_hold, release_hold, HoldUnavailableError
+from idempotency import idempotent
+from jobs import job, enqueue
+from inventory import InventoryChanges, get_inventory, check_inventory
+from seat_map import encode_seat_map
+from read_models import SEATS
+from compression import compress_response
+from segments import (resolve_segment, segment_mask, is_bookable, route_stations,
+                      SegmentBitmap, MAX_SEGMENTS)
+from sqlalchemy import select
 from datetime import datetime
+import hashlib
 
 seat_bp = Blueprint('seats', __name__)
 
 
 @seat_bp.route('/', methods=['GET'])
+@read_only
 def get_available_seats():
     """Get available seats for a schedule and date"""
     try:
@@ -25,14 +38,37 @@ def get_available_seats():
         except ValueError:
             return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
         
+        # Optional trip between intermediate stations
+        trip_mask = None
+        from_station = request.args.get('from_station')
+        to_station = request.args.get('to_station')
+        if from_station or to_station:
+            schedule = Schedule.query.get(schedule_id)
+            if not schedule:
+                return jsonify({'error': 'Schedule not found'}), 404
+            try:
+                trip_mask = segment_mask(*resolve_segment(schedule.route, from_station, to_station))
+            except ValueError as ve:
+                return jsonify({'error': str(ve)}), 400
+        
+        if request.args.get('format') == 'compact':
+            return compact_seat_map(schedule_id, journey_date_obj, trip_mask)
+        
         # Get seats
-        seats = Seat.query.filter_by(
-            schedule_id=schedule_id,
-            journey_date=journey_date_obj
+        seats = db.session.execute(
+            SEATS.select(Seat.segment_mask, Seat.hold_token).where(
+                Seat.schedule_id == schedule_id,
+                Seat.journey_date == journey_date_obj
+            )
         ).all()
         
-        available = [seat.to_dict() for seat in seats if seat.is_available]
-        occupied = [seat.to_dict() for seat in seats if not seat.is_available]
+        if trip_mask is None:
+            is_free = lambda seat: seat.is_available
+        else:
+            is_free = lambda seat: is_bookable(seat.segment_mask, seat.is_available, seat.hold_token, trip_mask)
+        
+        available = [SEATS.to_dict(seat) for seat in seats if is_free(seat)]
+        occupied = [SEATS.to_dict(seat) for seat in seats if not is_free(seat)]
         
         return jsonify({
             'available_seats': available,
@@ -45,6 +81,206 @@ def get_available_seats():
         return jsonify({'error': str(e)}), 500
 
 
+def compact_seat_map(schedule_id, journey_date, trip_mask=None):
+    """Compact seat map response with a weak ETag and negotiated compression"""
+    rows = db.session.execute(
+        select(Seat.seat_number, Seat.seat_type, Seat.is_available, Seat.segment_mask, Seat.hold_token)
+        .where(Seat.schedule_id == schedule_id, Seat.journey_date == journey_date)
+        .order_by(Seat.id)
+    ).all()
+    
+    if trip_mask is None:
+        rows = [(row.seat_number, row.seat_type, row.is_available) for row in rows]
+    else:
+        rows = [
+            (row.seat_number, row.seat_type,
+             is_bookable(row.segment_mask, row.is_available, row.hold_token, trip_mask))
+            for row in rows
+        ]
+    
+    payload = encode_seat_map(rows)
+    payload['schedule_id'] = schedule_id
+    payload['journey_date'] = journey_date.isoformat()
+    
+    response = jsonify(payload)
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest(), weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.make_conditional(request)
+    return compress_response(response, request)
+
+
+@seat_bp.route('/segments', methods=['GET'])
+def get_segment_availability():
+    """Get free seat counts for every segment of a schedule's route"""
+    try:
+        schedule_id = request.args.get('schedule_id', type=int)
+        journey_date = request.args.get('journey_date')
+        
+        if not schedule_id or not journey_date:
+            return jsonify({'error': 'schedule_id and journey_date are required'}), 400
+        
+        try:
+            journey_date_obj = datetime.strptime(journey_date, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        
+        schedule = Schedule.query.get(schedule_id)
+        if not schedule:
+            return jsonify({'error': 'Schedule not found'}), 404
+        
+        stations = route_stations(schedule.route)
+        segment_count = len(stations) - 1
+        blocked = segment_mask(0, MAX_SEGMENTS)
+        
+        # Held and out-of-service seats count as sold on every segment
+        masks = [
+            row.segment_mask if is_bookable(row.segment_mask, row.is_available, row.hold_token, 0) else blocked
+            for row in db.session.execute(
+                select(Seat.segment_mask, Seat.is_available, Seat.hold_token)
+                .where(Seat.schedule_id == schedule_id, Seat.journey_date == journey_date_obj)
+            )
+        ]
+        bitmap = SegmentBitmap.from_masks(masks, MAX_SEGMENTS)
+        
+        return jsonify({
+            'stations': stations,
+            'segments': [
+                {
+                    'from_station': stations[i],
+                    'to_station': stations[i + 1],
+                    'available': bitmap.free(i, i + 1).bit_count()
+                }
+                for i in range(segment_count)
+            ],
+            'total_seats': len(masks)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@seat_bp.route('/availability', methods=['GET'])
+def get_seat_availability():
+    """Get seat counts per type for a schedule and date"""
+    try:
+        schedule_id = request.args.get('schedule_id', type=int)
+        journey_date = request.args.get('journey_date')
+        
+        if not schedule_id or not journey_date:
+            return jsonify({'error': 'schedule_id and journey_date are required'}), 400
+        
+        try:
+            journey_date_obj = datetime.strptime(journey_date, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        
+        rows = get_inventory(schedule_id, journey_date_obj)
+        
+        return jsonify({
+            'by_type': {row.seat_type: {'available': row.available, 'occupied': row.occupied} for row in rows},
+            'total_available': sum(row.available for row in rows),
+            'total_occupied': sum(row.occupied for row in rows)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@seat_bp.route('/inventory/check', methods=['GET', 'POST'])
+@admin_required
+def check_seat_inventory():
+    """Report counter drift (GET) or report and repair it (POST) - admin only"""
+    try:
+        repair = request.method == 'POST'
+        drift = check_inventory(repair=repair)
+        if repair:
+            db.session.commit()
+        
+        return jsonify({
+            'drift': drift,
+            'count': len(drift),
+            'repaired': repair
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@seat_bp.route('/hold', methods=['POST'])
+@login_required
+@idempotent
+def hold_seats():
+    """Temporarily hold seats before booking"""
+    try:
+        data = request.get_json()
+        
+        # Validate required fields
+        if 'schedule_id' not in data or 'journey_date' not in data:
+            return jsonify({'error': 'schedule_id and journey_date are required'}), 400
+        
+        seat_numbers = data.get('seat_numbers')
+        count = data.get('count', 1)
+        max_seats = current_app.config['SEAT_HOLD_MAX_SEATS']
+        if seat_numbers is not None and not isinstance(seat_numbers, list):
+            return jsonify({'error': 'seat_numbers must be a list'}), 400
+        if not isinstance(count, int) or isinstance(count, bool):
+            return jsonify({'error': 'count must be an integer'}), 400
+        if len(seat_numbers or []) > max_seats or not 1 <= count <= max_seats:
+            return jsonify({'error': f'You can hold between 1 and {max_seats} seats'}), 400
+        
+        journey_date = datetime.strptime(data['journey_date'], '%Y-%m-%d').date()
+        
+        try:
+            token, expires_at, seats = create_hold(
+                get_current_user_id(),
+                data['schedule_id'],
+                journey_date,
+                seat_numbers=seat_numbers,
+                count=count,
+                seat_type=data.get('seat_type')
+            )
+        except HoldUnavailableError as he:
+            return jsonify({'error': str(he)}), 409
+        
+        db.session.commit()
+        
+        return jsonify({
+            'message': f'{len(seats)} seats held',
+            'hold': {
+                'hold_token': token,
+                'expires_at': expires_at.isoformat(),
+                'seats': [seat.to_dict() for seat in seats]
+            }
+        }), 201
+        
+    except ValueError as ve:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@seat_bp.route('/hold/<string:hold_token>', methods=['DELETE'])
+@login_required
+def delete_hold(hold_token):
+    """Release a seat hold before it expires"""
+    try:
+        released = release_hold(hold_token, get_current_user_id())
+        if not released:
+            return jsonify({'error': 'Hold not found'}), 404
+        
+        db.session.commit()
+        
+        return jsonify({
+            'message': f'{released} seats released'
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 @seat_bp.route('/', methods=['POST'])
 @admin_required
 def create_seat():
@@ -86,6 +322,9 @@ def create_seat():
         )
         
         db.session.add(seat)
+        changes = InventoryChanges()
+        changes.add(seat)
+        changes.apply()
         db.session.commit()
         
         return jsonify({
@@ -100,10 +339,45 @@ def create_seat():
         return jsonify({'error': str(e)}), 500
 
 
+def create_seats(schedule_id, journey_date, seats):
+    """Add the seats not already on this departure; returns them (the caller commits)"""
+    taken = set(db.session.execute(
+        select(Seat.seat_number).where(Seat.schedule_id == schedule_id, Seat.journey_date == journey_date)
+    ).scalars())
+    
+    created_seats = []
+    changes = InventoryChanges()
+    for seat_info in seats:
+        if seat_info['seat_number'] in taken:
+            continue
+        seat = Seat(
+            schedule_id=schedule_id,
+            journey_date=journey_date,
+            seat_number=seat_info['seat_number'],
+            seat_type=seat_info['seat_type'],
+            is_available=True
+        )
+        db.session.add(seat)
+        created_seats.append(seat)
+        changes.add(seat)
+        taken.add(seat.seat_number)
+    
+    changes.apply()
+    return created_seats
+
+
+@job('seats.bulk_create')
+def bulk_create_seats_job(payload):
+    """Job: create_seats for a queued POST /api/seats/bulk"""
+    journey_date = datetime.strptime(payload['journey_date'], '%Y-%m-%d').date()
+    created_seats = create_seats(payload['schedule_id'], journey_date, payload['seats'])
+    return {'created': len(created_seats)}
+
+
 @seat_bp.route('/bulk', methods=['POST'])
 @admin_required
 def create_bulk_seats():
-    """Create multiple seats at once (admin only)"""
+    """Create multiple seats at once (admin only); large requests are queued as a job"""
     try:
         data = request.get_json()
         
@@ -117,26 +391,21 @@ def create_bulk_seats():
         
         journey_date = datetime.strptime(data['journey_date'], '%Y-%m-%d').date()
         
-        created_seats = []
-        for seat_info in data['seats']:
-            # Check if seat already exists
-            existing = Seat.query.filter_by(
-                schedule_id=data['schedule_id'],
-                journey_date=journey_date,
-                seat_number=seat_info['seat_number']
-            ).first()
+        if len(data['seats']) > current_app.config['JOB_INLINE_MAX_SEATS']:
+            queued = enqueue('seats.bulk_create', {
+                'schedule_id': schedule.id,
+                'journey_date': journey_date.isoformat(),
+                'seats': [{'seat_number': seat['seat_number'], 'seat_type': seat['seat_type']}
+                          for seat in data['seats']]
+            })
+            db.session.commit()
             
-            if not existing:
-                seat = Seat(
-                    schedule_id=data['schedule_id'],
-                    journey_date=journey_date,
-                    seat_number=seat_info['seat_number'],
-                    seat_type=seat_info['seat_type'],
-                    is_available=True
-                )
-                db.session.add(seat)
-                created_seats.append(seat)
+            return jsonify({
+                'message': f'Creating {len(data["seats"])} seats in the background',
+                'job': queued.to_dict()
+            }), 202
         
+        created_seats = create_seats(schedule.id, journey_date, data['seats'])
         db.session.commit()
         
         return jsonify({
@@ -160,12 +429,17 @@ def update_seat(seat_id):
         
         data = request.get_json()
         
+        changes = InventoryChanges()
+        changes.remove(seat)
+        
         # Update fields
         if 'is_available' in data:
             seat.is_available = data['is_available']
         if 'seat_type' in data:
             seat.seat_type = data['seat_type']
         
+        changes.add(seat)
+        changes.apply()
         db.session.commit()
         
         return jsonify({
@@ -187,7 +461,10 @@ def delete_seat(seat_id):
         if not seat:
             return jsonify({'error': 'Seat not found'}), 404
         
+        changes = InventoryChanges()
+        changes.remove(seat)
         db.session.delete(seat)
+        changes.apply()
         db.session.commit()
         
         return jsonify({
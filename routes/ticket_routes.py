@@ -4,6 +4,16 @@ Ticket Booking Routes - CRUD operations for tickets
 from flask import Blueprint, request, jsonify, session
 from models import db, User, Ticket, Schedule, Seat
 from routes.auth_helpers import login_required, get_current_user_id
+from replicas import read_only
+from holds import claim_held_seat
+from idempotency import idempotent
+from inventory import InventoryChanges, release_ticket_seat
+from segments import resolve_segment, segment_mask, bookable_for
+from fares import quote_fare, invalidate_fares
+from outbox import record_event
+from payments import payments_enabled, refund_ticket
+from read_models import TICKETS
+from sqlalchemy.orm import joinedload
 from datetime import datetime, date
 import random
 import string
@@ -18,6 +28,7 @@ def generate_pnr():
 
 @ticket_bp.route('/', methods=['POST'])
 @login_required
+@idempotent
 def book_ticket():
     """Book a new ticket"""
     try:
@@ -46,12 +57,47 @@ def book_ticket():
         if journey_date < date.today():
             return jsonify({'error': 'Journey date must be in the future'}), 400
         
-        # Check available seats
-        available_seats = Seat.query.filter_by(
-            schedule_id=data['schedule_id'],
-            journey_date=journey_date,
-            is_available=True
-        ).first()
+        # A trip between intermediate stations only takes those route segments
+        from_stop = to_stop = None
+        if data.get('from_station') or data.get('to_station'):
+            try:
+                from_stop, to_stop = resolve_segment(
+                    schedule.route, data.get('from_station'), data.get('to_station')
+                )
+            except ValueError as ve:
+                return jsonify({'error': str(ve)}), 400
+            if from_stop == 0 and to_stop == len(schedule.route.stops) + 1:
+                from_stop = to_stop = None
+        trip_mask = segment_mask(from_stop, to_stop) if from_stop is not None else None
+        
+        # Use the seat from a live hold, otherwise take any available seat
+        if data.get('hold_token'):
+            available_seats = claim_held_seat(
+                data['hold_token'], current_user_id, data.get('seat_number')
+            )
+            if (not available_seats
+                    or available_seats.schedule_id != int(data['schedule_id'])
+                    or available_seats.journey_date != journey_date):
+                db.session.rollback()
+                return jsonify({'error': 'Seat hold not found or expired'}), 409
+        elif trip_mask is not None:
+            # Fill partly sold seats first so whole seats stay free for long trips
+            available_seats = Seat.query.filter(
+                Seat.schedule_id == data['schedule_id'],
+                Seat.journey_date == journey_date,
+                bookable_for(trip_mask)
+            ).order_by(Seat.is_available, Seat.id).with_for_update().first()
+        else:
+            available_seats = Seat.query.filter_by(
+                schedule_id=data['schedule_id'],
+                journey_date=journey_date,
+                is_available=True
+            ).with_for_update().first()
+        
+        # Price from the fare engine, quoted before this seat is taken
+        fare = quote_fare(
+            schedule.id, journey_date, available_seats.seat_type if available_seats else None
+        )
         
         # Generate unique PNR
         pnr = generate_pnr()
@@ -67,21 +113,34 @@ def book_ticket():
             passenger_name=data['passenger_name'],
             passenger_age=data['passenger_age'],
             passenger_gender=data['passenger_gender'],
-            fare=schedule.base_fare,
+            fare=fare if fare is not None else schedule.base_fare,
             pnr_number=pnr,
-            status='pending' if not available_seats else 'confirmed',
-            seat_number=available_seats.seat_number if available_seats else None
+            status='confirmed' if available_seats and not payments_enabled() else 'pending',
+            seat_number=available_seats.seat_number if available_seats else None,
+            from_stop=from_stop,
+            to_stop=to_stop
         )
         
         db.session.add(ticket)
         
         # Reserve seat if available
         if available_seats:
+            db.session.flush()
+            changes = InventoryChanges()
+            changes.remove(available_seats)
             available_seats.is_available = False
-            available_seats.ticket_id = ticket.id
+            if trip_mask is None:
+                available_seats.ticket_id = ticket.id
+            else:
+                available_seats.segment_mask |= trip_mask
             ticket.seat_number = available_seats.seat_number
+            changes.add(available_seats)
+            changes.apply()
         
+        db.session.flush()
+        record_event('ticket.booked', {'ticket': ticket.to_dict()})
         db.session.commit()
+        invalidate_fares(schedule.id, journey_date)
         
         return jsonify({
             'message': 'Ticket booked successfully',
@@ -95,22 +154,25 @@ def book_ticket():
         return jsonify({'error': str(e)}), 500
 
 
+def user_tickets(user):
+    """Serialized tickets the user can see"""
+    # Admin can see all tickets, users see only their own
+    query = TICKETS.select()
+    if user.role != 'admin':
+        query = query.where(Ticket.user_id == user.id)
+    return TICKETS.all(query)
+
+
 @ticket_bp.route('/', methods=['GET'])
 @login_required
 def get_user_tickets():
     """Get all tickets for logged-in user"""
     try:
-        current_user_id = get_current_user_id()
-        current_user = User.query.get(current_user_id)
-        
-        # Admin can see all tickets, users see only their own
-        if current_user.role == 'admin':
-            tickets = Ticket.query.all()
-        else:
-            tickets = Ticket.query.filter_by(user_id=current_user_id).all()
+        current_user = User.query.get(get_current_user_id())
+        tickets = user_tickets(current_user)
         
         return jsonify({
-            'tickets': [ticket.to_dict() for ticket in tickets],
+            'tickets': tickets,
             'count': len(tickets)
         }), 200
         
@@ -144,16 +206,21 @@ def get_ticket(ticket_id):
 
 
 @ticket_bp.route('/pnr/<string:pnr>', methods=['GET'])
+@read_only
 def get_ticket_by_pnr(pnr):
     """Get ticket by PNR number (public access)"""
     try:
-        ticket = Ticket.query.filter_by(pnr_number=pnr).first()
+        # Ticket, schedule, train and route in one query
+        ticket = Ticket.query.options(
+            joinedload(Ticket.schedule).joinedload(Schedule.train),
+            joinedload(Ticket.schedule).joinedload(Schedule.route)
+        ).filter_by(pnr_number=pnr).first()
         
         if not ticket:
             return jsonify({'error': 'Ticket not found'}), 404
         
         # Get schedule details
-        schedule = Schedule.query.get(ticket.schedule_id)
+        schedule = ticket.schedule
         ticket_dict = ticket.to_dict()
         ticket_dict['schedule'] = schedule.to_dict() if schedule else None
         
@@ -167,6 +234,7 @@ def get_ticket_by_pnr(pnr):
 
 @ticket_bp.route('/<int:ticket_id>/cancel', methods=['PUT'])
 @login_required
+@idempotent
 def cancel_ticket(ticket_id):
     """Cancel a ticket"""
     try:
@@ -189,18 +257,16 @@ def cancel_ticket(ticket_id):
         ticket.status = 'cancelled'
         
         # Release seat if reserved
-        if ticket.seat_number:
-            seat = Seat.query.filter_by(
-                schedule_id=ticket.schedule_id,
-                journey_date=ticket.journey_date,
-                seat_number=ticket.seat_number
-            ).first()
-            
-            if seat:
-                seat.is_available = True
-                seat.ticket_id = None
+        changes = InventoryChanges()
+        release_ticket_seat(ticket, changes)
+        changes.apply()
         
+        if payments_enabled():
+            refund_ticket(ticket)
+        record_event('ticket.cancelled', {'ticket': ticket.to_dict(), 'cancelled_by': current_user_id})
         db.session.commit()
+        if ticket.seat_number:
+            invalidate_fares(ticket.schedule_id, ticket.journey_date)
         
         return jsonify({
             'message': 'Ticket cancelled successfully',
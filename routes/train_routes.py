@@ -4,11 +4,15 @@ Train Management Routes - CRUD operations for trains
 from flask import Blueprint, request, jsonify, session
 from models import db, User, Train
 from routes.auth_helpers import login_required, admin_required
+from replicas import read_only
+from read_models import TRAINS
+from page_cache import clear_page_cache
 
 train_bp = Blueprint('trains', __name__)
 
 
 @train_bp.route('/', methods=['GET'])
+@read_only
 def get_all_trains():
     """Get all trains (public access)"""
     try:
@@ -16,17 +20,17 @@ def get_all_trains():
         status = request.args.get('status')
         train_type = request.args.get('train_type')
         
-        query = Train.query
+        query = TRAINS.select()
         
         if status:
-            query = query.filter_by(status=status)
+            query = query.where(Train.status == status)
         if train_type:
-            query = query.filter_by(train_type=train_type)
+            query = query.where(Train.train_type == train_type)
         
-        trains = query.all()
+        trains = TRAINS.all(query)
         
         return jsonify({
-            'trains': [train.to_dict() for train in trains],
+            'trains': trains,
             'count': len(trains)
         }), 200
         
@@ -118,6 +122,7 @@ def update_train(train_id):
             train.train_number = data['train_number']
         
         db.session.commit()
+        clear_page_cache()
         
         return jsonify({
             'message': 'Train updated successfully',
@@ -140,6 +145,7 @@ def delete_train(train_id):
         
         db.session.delete(train)
         db.session.commit()
+        clear_page_cache()
         
         return jsonify({
             'message': 'Train deleted successfully'
@@ -151,6 +157,7 @@ def delete_train(train_id):
 
 
 @train_bp.route('/search', methods=['GET'])
+@read_only
 def search_trains():
     """Search trains by train number or name"""
     try:
@@ -4,6 +4,7 @@ User Management Routes - CRUD operations for users
 from flask import Blueprint, request, jsonify, session
 from models import db, User
 from routes.auth_helpers import login_required, admin_required, get_current_user_id
+from read_models import USERS
 
 user_bp = Blueprint('users', __name__)
 
@@ -13,9 +14,8 @@ user_bp = Blueprint('users', __name__)
 def get_all_users():
     """Get all users (admin only)"""
     try:
-        users = User.query.all()
         return jsonify({
-            'users': [user.to_dict() for user in users]
+            'users': USERS.all(USERS.select())
         }), 200
         
     except Exception as e:
@@ -1,86 +1,148 @@
 """
 Web Routes - Frontend page rendering
+
+Pages are static shells filled in by the browser from the API; pages for
+anonymous visitors are cached (page_cache.py). With EMBED_INITIAL_DATA the
+booking, tickets and dashboard pages also carry the JSON their first API
+call would return, built by the same functions as the API views, so the
+browser can paint without that round trip.
 """
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, current_app, session
+from models import User
+from page_cache import cached_page
+from routes.schedule_routes import schedule_detail
+from routes.ticket_routes import user_tickets
 
 web_bp = Blueprint('web', __name__)
 
 
+def initial_data(load):
+    """load()'s payload to embed in the page, or None (the page then fetches it)"""
+    if not current_app.config.get('EMBED_INITIAL_DATA'):
+        return None
+    try:
+        return load()
+    except Exception:
+        current_app.logger.exception('Could not embed initial page data')
+        return None
+
+
+def signed_in_user():
+    """The signed-in user, or None"""
+    user_id = session.get('user_id')
+    return User.query.get(user_id) if user_id is not None else None
+
+
+def _schedule_data(schedule_id):
+    schedule = schedule_detail(schedule_id)
+    return {'schedule': schedule} if schedule else None
+
+
+def _tickets_data():
+    user = signed_in_user()
+    if user is None:
+        return None
+    tickets = user_tickets(user)
+    return {'tickets': tickets, 'count': len(tickets)}
+
+
+def _dashboard_data():
+    user = signed_in_user()
+    if user is None:
+        return None
+    return {'user': user.to_dict(), 'tickets': user_tickets(user)}
+
+
 @web_bp.route('/')
+@cached_page
 def home():
     """Home page"""
     return render_template('index.html')
 
 
 @web_bp.route('/register')
+@cached_page
 def register_page():
     """Registration page"""
     return render_template('register.html')
 
 
 @web_bp.route('/login')
+@cached_page
 def login_page():
     """Login page"""
     return render_template('login.html')
 
 
 @web_bp.route('/dashboard')
+@cached_page
 def dashboard():
     """User dashboard"""
-    return render_template('dashboard.html')
+    return render_template('dashboard.html', initial_data=initial_data(_dashboard_data))
 
 
 @web_bp.route('/trains')
+@cached_page
 def trains_page():
     """Trains listing page"""
     return render_template('trains.html')
 
 
 @web_bp.route('/search')
+@cached_page
 def search_page():
     """Search trains page"""
     return render_template('search.html')
 
 
 @web_bp.route('/book/<int:schedule_id>')
+@cached_page(ttl_setting='PAGE_CACHE_DATA_SECONDS')
 def book_page(schedule_id):
     """Booking page"""
-    return render_template('book.html', schedule_id=schedule_id)
+    return render_template('book.html', schedule_id=schedule_id,
+                           initial_data=initial_data(lambda: _schedule_data(schedule_id)))
 
 
 @web_bp.route('/tickets')
+@cached_page
 def tickets_page():
     """My tickets page"""
-    return render_template('tickets.html')
+    return render_template('tickets.html', initial_data=initial_data(_tickets_data))
 
 
 @web_bp.route('/admin')
+@cached_page
 def admin_page():
     """Admin dashboard"""
     return render_template('admin.html')
 
 
 @web_bp.route('/admin/trains')
+@cached_page
 def admin_trains():
     """Admin trains management"""
     return render_template('admin_trains.html')
 
 
 @web_bp.route('/admin/routes')
+@cached_page
 def admin_routes():
     """Admin routes management"""
     return render_template('admin_routes.html')
 
 
 @web_bp.route('/admin/schedules')
+@cached_page
 def admin_schedules():
     """Admin schedules management"""
     return render_template('admin_schedules.html')
 
 @web_bp.route('/admin/users')
+@cached_page
 def admin_users():
     return render_template('admin_users.html')
 
 @web_bp.route('/admin/tickets')
+@cached_page
 def admin_tickets():
     return render_template('admin_tickets.html')
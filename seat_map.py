@@ -0,0 +1,95 @@
+"""
+Compact seat map encoding
+
+A seat map is sent as run-length encoded seat numbers (prefix, first number,
+count), a small seat-type dictionary with run-length encoded type runs, and an
+availability bitmap (base64, one bit per seat, most significant bit first).
+A 1,000 seat train fits in a few hundred bytes once gzipped, instead of two
+arrays of full seat objects.
+"""
+import base64
+import re
+
+SEAT_NUMBER_PATTERN = re.compile(r'^(.*?)([1-9][0-9]*)$')
+
+
+def encode_bitmap(flags):
+    """Pack booleans into a base64 string, MSB first"""
+    packed = bytearray((len(flags) + 7) // 8)
+    for index, flag in enumerate(flags):
+        if flag:
+            packed[index >> 3] |= 0x80 >> (index & 7)
+    return base64.b64encode(bytes(packed)).decode('ascii')
+
+
+def decode_bitmap(encoded, length):
+    """Inverse of encode_bitmap"""
+    packed = base64.b64decode(encoded)
+    return [bool(packed[i >> 3] & (0x80 >> (i & 7))) for i in range(length)]
+
+
+def encode_runs(values):
+    """Run-length encode a sequence into [value, count] pairs"""
+    runs = []
+    for value in values:
+        if runs and runs[-1][0] == value:
+            runs[-1][1] += 1
+        else:
+            runs.append([value, 1])
+    return runs
+
+
+def encode_seat_numbers(seat_numbers):
+    """Collapse consecutive numbers ("A1", "A2", ...) into [prefix, start, count].
+
+    Numbers without a numeric suffix are sent as [seat_number, None, 1].
+    """
+    runs = []
+    for seat_number in seat_numbers:
+        match = SEAT_NUMBER_PATTERN.match(seat_number)
+        if not match:
+            runs.append([seat_number, None, 1])
+            continue
+        prefix, number = match.group(1), int(match.group(2))
+        last = runs[-1] if runs else None
+        if last and last[1] is not None and last[0] == prefix and last[1] + last[2] == number:
+            last[2] += 1
+        else:
+            runs.append([prefix, number, 1])
+    return runs
+
+
+def decode_seat_numbers(runs):
+    """Inverse of encode_seat_numbers"""
+    seat_numbers = []
+    for prefix, start, count in runs:
+        if start is None:
+            seat_numbers.append(prefix)
+        else:
+            seat_numbers.extend(f'{prefix}{number}' for number in range(start, start + count))
+    return seat_numbers
+
+
+def encode_seat_map(rows):
+    """Build the compact payload from (seat_number, seat_type, is_available) rows"""
+    seat_types = []
+    type_index = {}
+    type_ids = []
+    for _, seat_type, _ in rows:
+        if seat_type not in type_index:
+            type_index[seat_type] = len(seat_types)
+            seat_types.append(seat_type)
+        type_ids.append(type_index[seat_type])
+
+    available = [bool(is_available) for _, _, is_available in rows]
+    total_available = sum(available)
+
+    return {
+        'seat_count': len(rows),
+        'seat_number_runs': encode_seat_numbers([seat_number for seat_number, _, _ in rows]),
+        'seat_types': seat_types,
+        'type_runs': encode_runs(type_ids),
+        'availability': encode_bitmap(available),
+        'total_available': total_available,
+        'total_occupied': len(rows) - total_available
+    }
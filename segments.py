@@ -0,0 +1,139 @@
+"""
+Segment Inventory - selling seats per route segment with interval bitsets
+
+A route with stations S0..Sn has n segments; segment i runs from Si to Si+1.
+Each seat stores a segment_mask (BIGINT) where bit i is set when segment i is
+sold, so a trip from stop a to stop c needs bits a..c-1 clear. In memory the
+masks are transposed into one seat bitset per segment (SegmentBitmap), which
+turns an a->c availability query into an OR over c-a Python integers.
+"""
+from sqlalchemy import and_, or_
+from models import Seat
+
+# Seat.segment_mask is a signed 64-bit column
+MAX_SEGMENTS = 63
+
+
+def segment_mask(from_index, to_index):
+    """Bits for segments from_index..to_index-1"""
+    return ((1 << to_index) - 1) ^ ((1 << from_index) - 1)
+
+
+def route_stations(route):
+    """Ordered station names for a route, source and destination included"""
+    return [route.source_station] + [stop.station_name for stop in route.stops] + [route.destination_station]
+
+
+def full_route_mask(route):
+    """Mask covering every segment of a route"""
+    return segment_mask(0, len(route.stops) + 1)
+
+
+def resolve_segment(route, from_station=None, to_station=None):
+    """Stop indexes for a trip, defaulting to the route ends.
+
+    Raises ValueError if a station is not on the route or the order is reversed.
+    """
+    stations = route_stations(route)
+    try:
+        from_index = stations.index(from_station) if from_station else 0
+        to_index = stations.index(to_station, from_index) if to_station else len(stations) - 1
+    except ValueError:
+        raise ValueError('Stations are not on this route in travel order')
+    if from_index >= to_index:
+        raise ValueError('Stations are not on this route in travel order')
+    return from_index, to_index
+
+
+def bookable_for(mask):
+    """SQL condition: seat can be sold for the segments in `mask`.
+
+    Held seats and seats taken out of service (unavailable with no segment
+    sold) never qualify.
+    """
+    return and_(
+        Seat.segment_mask.op('&')(mask) == 0,
+        Seat.hold_token.is_(None),
+        or_(Seat.is_available == True, Seat.segment_mask != 0)
+    )
+
+
+def is_bookable(seat_mask, is_available, hold_token, mask):
+    """Python twin of bookable_for for already loaded rows"""
+    if hold_token is not None or seat_mask & mask:
+        return False
+    return bool(is_available) or seat_mask != 0
+
+
+class SegmentBitmap:
+    """Per-segment seat bitsets for one schedule and journey date.
+
+    Bit j of segments[i] is set when seat j is sold on segment i. Memory is
+    segment_count * seat_count bits, e.g. 40 segments x 2,000 seats ~ 10 KB.
+    """
+    __slots__ = ('seat_count', 'segments', 'all_seats')
+
+    def __init__(self, seat_count, segment_count):
+        self.seat_count = seat_count
+        self.segments = [0] * segment_count
+        self.all_seats = (1 << seat_count) - 1
+
+    @classmethod
+    def from_masks(cls, seat_masks, segment_count):
+        """Transpose per-seat masks (as stored) into per-segment bitsets"""
+        bitmap = cls(len(seat_masks), segment_count)
+        segments = bitmap.segments
+        for seat_index, mask in enumerate(seat_masks):
+            while mask:
+                low = mask & -mask
+                segments[low.bit_length() - 1] |= 1 << seat_index
+                mask ^= low
+        return bitmap
+
+    def occupied(self, from_index, to_index):
+        """Bitset of seats sold on any segment of the trip"""
+        taken = 0
+        for bits in self.segments[from_index:to_index]:
+            taken |= bits
+        return taken
+
+    def free(self, from_index, to_index):
+        """Bitset of seats free for the whole trip"""
+        return self.all_seats & ~self.occupied(from_index, to_index)
+
+    def first_free(self, from_index, to_index, candidates=None):
+        """Lowest free seat index (optionally within a candidate bitset), or None"""
+        free = self.free(from_index, to_index)
+        if candidates is not None:
+            free &= candidates
+        if not free:
+            return None
+        return (free & -free).bit_length() - 1
+
+    def book(self, seat_index, from_index, to_index):
+        """Mark a seat sold for the trip"""
+        bit = 1 << seat_index
+        for segment in range(from_index, to_index):
+            self.segments[segment] |= bit
+
+    def release(self, seat_index, from_index, to_index):
+        """Clear a seat for the trip"""
+        bit = ~(1 << seat_index)
+        for segment in range(from_index, to_index):
+            self.segments[segment] &= bit
+
+    def seat_mask(self, seat_index):
+        """Per-seat mask for storage in Seat.segment_mask"""
+        mask = 0
+        for segment, bits in enumerate(self.segments):
+            if bits >> seat_index & 1:
+                mask |= 1 << segment
+        return mask
+
+
+def iter_bits(bitset):
+    """Indexes of the set bits, lowest first"""
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset ^= low
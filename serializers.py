@@ -0,0 +1,141 @@
+"""
+JSON serialization - generated model serializers and an orjson JSON provider
+
+Models declare which columns their to_dict() returns with
+column_serializer(); the method body is generated once per model from the
+column types (dates and times as ISO strings, Numeric as float), so a list
+endpoint pays one dict display per row instead of per-field conditionals
+and attribute lookups in Python.
+
+OrjsonProvider replaces Flask's stdlib JSON provider when orjson is
+installed. Output is compact unless JSON_COMPACT is off; keys keep insertion
+order unless JSON_SORT_KEYS is on.
+"""
+import datetime
+import decimal
+from flask.json.provider import JSONProvider
+from sqlalchemy import inspect
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, Flask's stdlib provider is the fallback
+    orjson = None
+
+# Generated expression per column python type; v is the attribute value
+_CONVERTERS = {
+    datetime.datetime: '(v.isoformat() if (v := {value}) else None)',
+    datetime.date: '(v.isoformat() if (v := {value}) else None)',
+    datetime.time: '(v.isoformat() if (v := {value}) else None)',
+    decimal.Decimal: '(float(v) if (v := {value}) else 0)',
+}
+
+
+def _python_type(column_type):
+    try:
+        return column_type.python_type
+    except NotImplementedError:
+        return None
+
+
+def _generate(model, names, accessor):
+    """Compile a dict display over names, reading each value with accessor(index, name)"""
+    columns = inspect(model).columns
+    items = []
+    for index, name in enumerate(names):
+        template = _CONVERTERS.get(_python_type(columns[name].type), '{value}')
+        items.append(f'{name!r}: {template.format(value=accessor(index, name))}')
+    source = 'def to_dict(obj):\n    return {' + ', '.join(items) + '}\n'
+    namespace = {}
+    exec(compile(source, f'<{model.__name__} serializer>', 'exec'), namespace)
+    to_dict = namespace['to_dict']
+    to_dict.__doc__ = 'Convert model to dictionary'
+    to_dict.__source__ = source
+    to_dict.__columns__ = names
+    return to_dict
+
+
+def compile_serializer(model, names):
+    """Generate obj -> dict for the named mapped columns of model"""
+    return _generate(model, names, lambda index, name: f'obj.{name}')
+
+
+def compile_row_serializer(model, names):
+    """Generate row -> dict for result rows whose leading columns are names"""
+    return _generate(model, names, lambda index, name: f'obj[{index}]')
+
+
+class column_serializer:
+    """Model method returning the named columns as a JSON-ready dict.
+
+    Compiled on first use, once the mapper is configured, then installed on
+    the class in place of this descriptor.
+    """
+
+    def __init__(self, *names):
+        self.names = names
+
+    def __set_name__(self, owner, name):
+        self.attribute = name
+
+    def __get__(self, obj, owner):
+        method = compile_serializer(owner, self.names)
+        setattr(owner, self.attribute, method)
+        return method if obj is None else method.__get__(obj, owner)
+
+
+def compile_serializers(classes):
+    """Compile the column serializers of classes now rather than on first use"""
+    for cls in classes:
+        for name, value in list(vars(cls).items()):
+            if isinstance(value, column_serializer):
+                getattr(cls, name)
+
+
+def _default(o):
+    """Types orjson leaves to the caller"""
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Unlike Flask's default provider, date objects are written as ISO dates,
+    not HTTP dates; the views already send dates as ISO strings.
+    """
+    sort_keys = False
+    compact = None
+    mimetype = 'application/json'
+
+    def _option(self, sort_keys=None, indent=None):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        option = self._option(kwargs.get('sort_keys'), kwargs.get('indent'))
+        return orjson.dumps(obj, default=_default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=_default,
+                            option=self._option(indent=pretty) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Install the orjson provider (if available) and apply the JSON_* settings"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    app.json.sort_keys = app.config.get('JSON_SORT_KEYS', False)
+    app.json.compact = app.config.get('JSON_COMPACT')
@@ -0,0 +1,200 @@
+"""
+Slow Query Log - sampled slow statements with redacted parameters and EXPLAIN
+
+Statements slower than SLOW_QUERY_MS (sampled at SLOW_QUERY_SAMPLE_RATE) are
+kept in a bounded ring buffer of recent events and a bounded per-fingerprint
+summary (count, total/max time, last endpoint). Parameters are stored only
+as type and length, never values.
+
+The first time a SELECT fingerprint is seen it is queued for an EXPLAIN,
+which a background thread runs on its own pooled connection with the real
+parameters, so the request that hit the slow query never waits for it.
+"""
+import hashlib
+import logging
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from flask import current_app, has_app_context, has_request_context, request
+from query_profiler import add_statement_listener, fingerprint
+
+logger = logging.getLogger('slow_queries')
+
+EXPLAIN_MARKER = 'slow_query_explain'
+
+
+def redact(parameters, executemany=False):
+    """Replace parameter values with their type (and length for strings/bytes)"""
+    if executemany and parameters:
+        parameters = parameters[0]
+
+    def describe(value):
+        if value is None:
+            return None
+        if isinstance(value, (str, bytes)):
+            return f'<{type(value).__name__}:{len(value)}>'
+        return f'<{type(value).__name__}>'
+
+    if isinstance(parameters, dict):
+        return {key: describe(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [describe(value) for value in parameters]
+    return describe(parameters)
+
+
+def explain_statement(engine, statement, parameters):
+    """Query plan rows for a SELECT, using the dialect's EXPLAIN syntax"""
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    with engine.connect() as connection:
+        connection.info[EXPLAIN_MARKER] = True
+        try:
+            result = connection.exec_driver_sql(prefix + statement, parameters)
+            return [{key: _plain(value) for key, value in row.items()} for row in result.mappings()]
+        finally:
+            connection.info.pop(EXPLAIN_MARKER, None)
+
+
+def _plain(value):
+    return value if value is None or isinstance(value, (int, float, str)) else str(value)
+
+
+class SlowQueryLog:
+    """Bounded, thread-safe store of slow statements"""
+
+    def __init__(self, threshold_ms=200, sample_rate=1.0, capacity=200, explain=True):
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.capacity = capacity
+        self.explain = explain
+        self.recent = deque(maxlen=capacity)
+        self.fingerprints = OrderedDict()
+        self._lock = threading.Lock()
+        self._explain_queue = queue.Queue(maxsize=100)
+        self._explain_thread = None
+
+    def record(self, conn, statement, parameters, executemany, elapsed):
+        """Statement listener: keep statements over the threshold"""
+        if elapsed < self.threshold or conn.info.get(EXPLAIN_MARKER):
+            return
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+
+        sql = fingerprint(statement)
+        key = hashlib.sha1(sql.encode()).hexdigest()[:12]
+        endpoint = request.endpoint if has_request_context() else None
+        duration_ms = round(elapsed * 1000, 2)
+        event = {
+            'fingerprint_id': key,
+            'duration_ms': duration_ms,
+            'parameters': redact(parameters, executemany),
+            'endpoint': endpoint,
+            'at': datetime.utcnow().isoformat()
+        }
+
+        with self._lock:
+            self.recent.append(event)
+            summary = self.fingerprints.get(key)
+            is_new = summary is None
+            if is_new:
+                summary = self.fingerprints[key] = {
+                    'fingerprint_id': key,
+                    'statement': sql,
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'plan': None,
+                    'plan_error': None
+                }
+                if len(self.fingerprints) > self.capacity:
+                    self.fingerprints.popitem(last=False)
+            else:
+                self.fingerprints.move_to_end(key)
+            summary['count'] += 1
+            summary['total_ms'] = round(summary['total_ms'] + duration_ms, 2)
+            summary['max_ms'] = max(summary['max_ms'], duration_ms)
+            summary['last_endpoint'] = endpoint
+            summary['last_seen'] = event['at']
+
+        if is_new and self.explain and statement.lstrip()[:6].upper() == 'SELECT' and not executemany:
+            self._queue_explain(conn.engine, key, statement, parameters)
+
+    def _queue_explain(self, engine, key, statement, parameters):
+        try:
+            self._explain_queue.put_nowait((engine, key, statement, parameters))
+        except queue.Full:
+            return
+        if self._explain_thread is None or not self._explain_thread.is_alive():
+            with self._lock:
+                # A thread started before a fork does not exist in the child
+                if self._explain_thread is None or not self._explain_thread.is_alive():
+                    self._explain_thread = threading.Thread(
+                        target=self._explain_worker, name='slow-query-explain', daemon=True
+                    )
+                    self._explain_thread.start()
+
+    def _explain_worker(self):
+        while True:
+            engine, key, statement, parameters = self._explain_queue.get()
+            try:
+                plan, error = explain_statement(engine, statement, parameters), None
+            except Exception as e:
+                plan, error = None, str(e)
+                logger.warning('EXPLAIN failed for %s: %s', key, e)
+            with self._lock:
+                summary = self.fingerprints.get(key)
+                if summary is not None:
+                    summary['plan'] = plan
+                    summary['plan_error'] = error
+            self._explain_queue.task_done()
+
+    def wait_for_explains(self, timeout=5.0):
+        """Block until queued EXPLAINs are done (for tests and scripts)"""
+        deadline = time.monotonic() + timeout
+        while self._explain_queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def snapshot(self, limit=50):
+        """Slowest fingerprints by total time, and the most recent events"""
+        with self._lock:
+            top = sorted(self.fingerprints.values(), key=lambda s: s['total_ms'], reverse=True)
+            return {
+                'threshold_ms': self.threshold * 1000,
+                'sample_rate': self.sample_rate,
+                'fingerprints': [dict(summary) for summary in top[:limit]],
+                'recent': list(self.recent)[-limit:][::-1]
+            }
+
+    def clear(self):
+        with self._lock:
+            self.recent.clear()
+            self.fingerprints.clear()
+
+
+def _record(conn, statement, parameters, executemany, elapsed):
+    if has_app_context():
+        log = current_app.extensions.get('slow_query_log')
+        if log is not None:
+            log.record(conn, statement, parameters, executemany, elapsed)
+
+
+add_statement_listener(_record)
+
+
+def init_slow_query_log(app):
+    """Create the app's slow query log"""
+    if not app.config.get('SLOW_QUERY_LOG_ENABLED', True):
+        return
+    app.extensions['slow_query_log'] = SlowQueryLog(
+        threshold_ms=app.config.get('SLOW_QUERY_MS', 200),
+        sample_rate=app.config.get('SLOW_QUERY_SAMPLE_RATE', 1.0),
+        capacity=app.config.get('SLOW_QUERY_LOG_SIZE', 200),
+        explain=app.config.get('SLOW_QUERY_EXPLAIN', True)
+    )
+
+
+def get_slow_query_log():
+    """The current app's SlowQueryLog, or None"""
+    return current_app.extensions.get('slow_query_log')
@@ -0,0 +1,134 @@
+const API_BASE_URL = window.location.origin + '/api';
+
+// Check authentication status
+async function checkAuth() {
+    try {
+        const response = await fetch(API_BASE_URL + '/auth/check', {
+            credentials: 'include'
+        });
+        const data = await response.json();
+
+        if (data.authenticated && data.user) {
+            // User is logged in
+            localStorage.setItem('user', JSON.stringify(data.user));
+            document.getElementById('nav-login').style.display = 'none';
+            document.getElementById('nav-register').style.display = 'none';
+            document.getElementById('nav-logout').style.display = 'block';
+
+            if (data.user.role === 'admin') {
+                // Admin user - show admin navigation
+                document.getElementById('nav-home').style.display = 'none';
+                document.getElementById('nav-search').style.display = 'block';
+                document.getElementById('nav-trains').style.display = 'none';
+                document.getElementById('nav-tickets').style.display = 'none';
+                document.getElementById('nav-dashboard').style.display = 'none';
+                document.getElementById('nav-admin').style.display = 'block';
+                document.getElementById('nav-admin-dropdown').style.display = 'block';
+            } else {
+                // Regular user - show user navigation
+                document.getElementById('nav-home').style.display = 'block';
+                document.getElementById('nav-search').style.display = 'block';
+                document.getElementById('nav-trains').style.display = 'block';
+                document.getElementById('nav-tickets').style.display = 'block';
+                document.getElementById('nav-dashboard').style.display = 'block';
+                document.getElementById('nav-admin').style.display = 'none';
+                document.getElementById('nav-admin-dropdown').style.display = 'none';
+            }
+        } else {
+            // User is not logged in
+            localStorage.removeItem('user');
+            document.getElementById('nav-login').style.display = 'block';
+            document.getElementById('nav-register').style.display = 'block';
+            document.getElementById('nav-logout').style.display = 'none';
+            document.getElementById('nav-tickets').style.display = 'none';
+            document.getElementById('nav-dashboard').style.display = 'none';
+            document.getElementById('nav-admin').style.display = 'none';
+            document.getElementById('nav-admin-dropdown').style.display = 'none';
+        }
+    } catch (error) {
+        console.error('Auth check failed:', error);
+    }
+}
+
+// Logout function
+async function logout() {
+    try {
+        await fetch(API_BASE_URL + '/auth/logout', {
+            method: 'POST',
+            credentials: 'include'
+        });
+        localStorage.removeItem('user');
+        showMessage('Logged out successfully', 'success');
+        setTimeout(() => {
+            window.location.href = '/';
+        }, 1000);
+    } catch (error) {
+        showMessage('Logout failed', 'error');
+    }
+}
+
+// Show message function
+function showMessage(message, type = 'info') {
+    const container = document.getElementById('message-container');
+    const alertDiv = document.createElement('div');
+    alertDiv.className = 'alert alert-' + type;
+    alertDiv.textContent = message;
+    container.appendChild(alertDiv);
+
+    setTimeout(() => {
+        alertDiv.remove();
+    }, 5000);
+}
+
+// Payload the server embedded for the first paint; returned once, then null
+function takeInitialData() {
+    const element = document.getElementById('initial-data');
+    if (!element) {
+        return null;
+    }
+    element.remove();
+    return JSON.parse(element.textContent);
+}
+
+// Make API request with credentials
+async function apiRequest(url, options = {}) {
+    const defaultOptions = {
+        credentials: 'include',
+        headers: {
+            'Content-Type': 'application/json'
+        }
+    };
+
+    const mergedOptions = {
+        ...defaultOptions,
+        ...options,
+        headers: {
+            ...defaultOptions.headers,
+            ...(options.headers || {})
+        }
+    };
+
+    const response = await fetch(url, mergedOptions);
+    const data = await response.json();
+
+    if (!response.ok) {
+        const error = new Error(data.error || 'Request failed');
+        error.status = response.status;
+        error.retryAfter = response.headers.get('Retry-After');
+        throw error;
+    }
+
+    return data;
+}
+
+// Several GET API calls in one round trip; resolves to [{status, body}] in order
+async function apiBatch(paths) {
+    const data = await apiRequest(API_BASE_URL + '/batch', {
+        method: 'POST',
+        body: JSON.stringify({requests: paths.map(path => ({path: '/api' + path}))})
+    });
+    return data.responses;
+}
+
+// Initialize on page load
+checkAuth();
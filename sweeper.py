@@ -0,0 +1,52 @@
+"""
+Background Sweeper - periodic maintenance tasks run in a daemon thread
+"""
+import logging
+import threading
+from models import db
+from holds import sweep_expired_holds
+from idempotency import sweep_expired_keys
+from jobs import sweep_jobs
+from outbox import sweep_outbox
+from payments import sweep_unpaid_tickets
+
+logger = logging.getLogger(__name__)
+
+# Tasks run in order on every tick, each inside the application context
+SWEEP_TASKS = [
+    sweep_expired_holds,
+    sweep_expired_keys,
+    sweep_jobs,
+    sweep_outbox,
+    sweep_unpaid_tickets,
+]
+
+
+def run_sweep(app):
+    """Run every sweep task once, isolating failures between tasks"""
+    results = {}
+    with app.app_context():
+        for task in SWEEP_TASKS:
+            try:
+                results[task.__name__] = task()
+            except Exception:
+                db.session.rollback()
+                logger.exception('Sweep task %s failed', task.__name__)
+            finally:
+                db.session.remove()
+    return results
+
+
+def start_sweeper(app):
+    """Start the sweeper thread for this process and return it"""
+    interval = app.config['SWEEPER_INTERVAL_SECONDS']
+    stop_event = threading.Event()
+
+    def loop():
+        while not stop_event.wait(interval):
+            run_sweep(app)
+
+    thread = threading.Thread(target=loop, name='sweeper', daemon=True)
+    thread.stop_event = stop_event
+    thread.start()
+    return thread
@@ -4,6 +4,7 @@ Pytest configuration and fixtures for Train Booking System tests
 import pytest
 import sys
 import os
+from contextlib import contextmanager
 from datetime import date, time, timedelta
 
 # Add parent directory to path so we can import app modules
@@ -21,6 +22,7 @@ os.environ.setdefault('SECRET_KEY', 'test-secret-key')
 from app import create_app
 from models import db, User, Train, Route, Schedule, Ticket, Seat
 from config import TestingConfig
+from query_profiler import capture_queries
 
 
 class TestConfig(TestingConfig):
@@ -55,6 +57,28 @@ def runner(app):
     return app.test_cli_runner()
 
 
+@pytest.fixture
+def query_budget():
+    """Assert a block runs at most `limit` SQL statements, e.g.
+
+        with query_budget(3):
+            client.get('/api/schedules/')
+
+    The session is reset first so identity map hits left over from fixtures
+    do not hide queries a real request would run.
+    """
+    @contextmanager
+    def budget(limit):
+        db.session.remove()
+        with capture_queries() as profile:
+            yield profile
+        assert profile.count <= limit, (
+            f'{profile.count} queries, budget {limit}:\n'
+            + '\n'.join(f'  x{count} {sql}' for sql, count in profile.fingerprints())
+        )
+    return budget
+
+
 @pytest.fixture
 def init_database(app):
     """Initialize database with test data"""
@@ -157,3 +181,16 @@ def login_admin(client):
 def login_regular_user(client):
     """Helper function to login as regular user"""
     return login_user(client, 'testuser', 'userpass123')
+
+
+def book(client, name='Test Passenger', **overrides):
+    """Helper to book a ticket on the fixture schedule a week from today"""
+    payload = {
+        'schedule_id': 1,
+        'journey_date': (date.today() + timedelta(days=7)).isoformat(),
+        'passenger_name': name,
+        'passenger_age': 30,
+        'passenger_gender': 'male'
+    }
+    payload.update(overrides)
+    return client.post('/api/tickets/', json=payload)
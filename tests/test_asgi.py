@@ -0,0 +1,147 @@
+"""
+Tests for the async (ASGI) deployment mode
+"""
+import gzip
+import json
+import pytest
+from starlette.testclient import TestClient
+from conftest import TestConfig, login_admin, login_regular_user
+from app import create_app
+from async_app import async_database_uri, create_asgi_app
+from models import db, Train
+
+PARITY_URLS = [
+    '/api/trains/',
+    '/api/trains/?status=active',
+    '/api/trains/search?q=EXP',
+    '/api/trains/search',
+    '/api/routes/?source=City',
+    '/api/schedules/',
+    '/api/schedules/search?source=City A&destination=City B',
+    '/api/schedules/search?source=City A',
+    '/api/schedules/search?source=City A&destination=City B&journey_date=2020-13-01',
+    '/api/seats/?schedule_id=1',
+    '/api/seats/?schedule_id=1&journey_date=bad',
+    '/api/tickets/pnr/NOPE',
+]
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Flask app on a SQLite file, so the async engine sees the same data"""
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path}/asgi.db'
+
+    _app = create_app(FileConfig)
+    with _app.app_context():
+        db.create_all()
+        yield _app
+        db.drop_all()
+
+
+@pytest.fixture
+def asgi_client(app):
+    """Test client for the Starlette app in front of `app`"""
+    with TestClient(create_asgi_app(flask_app=app)) as client:
+        yield client
+
+
+class TestAsyncRoutes:
+    """Test async endpoints answer exactly like the Flask views"""
+
+    @pytest.mark.parametrize('url', PARITY_URLS)
+    def test_parity(self, client, asgi_client, init_database, url):
+        """Test status and JSON body match the Flask view"""
+        expected = client.get(url)
+        actual = asgi_client.get(url)
+
+        assert actual.status_code == expected.status_code
+        assert actual.json() == expected.get_json()
+
+    def test_search_with_fares(self, client, asgi_client, init_database):
+        """Test seats left and fares for a journey date"""
+        url = ('/api/schedules/search?source=City A&destination=City B'
+               f'&journey_date={init_database["future_date"].isoformat()}')
+
+        actual = asgi_client.get(url).json()
+
+        assert actual == client.get(url).get_json()
+        assert actual['schedules'][0]['fare_from'] is not None
+
+    def test_seat_map(self, client, asgi_client, init_database):
+        """Test the whole-route seat map"""
+        url = f'/api/seats/?schedule_id=1&journey_date={init_database["future_date"].isoformat()}'
+
+        actual = asgi_client.get(url).json()
+
+        assert actual == client.get(url).get_json()
+        assert actual['total_available'] == 5
+
+    @pytest.mark.parametrize('accept_encoding', ['gzip', 'identity'])
+    def test_compression_matches_flask(self, client, asgi_client, init_database, accept_encoding):
+        """Test large payloads are compressed for the same clients as the Flask view's"""
+        db.session.add_all(Train(train_number=f'GZ{i:03d}', train_name=f'Gzip {i}', train_type='local',
+                                 total_seats=50) for i in range(10))
+        db.session.commit()
+        headers = {'Accept-Encoding': accept_encoding}
+        expected = client.get('/api/trains/', headers=headers)
+        actual = asgi_client.get('/api/trains/', headers=headers)
+
+        assert actual.headers.get('Content-Encoding') == expected.headers.get('Content-Encoding')
+        assert 'Accept-Encoding' in actual.headers['Vary']
+        if accept_encoding == 'gzip':
+            assert actual.headers['Content-Encoding'] == 'gzip'
+            assert actual.json() == json.loads(gzip.decompress(expected.get_data()))
+        else:
+            assert actual.json() == expected.get_json()
+
+    def test_user_tickets_use_flask_session(self, client, asgi_client, init_database):
+        """Test the Flask session cookie authenticates async endpoints"""
+        assert asgi_client.get('/api/tickets/').status_code == 401
+
+        login_regular_user(asgi_client)
+        login_regular_user(client)
+
+        assert asgi_client.get('/api/tickets/').json() == client.get('/api/tickets/').get_json()
+
+
+class TestPassthrough:
+    """Test everything else is served by the Flask app"""
+
+    def test_booking_and_pnr(self, asgi_client, init_database):
+        """Test booking through Flask, then reading the ticket back async"""
+        login_regular_user(asgi_client)
+        booked = asgi_client.post('/api/tickets/', json={
+            'schedule_id': 1,
+            'journey_date': init_database['future_date'].isoformat(),
+            'passenger_name': 'Async Test',
+            'passenger_age': 30,
+            'passenger_gender': 'other'
+        })
+        assert booked.status_code == 201
+
+        pnr = booked.json()['ticket']['pnr_number']
+        ticket = asgi_client.get(f'/api/tickets/pnr/{pnr}').json()['ticket']
+
+        assert ticket['schedule']['train_number'] == 'EXP001'
+        assert asgi_client.get('/api/tickets/').json()['count'] == 1
+
+    def test_other_methods_and_variants(self, asgi_client, init_database):
+        """Test writes and compact seat maps on async paths reach Flask"""
+        login_admin(asgi_client)
+
+        created = asgi_client.post('/api/trains/', json={
+            'train_number': 'ASY001', 'train_name': 'Async', 'train_type': 'local', 'total_seats': 10
+        })
+        compact = asgi_client.get(
+            f'/api/seats/?schedule_id=1&journey_date={init_database["future_date"].isoformat()}&format=compact'
+        )
+
+        assert created.status_code == 201
+        assert compact.status_code == 200
+        assert compact.json()['seat_count'] == 5
+
+    def test_async_driver_urls(self):
+        """Test sync database URLs map to their async drivers"""
+        assert async_database_uri('mysql+pymysql://u:p@db:3306/x').drivername == 'mysql+aiomysql'
+        assert async_database_uri('sqlite:////tmp/x.db').drivername == 'sqlite+aiosqlite'
@@ -0,0 +1,63 @@
+"""
+Tests for the batch API endpoint
+"""
+from conftest import login_admin
+
+
+def batch(client, *paths, **extra):
+    """POST /api/batch for GETs of paths"""
+    return client.post('/api/batch', json={'requests': [dict(path=path, **extra) for path in paths]})
+
+
+class TestBatch:
+    """Test several GET requests answered in one round trip"""
+
+    def test_matches_separate_requests(self, client, init_database):
+        """Test each sub-response is what the request alone would return"""
+        login_admin(client)
+        paths = ['/api/auth/check', '/api/trains/', '/api/routes/', '/api/schedules/', '/api/tickets/']
+
+        response = batch(client, *paths)
+
+        assert response.status_code == 200
+        assert response.get_json()['responses'] == [
+            {'status': 200, 'body': client.get(path).get_json()} for path in paths
+        ]
+
+    def test_runs_as_the_caller(self, client, init_database):
+        """Test sub-requests see the batch's session cookie"""
+        anonymous = batch(client, '/api/users/').get_json()['responses'][0]
+        login_admin(client)
+        admin = batch(client, '/api/users/').get_json()['responses'][0]
+
+        assert anonymous['status'] == 401
+        assert admin['status'] == 200
+        assert len(admin['body']['users']) == 2
+
+    def test_shared_session_and_dedupe(self, client, init_database, query_budget):
+        """Test the admin is loaded once and identical sub-requests run once"""
+        login_admin(client)
+
+        with query_budget(3):
+            response = batch(client, '/api/users/', '/api/users/', '/api/users/', '/api/trains/')
+
+        bodies = [r['body'] for r in response.get_json()['responses']]
+        assert bodies[0] == bodies[1] == bodies[2]
+        assert bodies[3]['count'] == 1
+
+    def test_not_found_uses_error_handler(self, client, init_database):
+        """Test an unknown path gets the app's usual 404 body"""
+        response = batch(client, '/api/nowhere', '/api/trains/').get_json()['responses']
+
+        assert response[0] == {'status': 404, 'body': client.get('/api/nowhere').get_json()}
+        assert response[1]['status'] == 200
+
+    def test_rejected(self, app, client, init_database):
+        """Test writes, nested batches, bad bodies and oversized batches are refused"""
+        app.config['BATCH_MAX_REQUESTS'] = 2
+
+        assert batch(client, '/api/trains/', method='POST').status_code == 400
+        assert batch(client, '/api/batch').status_code == 400
+        assert batch(client, '/trains').status_code == 400
+        assert batch(client, '/api/trains/', '/api/routes/', '/api/schedules/').status_code == 400
+        assert client.post('/api/batch', json={'requests': []}).status_code == 400
@@ -0,0 +1,121 @@
+"""
+Tests for connection pool configuration and instrumentation
+"""
+import pytest
+from sqlalchemy import create_engine, exc, text
+from conftest import TestConfig, login_admin, login_regular_user
+from app import create_app
+from config import Config
+from db_pool import InstrumentedQueuePool, pool_status
+from models import db
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """File-backed SQLite engine with a one-connection instrumented pool"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05
+    )
+    yield engine
+    engine.dispose()
+
+
+class TestPoolConfig:
+    """Test engine options come from the environment"""
+
+    def test_engine_options(self):
+        """Test the production pool settings"""
+        options = Config.SQLALCHEMY_ENGINE_OPTIONS
+
+        assert options['poolclass'] is InstrumentedQueuePool
+        assert options['pool_pre_ping'] is True
+        assert options['pool_recycle'] == Config.DB_POOL_RECYCLE
+        assert options['pool_size'] == Config.DB_POOL_SIZE
+
+
+class TestInstrumentedPool:
+    """Test checkout metrics and gauges"""
+
+    def test_checkout_gauges(self, engine):
+        """Test in-use, overflow and event counters"""
+        first = engine.connect()
+        second = engine.connect()
+
+        status = pool_status(engine)
+        assert status['in_use'] == 2
+        assert status['overflow'] == 1
+        assert status['peak_in_use'] == 2
+        assert status['connects'] == 2
+
+        first.close()
+        second.close()
+        status = pool_status(engine)
+        assert status['in_use'] == 0
+        assert status['checkouts'] == 2
+        assert status['checkins'] == 2
+        assert sum(status['wait_histogram'].values()) == 2
+
+    def test_checkout_timeout_counted(self, engine):
+        """Test a starved checkout is recorded as a timeout"""
+        held = [engine.connect(), engine.connect()]
+
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+        assert pool_status(engine)['timeouts'] == 1
+        for connection in held:
+            connection.close()
+
+    def test_stats_survive_dispose(self, engine):
+        """Test counters carry over when the engine recreates its pool"""
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+        engine.dispose()
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+
+        status = pool_status(engine)
+        assert status['checkouts'] == 2
+        assert status['connects'] == 2
+
+
+class TestPoolEndpoint:
+    """Test the pool metrics endpoint"""
+
+    def test_pool_status_admin(self, client, init_database):
+        """Test admins can read pool metrics"""
+        login_admin(client)
+
+        response = client.get('/api/ops/pool')
+
+        assert response.status_code == 200
+        assert response.get_json()['pool']['pool_class'] == 'StaticPool'
+
+    def test_pool_status_requires_admin(self, client, init_database):
+        """Test regular users cannot read pool metrics"""
+        login_regular_user(client)
+
+        response = client.get('/api/ops/pool')
+
+        assert response.status_code == 403
+
+    def test_instrumented_app_pool(self, tmp_path):
+        """Test an app configured with the instrumented pool reports checkouts"""
+        class PooledConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.db'}"
+            SQLALCHEMY_ENGINE_OPTIONS = dict(Config.SQLALCHEMY_ENGINE_OPTIONS)
+
+        app = create_app(PooledConfig)
+        with app.app_context():
+            db.session.execute(text('SELECT 1'))
+            db.session.remove()
+            status = pool_status(db.engine)
+            db.engine.dispose()
+
+        assert status['instrumented'] is True
+        assert status['checkouts'] >= 1
+        assert status['in_use'] == 0
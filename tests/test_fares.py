@@ -0,0 +1,99 @@
+"""
+Tests for the dynamic fare engine
+"""
+import numpy as np
+from datetime import date, timedelta
+from conftest import login_admin, login_regular_user, book
+from fares import compute_fares, SEAT_TYPES
+
+
+def search(client):
+    """Helper to search the fixture route for the fixture date"""
+    future_date = (date.today() + timedelta(days=7)).isoformat()
+    response = client.get(f'/api/schedules/search?source=City A&destination=City B&journey_date={future_date}')
+    return response.get_json()['schedules'][0]
+
+
+class TestComputeFares:
+    """Test the vectorized pricing function"""
+
+    def test_factors(self):
+        """Test seat type, advance purchase and load factors"""
+        days_out = np.array([60, 7, 0])
+        load = np.zeros((1, 3, len(SEAT_TYPES)))
+        load[0, 1, :] = 1.0
+
+        fares = compute_fares([100.0], days_out, load)
+
+        general, ac = SEAT_TYPES.index('general'), SEAT_TYPES.index('AC')
+        assert fares[0, 0, general] == 85.0
+        assert fares[0, 2, general] == 130.0
+        assert fares[0, 0, ac] == 153.0
+        # A full train on day 7 costs 1.1 x 1.5
+        assert fares[0, 1, general] == 165.0
+
+
+class TestFareQuotes:
+    """Test fares in search and booking"""
+
+    def test_booking_charges_engine_fare(self, client, init_database):
+        """Test AC seven days out on an empty train is 150 x 1.8 x 1.1"""
+        login_regular_user(client)
+
+        ticket = book(client).get_json()['ticket']
+
+        assert ticket['fare'] == 297.0
+
+    def test_search_shows_fares(self, client, init_database):
+        """Test search lists the fare per seat type and the cheapest one"""
+        login_regular_user(client)
+        book(client)
+
+        result = search(client)
+
+        assert result['fares'] == {'AC': 297.0}
+        assert result['fare_from'] == 297.0
+
+    def test_fares_rise_with_load(self, client, init_database):
+        """Test bookings invalidate the cached fare so load is priced in"""
+        login_regular_user(client)
+        book(client)
+        assert search(client)['fare_from'] == 297.0
+
+        for _ in range(3):
+            book(client)
+
+        # 4 of 5 seats sold: load factor 0.8 -> 1.15 + (0.05 / 0.15) x 0.2
+        assert search(client)['fare_from'] == round(297.0 * (1.15 + 0.2 / 3), 2)
+
+    def test_base_fare_change_invalidates(self, client, init_database):
+        """Test changing the base fare reprices cached dates"""
+        login_regular_user(client)
+        book(client)
+        search(client)
+        client.post('/api/auth/logout')
+        login_admin(client)
+
+        client.put('/api/schedules/1', json={'base_fare': 300.00})
+
+        assert search(client)['fare_from'] == 594.0
+
+
+class TestFareTable:
+    """Test the per-schedule fare table endpoint"""
+
+    def test_fare_table(self, client, init_database):
+        """Test one entry per date over the requested range"""
+        response = client.get(f'/api/schedules/1/fares?start_date={date.today().isoformat()}&days=30')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert len(data['fares']) == 30
+        assert data['fares'][7]['fares']['AC'] == 297.0
+        assert data['fares'][0]['fares']['general'] == 195.0
+
+    def test_fare_table_invalid_range(self, client, init_database):
+        """Test days outside 1..366 is rejected"""
+        response = client.get('/api/schedules/1/fares?days=1000')
+
+        assert response.status_code == 400
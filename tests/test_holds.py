@@ -0,0 +1,207 @@
+"""
+Tests for Seat Holds (/api/seats/hold) and the expiry sweeper
+"""
+import pytest
+from datetime import date, datetime, timedelta
+from conftest import login_admin, login_regular_user
+from models import db, Seat
+from holds import release_expired_holds
+
+
+def hold(client, **overrides):
+    """Helper to hold seats on the fixture schedule"""
+    payload = {
+        'schedule_id': 1,
+        'journey_date': (date.today() + timedelta(days=7)).isoformat()
+    }
+    payload.update(overrides)
+    return client.post('/api/seats/hold', json=payload)
+
+
+class TestHoldSeats:
+    """Test creating and releasing holds"""
+
+    def test_hold_any_seat(self, client, init_database):
+        """Test holding the first free seat"""
+        login_regular_user(client)
+
+        response = hold(client, count=2)
+
+        assert response.status_code == 201
+        data = response.get_json()['hold']
+        assert len(data['hold_token']) == 32
+        assert [s['seat_number'] for s in data['seats']] == ['A1', 'A2']
+        assert all(s['is_available'] is False for s in data['seats'])
+
+    def test_hold_specific_seats(self, client, init_database):
+        """Test holding named seats"""
+        login_regular_user(client)
+
+        response = hold(client, seat_numbers=['A4', 'A5'])
+
+        assert response.status_code == 201
+        seats = response.get_json()['hold']['seats']
+        assert [s['seat_number'] for s in seats] == ['A4', 'A5']
+
+    def test_hold_conflict(self, client, init_database):
+        """Test a held seat cannot be held again"""
+        login_regular_user(client)
+        hold(client, seat_numbers=['A1'])
+        client.post('/api/auth/logout')
+
+        login_admin(client)
+        response = hold(client, seat_numbers=['A1', 'A2'])
+
+        assert response.status_code == 409
+
+    def test_hold_requires_login(self, client, init_database):
+        """Test holding seats without login"""
+        response = hold(client)
+
+        assert response.status_code == 401
+
+    def test_hold_too_many_seats(self, client, init_database):
+        """Test hold size limit"""
+        login_regular_user(client)
+
+        response = hold(client, count=100)
+
+        assert response.status_code == 400
+
+    def test_hold_count_not_integer(self, client, init_database):
+        """Test a count that is not an integer is a validation error"""
+        login_regular_user(client)
+
+        for count in ('2', None, True, 1.5):
+            assert hold(client, count=count).status_code == 400
+
+    def test_release_hold(self, client, init_database, app):
+        """Test releasing a hold frees the seats"""
+        login_regular_user(client)
+        token = hold(client, seat_numbers=['A3']).get_json()['hold']['hold_token']
+
+        response = client.delete(f'/api/seats/hold/{token}')
+
+        assert response.status_code == 200
+        with app.app_context():
+            seat = Seat.query.filter_by(seat_number='A3').first()
+            assert seat.is_available is True
+            assert seat.hold_token is None
+
+
+class TestBookFromHold:
+    """Test converting a hold into a ticket"""
+
+    def test_book_with_hold_token(self, client, init_database, app):
+        """Test booking takes the held seat"""
+        login_regular_user(client)
+        future_date = (date.today() + timedelta(days=7)).isoformat()
+        token = hold(client, seat_numbers=['A4']).get_json()['hold']['hold_token']
+
+        response = client.post('/api/tickets/', json={
+            'schedule_id': 1,
+            'journey_date': future_date,
+            'passenger_name': 'Held Passenger',
+            'passenger_age': 40,
+            'passenger_gender': 'female',
+            'hold_token': token
+        })
+
+        assert response.status_code == 201
+        ticket = response.get_json()['ticket']
+        assert ticket['seat_number'] == 'A4'
+        assert ticket['status'] == 'confirmed'
+        with app.app_context():
+            seat = Seat.query.filter_by(seat_number='A4').first()
+            assert seat.ticket_id == ticket['id']
+            assert seat.hold_token is None
+            assert seat.held_until is None
+
+    def test_book_with_unknown_hold(self, client, init_database):
+        """Test booking with a missing hold token"""
+        login_regular_user(client)
+
+        response = client.post('/api/tickets/', json={
+            'schedule_id': 1,
+            'journey_date': (date.today() + timedelta(days=7)).isoformat(),
+            'passenger_name': 'Nobody',
+            'passenger_age': 40,
+            'passenger_gender': 'male',
+            'hold_token': 'f' * 32
+        })
+
+        assert response.status_code == 409
+
+    def test_retry_after_expired_hold_keeps_key(self, client, init_database):
+        """Test a booking refused for a dead hold can be retried with a new hold and the same key"""
+        login_regular_user(client)
+        payload = {
+            'schedule_id': 1,
+            'journey_date': (date.today() + timedelta(days=7)).isoformat(),
+            'passenger_name': 'Late Passenger',
+            'passenger_age': 40,
+            'passenger_gender': 'male',
+            'hold_token': 'f' * 32
+        }
+        headers = {'Idempotency-Key': 'expired-hold-retry'}
+
+        assert client.post('/api/tickets/', json=payload, headers=headers).status_code == 409
+        payload['hold_token'] = hold(client, seat_numbers=['A3']).get_json()['hold']['hold_token']
+        response = client.post('/api/tickets/', json=payload, headers=headers)
+
+        assert response.status_code == 201
+        assert response.get_json()['ticket']['seat_number'] == 'A3'
+
+    def test_unheld_booking_skips_held_seats(self, client, init_database):
+        """Test a plain booking does not take another user's held seat"""
+        login_admin(client)
+        hold(client, seat_numbers=['A1'])
+        client.post('/api/auth/logout')
+
+        login_regular_user(client)
+        response = client.post('/api/tickets/', json={
+            'schedule_id': 1,
+            'journey_date': (date.today() + timedelta(days=7)).isoformat(),
+            'passenger_name': 'Walk In',
+            'passenger_age': 22,
+            'passenger_gender': 'male'
+        })
+
+        assert response.get_json()['ticket']['seat_number'] == 'A2'
+
+
+class TestReleaseExpiredHolds:
+    """Test the batched expiry sweep"""
+
+    def test_expired_holds_released_in_batches(self, client, init_database, app):
+        """Test lapsed holds are freed and live ones kept"""
+        login_regular_user(client)
+        hold(client, count=4)
+
+        with app.app_context():
+            seats = Seat.query.filter(Seat.hold_token.isnot(None)).order_by(Seat.seat_number).all()
+            for seat in seats[:3]:
+                seat.held_until = datetime.utcnow() - timedelta(minutes=1)
+            db.session.commit()
+
+            released = release_expired_holds(batch_size=2)
+
+            assert released == 3
+            assert Seat.query.filter_by(is_available=True).count() == 4
+            assert Seat.query.filter(Seat.hold_token.isnot(None)).count() == 1
+
+    def test_expired_hold_can_be_reclaimed(self, client, init_database, app):
+        """Test a lapsed hold does not block other users before the sweep runs"""
+        login_regular_user(client)
+        hold(client, seat_numbers=['A5'])
+        client.post('/api/auth/logout')
+
+        with app.app_context():
+            seat = Seat.query.filter_by(seat_number='A5').first()
+            seat.held_until = datetime.utcnow() - timedelta(seconds=1)
+            db.session.commit()
+
+        login_admin(client)
+        response = hold(client, seat_numbers=['A5'])
+
+        assert response.status_code == 201
@@ -0,0 +1,170 @@
+"""
+Tests for Idempotency-Key handling on booking and cancellation
+"""
+import pytest
+from datetime import date, datetime, timedelta
+from conftest import login_regular_user
+from models import db, Ticket, Seat, IdempotencyKey
+from idempotency import purge_expired_keys, _request_hash
+
+
+def booking_payload(name='Retry Passenger'):
+    """Helper to build a booking request body"""
+    return {
+        'schedule_id': 1,
+        'journey_date': (date.today() + timedelta(days=7)).isoformat(),
+        'passenger_name': name,
+        'passenger_age': 33,
+        'passenger_gender': 'female'
+    }
+
+
+def hash_of(app, payload):
+    """The stored fingerprint of a booking request with this body"""
+    with app.test_request_context('/api/tickets/', method='POST', json=payload):
+        return _request_hash()
+
+
+class TestIdempotentBooking:
+    """Test retried bookings"""
+
+    def test_retry_replays_stored_response(self, client, init_database, app):
+        """Test a retried booking returns the first ticket and books once"""
+        login_regular_user(client)
+        headers = {'Idempotency-Key': 'book-123'}
+
+        first = client.post('/api/tickets/', json=booking_payload(), headers=headers)
+        second = client.post('/api/tickets/', json=booking_payload(), headers=headers)
+
+        assert first.status_code == 201
+        assert second.status_code == 201
+        assert second.headers['Idempotent-Replayed'] == 'true'
+        assert second.get_json()['ticket']['pnr_number'] == first.get_json()['ticket']['pnr_number']
+        with app.app_context():
+            assert Ticket.query.count() == 1
+            assert Seat.query.filter_by(is_available=False).count() == 1
+
+    def test_without_key_books_twice(self, client, init_database, app):
+        """Test requests without a key are not deduplicated"""
+        login_regular_user(client)
+
+        client.post('/api/tickets/', json=booking_payload())
+        client.post('/api/tickets/', json=booking_payload())
+
+        with app.app_context():
+            assert Ticket.query.count() == 2
+
+    def test_key_reused_for_different_request(self, client, init_database):
+        """Test a key cannot be reused with a different body"""
+        login_regular_user(client)
+        headers = {'Idempotency-Key': 'book-456'}
+
+        client.post('/api/tickets/', json=booking_payload('First'), headers=headers)
+        response = client.post('/api/tickets/', json=booking_payload('Second'), headers=headers)
+
+        assert response.status_code == 422
+
+    def test_validation_errors_are_replayed(self, client, init_database, app):
+        """Test client errors are stored like successes"""
+        login_regular_user(client)
+        headers = {'Idempotency-Key': 'bad-request'}
+
+        first = client.post('/api/tickets/', json={'schedule_id': 1}, headers=headers)
+        second = client.post('/api/tickets/', json={'schedule_id': 1}, headers=headers)
+
+        assert first.status_code == 400
+        assert second.status_code == 400
+        assert second.headers['Idempotent-Replayed'] == 'true'
+
+    def test_refused_request_changes_are_not_committed(self, client, init_database, app, monkeypatch):
+        """Test a 4xx stored for a key does not commit what the handler changed before failing"""
+        login_regular_user(client)
+        token = client.post('/api/seats/hold', json={
+            'schedule_id': 1,
+            'journey_date': booking_payload()['journey_date'],
+            'seat_numbers': ['A2']
+        }).get_json()['hold']['hold_token']
+
+        def broken_quote(*args, **kwargs):
+            raise ValueError('no fare')
+        monkeypatch.setattr('routes.ticket_routes.quote_fare', broken_quote)
+
+        response = client.post('/api/tickets/', json=dict(booking_payload(), hold_token=token),
+                               headers={'Idempotency-Key': 'half-applied'})
+
+        assert response.status_code == 400
+        with app.app_context():
+            assert Seat.query.filter_by(seat_number='A2').first().hold_token == token
+            assert IdempotencyKey.query.filter_by(idempotency_key='half-applied').one().status_code == 400
+
+    def test_in_flight_key_is_retryable(self, client, init_database, app):
+        """Test a key whose first request is still running answers 409 with Retry-After"""
+        login_regular_user(client)
+        with app.app_context():
+            db.session.add(IdempotencyKey(
+                user_id=init_database['user'].id, idempotency_key='in-flight',
+                request_hash=hash_of(app, booking_payload()),
+                locked_until=datetime.utcnow() + timedelta(minutes=1),
+                expires_at=datetime.utcnow() + timedelta(hours=1)
+            ))
+            db.session.commit()
+
+        response = client.post('/api/tickets/', json=booking_payload(), headers={'Idempotency-Key': 'in-flight'})
+
+        assert response.status_code == 409
+        assert response.headers['Retry-After'] == '1'
+
+    def test_abandoned_key_past_its_lease(self, client, init_database, app):
+        """Test an unanswered key past its lease is reported, not rerun or left blocking"""
+        login_regular_user(client)
+        with app.app_context():
+            db.session.add(IdempotencyKey(
+                user_id=init_database['user'].id, idempotency_key='died',
+                request_hash=hash_of(app, booking_payload()),
+                locked_until=datetime.utcnow() - timedelta(seconds=1),
+                expires_at=datetime.utcnow() + timedelta(hours=1)
+            ))
+            db.session.commit()
+
+        response = client.post('/api/tickets/', json=booking_payload(), headers={'Idempotency-Key': 'died'})
+
+        assert response.status_code == 409
+        assert 'Retry-After' not in response.headers
+        assert 'did not finish' in response.get_json()['error']
+        with app.app_context():
+            assert Ticket.query.count() == 0
+
+
+class TestIdempotentCancel:
+    """Test retried cancellations"""
+
+    def test_retried_cancel_succeeds(self, client, init_database):
+        """Test a retried cancel returns the original success instead of an error"""
+        login_regular_user(client)
+        ticket_id = client.post('/api/tickets/', json=booking_payload()).get_json()['ticket']['id']
+        headers = {'Idempotency-Key': 'cancel-1'}
+
+        first = client.put(f'/api/tickets/{ticket_id}/cancel', headers=headers)
+        second = client.put(f'/api/tickets/{ticket_id}/cancel', headers=headers)
+
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert second.get_json()['ticket']['status'] == 'cancelled'
+
+
+class TestPurgeExpiredKeys:
+    """Test TTL cleanup"""
+
+    def test_purge_expired_keys(self, client, init_database, app):
+        """Test expired keys are deleted in batches and live keys kept"""
+        login_regular_user(client)
+        for i in range(5):
+            client.put('/api/tickets/9999/cancel', headers={'Idempotency-Key': f'k{i}'})
+
+        with app.app_context():
+            for record in IdempotencyKey.query.limit(4).all():
+                record.expires_at = datetime.utcnow() - timedelta(hours=1)
+            db.session.commit()
+
+            assert purge_expired_keys(batch_size=3) == 4
+            assert IdempotencyKey.query.count() == 1
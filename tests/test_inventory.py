@@ -0,0 +1,131 @@
+"""
+Tests for the seat_inventory counters and consistency checker
+"""
+import pytest
+from datetime import date, timedelta
+from conftest import login_admin, login_regular_user, book
+from models import db, SeatInventory
+from inventory import check_inventory
+
+
+def availability(client):
+    """Helper to read counters for the fixture schedule and date"""
+    future_date = (date.today() + timedelta(days=7)).isoformat()
+    return client.get(f'/api/seats/availability?schedule_id=1&journey_date={future_date}').get_json()
+
+
+class TestInventoryMaintenance:
+    """Test counters follow bookings, cancellations and seat admin changes"""
+
+    def test_booking_and_cancel_update_counters(self, client, init_database):
+        """Test counters are seeded on first touch and then incremented"""
+        login_regular_user(client)
+
+        ticket_id = book(client).get_json()['ticket']['id']
+        assert availability(client)['by_type']['AC'] == {'available': 4, 'occupied': 1}
+
+        client.put(f'/api/tickets/{ticket_id}/cancel')
+        data = availability(client)
+        assert data['total_available'] == 5
+        assert data['total_occupied'] == 0
+
+    def test_holds_update_counters(self, client, init_database):
+        """Test holding and releasing seats moves counts"""
+        login_regular_user(client)
+        future_date = (date.today() + timedelta(days=7)).isoformat()
+
+        token = client.post('/api/seats/hold', json={
+            'schedule_id': 1, 'journey_date': future_date, 'count': 2
+        }).get_json()['hold']['hold_token']
+        assert availability(client)['total_available'] == 3
+
+        client.delete(f'/api/seats/hold/{token}')
+        assert availability(client)['total_available'] == 5
+
+    def test_seat_admin_updates_counters(self, client, init_database, app):
+        """Test create, retype and delete keep counters in step"""
+        login_admin(client)
+        future_date = (date.today() + timedelta(days=7)).isoformat()
+
+        seat_id = client.post('/api/seats/', json={
+            'schedule_id': 1, 'journey_date': future_date,
+            'seat_number': 'S1', 'seat_type': 'sleeper'
+        }).get_json()['seat']['id']
+        assert availability(client)['by_type']['sleeper'] == {'available': 1, 'occupied': 0}
+
+        client.put(f'/api/seats/{seat_id}', json={'seat_type': 'general', 'is_available': False})
+        by_type = availability(client)['by_type']
+        assert by_type['sleeper'] == {'available': 0, 'occupied': 0}
+        assert by_type['general'] == {'available': 0, 'occupied': 1}
+
+        client.delete(f'/api/seats/{seat_id}')
+        assert availability(client)['by_type']['general'] == {'available': 0, 'occupied': 0}
+
+        # Only the fixture's AC seats, created without counters, may drift
+        with app.app_context():
+            assert [d['seat_type'] for d in check_inventory()] == ['AC']
+
+    def test_bulk_create_updates_counters(self, client, init_database):
+        """Test bulk creation writes one counter row per type"""
+        login_admin(client)
+        future_date = (date.today() + timedelta(days=21)).isoformat()
+
+        client.post('/api/seats/bulk', json={
+            'schedule_id': 1,
+            'journey_date': future_date,
+            'seats': [{'seat_number': f'B{i}', 'seat_type': 'AC'} for i in range(4)]
+        })
+
+        data = client.get(f'/api/seats/availability?schedule_id=1&journey_date={future_date}').get_json()
+        assert data['by_type'] == {'AC': {'available': 4, 'occupied': 0}}
+
+    def test_search_reports_seats_left(self, client, init_database):
+        """Test search adds seats_available when a journey date is given"""
+        login_regular_user(client)
+        book(client)
+        future_date = (date.today() + timedelta(days=7)).isoformat()
+
+        response = client.get(f'/api/schedules/search?source=City A&destination=City B&journey_date={future_date}')
+
+        assert response.status_code == 200
+        assert response.get_json()['schedules'][0]['seats_available'] == 4
+
+
+class TestInventoryCheck:
+    """Test the consistency checker"""
+
+    def test_check_reports_and_repairs_drift(self, client, init_database, app):
+        """Test seats created outside the API are reported and repaired"""
+        login_admin(client)
+
+        report = client.get('/api/seats/inventory/check').get_json()
+        assert report['count'] == 1
+        assert report['drift'][0]['expected'] == {'available': 5, 'occupied': 0}
+        assert report['drift'][0]['stored'] is None
+
+        repaired = client.post('/api/seats/inventory/check').get_json()
+        assert repaired['repaired'] is True
+        assert client.get('/api/seats/inventory/check').get_json()['count'] == 0
+
+    def test_check_detects_tampered_counter(self, client, init_database, app):
+        """Test a counter that disagrees with the seats is reported"""
+        login_regular_user(client)
+        book(client)
+
+        with app.app_context():
+            row = SeatInventory.query.first()
+            row.available = 99
+            db.session.commit()
+
+            drift = check_inventory()
+            assert len(drift) == 1
+            assert drift[0]['stored']['available'] == 99
+            assert drift[0]['expected']['available'] == 4
+
+    def test_check_requires_admin(self, client, init_database):
+        """Test regular users cannot run the checker"""
+        login_regular_user(client)
+
+        response = client.get('/api/seats/inventory/check')
+
+        assert response.status_code == 403
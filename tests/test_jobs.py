@@ -0,0 +1,203 @@
+"""
+Tests for the background job queue and worker
+"""
+from datetime import date, datetime, timedelta
+import pytest
+from conftest import login_admin, login_regular_user
+from jobs import (JOBS, job, enqueue, claim_jobs, run_jobs, run_pending, renew_leases, requeue_stale_jobs,
+                  purge_finished_jobs)
+from models import db, Job, Seat
+
+calls = []
+
+
+@pytest.fixture
+def handlers():
+    """Test handlers, unregistered afterwards"""
+    calls.clear()
+
+    @job('test.echo')
+    def echo(payload):
+        calls.append(payload)
+        return {'echo': payload}
+
+    @job('test.flaky', max_attempts=2)
+    def flaky(payload):
+        calls.append(payload)
+        raise RuntimeError('gateway down')
+
+    @job('test.batch', batched=True)
+    def batch(payloads):
+        calls.append(payloads)
+        return [payload * 2 for payload in payloads if payload]  # 0 is dropped
+
+    @job('test.spawn')
+    def spawn(payload):
+        calls.append(payload)
+        enqueue('test.echo', 'child')
+
+    yield
+    for name in ('test.echo', 'test.flaky', 'test.batch', 'test.spawn'):
+        JOBS.pop(name)
+
+
+def queue(*args, **kwargs):
+    record = enqueue(*args, **kwargs)
+    db.session.commit()
+    return record.id
+
+
+class TestJobQueue:
+    """Test enqueueing, claiming and running jobs"""
+
+    def test_run_and_store_result(self, app, init_database, handlers):
+        """Test a due job runs once and keeps its result"""
+        job_id = queue('test.echo', {'n': 1})
+
+        assert run_pending(app) == 1
+        assert run_pending(app) == 0
+        record = db.session.get(Job, job_id)
+        assert (record.status, record.attempts, record.result) == ('done', 1, {'echo': {'n': 1}})
+        assert calls == [{'n': 1}]
+
+    def test_priority_and_delay(self, app, init_database, handlers):
+        """Test higher priorities run first and delayed jobs wait"""
+        queue('test.echo', 'low')
+        queue('test.echo', 'high', priority=5)
+        queue('test.echo', 'later', priority=9, delay_seconds=60)
+
+        run_pending(app)
+
+        assert calls == ['high', 'low']
+
+    def test_claimed_jobs_not_claimed_again(self, app, init_database, handlers):
+        """Test a second worker gets nothing while the first holds the batch"""
+        queue('test.echo', 1)
+        queue('test.echo', 2)
+
+        first = claim_jobs('worker-a', 10)
+        second = claim_jobs('worker-b', 10)
+
+        assert [record.payload for record in first] == [1, 2]
+        assert second == []
+
+    def test_retry_with_backoff_then_fail(self, app, init_database, handlers):
+        """Test a failing job is retried after a backoff and fails after max_attempts"""
+        job_id = queue('test.flaky', 'x')
+
+        run_pending(app)
+        record = db.session.get(Job, job_id)
+        assert record.status == 'queued'
+        assert record.run_at > datetime.utcnow() + timedelta(seconds=20)
+        assert 'gateway down' in record.last_error
+
+        record.run_at = datetime.utcnow()
+        db.session.commit()
+        run_pending(app)
+
+        record = db.session.get(Job, job_id)
+        assert (record.status, record.attempts) == ('failed', 2)
+        assert len(calls) == 2
+
+    def test_batched_handler(self, app, init_database, handlers):
+        """Test a batched handler gets all claimed payloads in one call"""
+        ids = [queue('test.batch', n) for n in (1, 2, 3)]
+
+        run_pending(app)
+
+        assert calls == [[1, 2, 3]]
+        assert [db.session.get(Job, job_id).result for job_id in ids] == [2, 4, 6]
+
+    def test_batched_handler_missing_results(self, app, init_database, handlers):
+        """Test a batch with fewer results than jobs fails every job instead of leaving some running"""
+        ids = [queue('test.batch', n) for n in (1, 0, 3)]
+
+        run_pending(app)
+
+        for job_id in ids:
+            record = db.session.get(Job, job_id)
+            assert (record.status, record.result, record.locked_by) == ('queued', None, None)
+            assert 'returned 2 results for 3 jobs' in record.last_error
+
+    def test_stale_lease_requeued(self, app, init_database, handlers):
+        """Test a job whose worker died is queued again"""
+        job_id = queue('test.echo', 'x')
+        claim_jobs('dead-worker', 10)
+        db.session.get(Job, job_id).locked_until = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+        assert requeue_stale_jobs() == 1
+        run_pending(app)
+        assert db.session.get(Job, job_id).status == 'done'
+
+    def test_lease_renewed_for_its_worker(self, app, init_database, handlers):
+        """Test a running job's lease is pushed back only by the worker holding it"""
+        job_id = queue('test.echo', 'x')
+        claim_jobs('worker-a', 10)
+        later = datetime.utcnow() + timedelta(hours=1)
+
+        with db.engine.begin() as connection:
+            assert renew_leases(connection, [job_id], 'worker-b', 600, now=later) == 0
+            assert renew_leases(connection, [job_id], 'worker-a', 600, now=later) == 1
+
+        assert db.session.get(Job, job_id).locked_until == later + timedelta(seconds=600)
+
+    def test_lost_lease_discards_handler_writes(self, app, init_database, handlers):
+        """Test a job requeued and claimed elsewhere mid-run is not finished by the first worker"""
+        job_id = queue('test.spawn', 'x')
+        records = claim_jobs('worker-a', 10)
+        # The sweeper took the job for dead and another worker claimed it
+        db.session.get(Job, job_id).locked_by = 'worker-b'
+        db.session.commit()
+
+        run_jobs(records, 'worker-a')
+
+        record = db.session.get(Job, job_id)
+        assert (record.status, record.locked_by, record.result) == ('running', 'worker-b', None)
+        assert calls == ['x']
+        assert Job.query.count() == 1  # the handler's enqueue was rolled back
+
+    def test_purge_finished(self, app, init_database, handlers):
+        """Test finished jobs past the retention period are deleted"""
+        queue('test.echo', 'x')
+        run_pending(app)
+
+        assert purge_finished_jobs(now=datetime.utcnow() + timedelta(days=30)) == 1
+        assert Job.query.count() == 0
+
+    def test_unknown_job(self, app, init_database):
+        """Test only registered jobs can be queued"""
+        with pytest.raises(ValueError):
+            enqueue('test.missing')
+
+
+class TestBulkSeatJobs:
+    """Test large bulk seat requests are queued"""
+
+    def test_large_bulk_request_queued(self, app, client, init_database):
+        """Test the request returns a job id and the worker creates the seats"""
+        app.config['JOB_INLINE_MAX_SEATS'] = 2
+        journey_date = date.today() + timedelta(days=21)
+        login_admin(client)
+
+        response = client.post('/api/seats/bulk', json={
+            'schedule_id': 1,
+            'journey_date': journey_date.isoformat(),
+            'seats': [{'seat_number': f'J{i}', 'seat_type': 'general'} for i in range(5)]
+        })
+
+        assert response.status_code == 202
+        job_id = response.get_json()['job']['id']
+        assert Seat.query.filter_by(journey_date=journey_date).count() == 0
+
+        run_pending(app)
+
+        assert Seat.query.filter_by(journey_date=journey_date).count() == 5
+        status = client.get(f'/api/jobs/{job_id}').get_json()['job']
+        assert (status['status'], status['result']) == ('done', {'created': 5})
+
+    def test_job_status_admin_only(self, client, init_database):
+        """Test regular users cannot read jobs"""
+        login_regular_user(client)
+
+        assert client.get('/api/jobs/').status_code == 403
@@ -0,0 +1,74 @@
+"""
+Tests for the Prometheus metrics endpoint
+"""
+import os
+import subprocess
+import sys
+from prometheus_client import CollectorRegistry, multiprocess
+from prometheus_client.parser import text_string_to_metric_families
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def sample_value(text, name, **labels):
+    """Value of one sample in Prometheus text output, or None"""
+    for family in text_string_to_metric_families(text):
+        for sample in family.samples:
+            if sample.name == name and all(sample.labels.get(k) == v for k, v in labels.items()):
+                return sample.value
+    return None
+
+
+class TestMetricsEndpoint:
+    """Test request and database metrics"""
+
+    def test_request_metrics(self, client, init_database):
+        """Test count, latency and query histograms per endpoint"""
+        labels = {'blueprint': 'trains', 'endpoint': 'trains.get_all_trains'}
+        before = client.get('/metrics').get_data(as_text=True)
+        count_before = sample_value(before, 'train_http_requests_total', status='200', **labels) or 0
+
+        client.get('/api/trains/')
+        client.get('/api/trains/')
+        text = client.get('/metrics').get_data(as_text=True)
+
+        assert sample_value(text, 'train_http_requests_total', status='200', **labels) == count_before + 2
+        assert sample_value(text, 'train_http_request_duration_seconds_count', status='200', **labels) >= 2
+        assert sample_value(text, 'train_http_request_db_queries_sum', **labels) >= 2
+
+    def test_status_label(self, client, init_database):
+        """Test unmatched URLs are labelled without creating new endpoints"""
+        client.get('/api/does-not-exist')
+
+        text = client.get('/metrics').get_data(as_text=True)
+
+        assert sample_value(text, 'train_http_requests_total', endpoint='unmatched', status='404') >= 1
+
+    def test_content_type(self, client):
+        """Test the Prometheus text format is served"""
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+
+
+class TestMultiprocessStore:
+    """Test counters from several worker processes are aggregated"""
+
+    def test_workers_aggregate(self, tmp_path):
+        """Test two processes writing to the same store sum up"""
+        script = (
+            "from metrics import REQUESTS\n"
+            "REQUESTS.labels('GET', 'trains', 'trains.get_all_trains', '200').inc(3)\n"
+        )
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path), PYTHONPATH=ROOT)
+        for _ in range(2):
+            subprocess.run([sys.executable, '-c', script], env=env, cwd=ROOT, check=True)
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=str(tmp_path))
+        value = registry.get_sample_value('train_http_requests_total', {
+            'method': 'GET', 'blueprint': 'trains', 'endpoint': 'trains.get_all_trains', 'status': '200'
+        })
+
+        assert value == 6
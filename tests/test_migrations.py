@@ -0,0 +1,213 @@
+"""
+Tests for schema migrations and the booking indexes
+"""
+import pytest
+import migrations
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine, insert, inspect, select, text
+from conftest import TestConfig
+from app import create_app
+from models import db, Seat, Ticket
+from migrations import applied_versions, discover, latest_version, schema_version, upgrade
+from query_profiler import capture_queries
+
+SEATS_PER_DEPARTURE = 60
+DAYS = 7
+
+# seats and tickets as create_all built them before holds and segments
+LEGACY_SCHEMA = """
+CREATE TABLE seats (
+    id INTEGER PRIMARY KEY, schedule_id INTEGER NOT NULL, journey_date DATE NOT NULL,
+    seat_number VARCHAR(10) NOT NULL, seat_type VARCHAR(11) NOT NULL, is_available BOOLEAN,
+    ticket_id INTEGER, created_at DATETIME, updated_at DATETIME
+);
+CREATE TABLE tickets (
+    id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, schedule_id INTEGER NOT NULL,
+    booking_date DATE NOT NULL, journey_date DATE NOT NULL, passenger_name VARCHAR(100) NOT NULL,
+    passenger_age INTEGER NOT NULL, passenger_gender VARCHAR(6) NOT NULL, seat_number VARCHAR(10),
+    fare NUMERIC(10, 2) NOT NULL, status VARCHAR(10), pnr_number VARCHAR(20) NOT NULL UNIQUE,
+    created_at DATETIME, updated_at DATETIME
+);
+INSERT INTO seats (schedule_id, journey_date, seat_number, seat_type, is_available) VALUES
+    (1, '2030-01-01', 'G1', 'general', 1), (1, '2030-01-01', 'G2', 'general', 0),
+    (1, '2030-01-01', 'A1', 'AC', 1), (1, '2030-01-02', 'G1', 'general', 1),
+    (2, '2030-01-01', 'G1', 'general', 0);
+"""
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """An empty SQLite database"""
+    _engine = create_engine(f'sqlite:///{tmp_path}/migrations.db')
+    yield _engine
+    _engine.dispose()
+
+
+@pytest.fixture
+def seeded_database(init_database):
+    """Seats for a week of departures and a few thousand tickets, analyzed"""
+    schedule_id = init_database['schedule'].id
+    user_id = init_database['user'].id
+    today = date.today()
+    seats, tickets = [], []
+    for day in range(DAYS):
+        journey_date = today + timedelta(days=day)
+        for n in range(SEATS_PER_DEPARTURE):
+            seats.append({'schedule_id': schedule_id, 'journey_date': journey_date,
+                          'seat_number': f'S{n:03d}', 'seat_type': 'general',
+                          'is_available': n % 3 != 0, 'segment_mask': 0})
+        for n in range(0, SEATS_PER_DEPARTURE, 3):
+            tickets.append({'user_id': user_id + n % 2, 'schedule_id': schedule_id,
+                            'booking_date': today, 'journey_date': journey_date,
+                            'passenger_name': 'Seed', 'passenger_age': 30,
+                            'passenger_gender': 'other', 'seat_number': f'S{n:03d}',
+                            'fare': 100, 'status': 'confirmed',
+                            'pnr_number': f'PNR{day:02d}{n:04d}', 'created_at': datetime.utcnow()})
+    db.session.execute(insert(Seat), seats)
+    db.session.execute(insert(Ticket), tickets)
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+    return init_database
+
+
+def query_plan(query):
+    """SQLite's plan for an ORM query, as one string"""
+    statement = getattr(query, 'statement', query)
+    sql = statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    return ' | '.join(row.detail for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')))
+
+
+class TestMigrationRunner:
+    """Test versioned, forward-only upgrades"""
+
+    def test_fresh_database(self, engine):
+        """Test every migration is applied once and recorded"""
+        versions = [version for version, _ in discover()]
+
+        assert upgrade(engine, log=lambda message: None) == versions
+        assert upgrade(engine, log=lambda message: None) == []
+        with engine.connect() as connection:
+            assert applied_versions(connection) == set(versions)
+            assert 'tickets' in inspect(connection).get_table_names()
+
+    def test_existing_create_all_database(self, engine):
+        """Test a database built by create_all before the indexes gets them"""
+        db.metadata.create_all(engine)
+        with engine.begin() as connection:
+            for name in ('ix_seats_schedule_date_available', 'ix_tickets_user_id',
+                         'ix_tickets_schedule_date_status'):
+                connection.execute(text(f'DROP INDEX {name}'))
+
+        upgrade(engine, log=lambda message: None)
+
+        with engine.connect() as connection:
+            seat_indexes = {index['name'] for index in inspect(connection).get_indexes('seats')}
+            ticket_indexes = {index['name'] for index in inspect(connection).get_indexes('tickets')}
+        assert 'ix_seats_schedule_date_available' in seat_indexes
+        assert {'ix_tickets_user_id', 'ix_tickets_schedule_date_status'} <= ticket_indexes
+
+    def test_rerun_after_unrecorded_apply(self, engine):
+        """Test every migration runs again cleanly when its version row was lost (MySQL DDL autocommit)"""
+        upgrade(engine, log=lambda message: None)
+        with engine.begin() as connection:
+            connection.execute(text('DELETE FROM schema_migrations WHERE version > 1'))
+
+        assert upgrade(engine, log=lambda message: None) == [version for version, _ in discover()][1:]
+
+    def test_target_version(self, engine):
+        """Test upgrading stops at the target"""
+        assert upgrade(engine, target=1, log=lambda message: None) == [1]
+        with engine.connect() as connection:
+            assert schema_version(connection) == 1
+
+    def test_legacy_database(self, engine, monkeypatch):
+        """Test old seats/tickets get new columns and inventory in chunks"""
+        monkeypatch.setattr(migrations, 'CHUNK_SIZE', 1)
+        with engine.begin() as connection:
+            for statement in LEGACY_SCHEMA.split(';'):
+                if statement.strip():
+                    connection.execute(text(statement))
+            db.metadata.tables['seat_inventory'].create(connection)
+            # Already seeded by the app before the migration reached it
+            connection.execute(text(
+                "INSERT INTO seat_inventory VALUES (2, '2030-01-01', 'general', 5, 5)"
+            ))
+
+        upgrade(engine, log=lambda message: None)
+
+        with engine.connect() as connection:
+            seat_columns = {column['name'] for column in inspect(connection).get_columns('seats')}
+            ticket_columns = {column['name'] for column in inspect(connection).get_columns('tickets')}
+            masks = connection.execute(text('SELECT DISTINCT segment_mask FROM seats')).scalars().all()
+            inventory = connection.execute(text(
+                'SELECT schedule_id, journey_date, seat_type, available, occupied FROM seat_inventory '
+                'ORDER BY schedule_id, journey_date, seat_type'
+            )).all()
+        assert {'segment_mask', 'hold_token', 'held_by', 'held_until'} <= seat_columns
+        assert {'from_stop', 'to_stop'} <= ticket_columns
+        assert masks == [0]
+        assert [tuple(row) for row in inventory] == [
+            (1, '2030-01-01', 'AC', 1, 0),
+            (1, '2030-01-01', 'general', 1, 1),
+            (1, '2030-01-02', 'general', 1, 0),
+            (2, '2030-01-01', 'general', 5, 5)
+        ]
+
+
+class TestStartupCheck:
+    """Test app startup only checks the schema version"""
+
+    def make_config(self, engine, mode):
+        class CheckedConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = str(engine.url)
+            SCHEMA_VERSION_CHECK = mode
+        return CheckedConfig
+
+    def test_strict_refuses_old_schema(self, engine):
+        """Test an unmigrated database stops startup in strict mode"""
+        with pytest.raises(RuntimeError, match='run python migrate.py'):
+            create_app(self.make_config(engine, 'strict'))
+
+    def test_one_query_when_current(self, engine):
+        """Test a migrated database costs one query and creates nothing"""
+        upgrade(engine, log=lambda message: None)
+
+        with capture_queries() as profile:
+            create_app(self.make_config(engine, 'strict'))
+
+        assert profile.count == 1
+        assert latest_version() == max(version for version, _ in discover())
+
+
+class TestQueryPlans:
+    """Test the booking hot paths use an index on a seeded dataset"""
+
+    def test_free_seat_lookup(self, seeded_database):
+        """Test the first free seat comes from the availability index"""
+        query = Seat.query.filter_by(schedule_id=1, journey_date=date.today(), is_available=True).limit(1)
+
+        assert 'ix_seats_schedule_date_available' in query_plan(query)
+
+    def test_seat_by_number(self, seeded_database):
+        """Test seat number lookups use the unique constraint's index"""
+        query = Seat.query.filter_by(schedule_id=1, journey_date=date.today(), seat_number='S001')
+
+        plan = query_plan(query)
+        assert plan.startswith('SEARCH seats USING INDEX')
+        assert 'journey_date=? AND seat_number=?' in plan
+
+    def test_user_tickets(self, seeded_database):
+        """Test a user's tickets are found through the user index"""
+        assert 'ix_tickets_user_id' in query_plan(Ticket.query.filter_by(user_id=1))
+
+    def test_departure_tickets(self, seeded_database):
+        """Test tickets per departure and status use the composite index"""
+        query = Ticket.query.filter_by(schedule_id=1, journey_date=date.today(), status='confirmed')
+
+        assert 'ix_tickets_schedule_date_status' in query_plan(query)
+
+    def test_pnr_lookup(self, seeded_database):
+        """Test PNR lookups never scan tickets"""
+        plan = query_plan(select(Ticket).where(Ticket.pnr_number == 'PNR000000'))
+
+        assert plan.startswith('SEARCH tickets USING INDEX')
@@ -0,0 +1,213 @@
+"""
+Tests for the transactional outbox and webhook dispatch
+"""
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from conftest import login_admin, login_regular_user, book
+from models import db, OutboxEvent, OutboxCursor
+from outbox import WebhookClient, dispatch_pending, purge_delivered_events
+
+
+class WebhookServer(ThreadingHTTPServer):
+    """Local stand-in for an n8n webhook: records batches, answers `status`"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), WebhookHandler)
+        self.batches = []
+        self.connections = set()
+        self.status = 200
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/webhook/bookings'
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.connections.add(self.client_address)
+        if self.server.status == 200:
+            self.server.batches.append(json.loads(body)['events'])
+        self.send_response(self.server.status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def webhook(app):
+    """A running webhook server configured as the only outbox destination"""
+    server = WebhookServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    app.config['OUTBOX_WEBHOOK_URLS'] = [server.url]
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def webhook_client():
+    client = WebhookClient(timeout=5)
+    yield client
+    client.close()
+
+
+def event_types():
+    return [event.event_type for event in OutboxEvent.query.order_by(OutboxEvent.id)]
+
+
+class TestRecordEvents:
+    """Test events are written with the change that caused them"""
+
+    def test_booking_cancellation_and_registration(self, client, init_database):
+        """Test each write adds its event"""
+        client.post('/api/auth/register', json={
+            'username': 'rider', 'email': 'rider@test.com', 'password': 'riderpass', 'full_name': 'Rider'
+        })
+        login_regular_user(client)
+        ticket = book(client).get_json()['ticket']
+        client.put(f'/api/tickets/{ticket["id"]}/cancel')
+
+        assert event_types() == ['user.registered', 'ticket.booked', 'ticket.cancelled']
+        booked = OutboxEvent.query.filter_by(event_type='ticket.booked').one()
+        assert booked.data['ticket']['pnr_number'] == ticket['pnr_number']
+
+    def test_nothing_recorded_for_failed_writes(self, client, init_database):
+        """Test rejected or rolled back requests leave no event"""
+        login_regular_user(client)
+        client.post('/api/tickets/', json={'schedule_id': 999, 'journey_date': '2099-01-01',
+                                           'passenger_name': 'X', 'passenger_age': 1, 'passenger_gender': 'male'})
+        client.post('/api/auth/register', json={
+            'username': 'testuser', 'email': 'other@test.com', 'password': 'x', 'full_name': 'Dup'
+        })
+
+        assert event_types() == []
+
+    def test_disabled(self, app, client, init_database):
+        """Test OUTBOX_ENABLED = False records nothing"""
+        app.config['OUTBOX_ENABLED'] = False
+        login_regular_user(client)
+
+        assert book(client).status_code == 201
+        assert event_types() == []
+
+
+class TestDispatch:
+    """Test batched, at-least-once webhook delivery"""
+
+    def test_batches_over_one_connection(self, app, client, init_database, webhook, webhook_client):
+        """Test events arrive in order, in batches, over a kept-alive connection"""
+        app.config['OUTBOX_BATCH_SIZE'] = 2
+        dispatch_pending(app, webhook_client)  # the cursor starts after existing events
+        login_regular_user(client)
+        pnrs = [book(client, f'Rider {i}').get_json()['ticket']['pnr_number'] for i in range(3)]
+
+        assert dispatch_pending(app, webhook_client) == 2
+        assert dispatch_pending(app, webhook_client) == 1
+        assert dispatch_pending(app, webhook_client) == 0
+
+        assert [len(batch) for batch in webhook.batches] == [2, 1]
+        assert [event['data']['ticket']['pnr_number'] for batch in webhook.batches for event in batch] == pnrs
+        assert len(webhook.connections) == 1
+
+    def test_failure_backs_off_then_redelivers(self, app, client, init_database, webhook, webhook_client):
+        """Test a failed batch is kept, retried after the backoff and then delivered"""
+        dispatch_pending(app, webhook_client)
+        login_regular_user(client)
+        book(client)
+        webhook.status = 503
+
+        assert dispatch_pending(app, webhook_client) == 0
+        cursor = OutboxCursor.query.one()
+        assert cursor.failures == 1
+        assert 'HTTP 503' in cursor.last_error
+
+        webhook.status = 200
+        assert dispatch_pending(app, webhook_client) == 0  # still backing off
+        cursor.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+        assert dispatch_pending(app, webhook_client) == 1
+        assert OutboxCursor.query.one().failures == 0
+        assert webhook.batches[0][0]['event_type'] == 'ticket.booked'
+
+    def test_waits_at_an_id_gap(self, app, init_database, webhook, webhook_client):
+        """Test an id still held by an open transaction is not skipped until the gap settles"""
+        dispatch_pending(app, webhook_client)
+        first = OutboxEvent(event_type='first', data={})
+        db.session.add(first)
+        db.session.commit()
+        # first.id + 1 is still uncommitted elsewhere
+        db.session.add(OutboxEvent(id=first.id + 2, event_type='after gap', data={}))
+        db.session.commit()
+
+        assert dispatch_pending(app, webhook_client) == 1
+        assert dispatch_pending(app, webhook_client) == 0
+        assert OutboxCursor.query.one().last_event_id == first.id
+
+        late = OutboxEvent.query.filter_by(event_type='after gap').one()
+        late.created_at = datetime.utcnow() - timedelta(seconds=app.config['OUTBOX_GAP_SECONDS'] + 1)
+        db.session.commit()
+
+        assert dispatch_pending(app, webhook_client) == 1
+        assert [event['event_type'] for batch in webhook.batches for event in batch] == ['first', 'after gap']
+
+    def test_unreachable_webhook(self, app, init_database, webhook_client):
+        """Test a connection error counts as a failed delivery"""
+        app.config['OUTBOX_WEBHOOK_URLS'] = ['http://127.0.0.1:9/webhook']
+        dispatch_pending(app, webhook_client)
+        db.session.add(OutboxEvent(event_type='test', data={}))
+        db.session.commit()
+
+        assert dispatch_pending(app, webhook_client) == 0
+        assert OutboxCursor.query.one().failures == 1
+
+    def test_purge_after_delivery(self, app, client, init_database, webhook, webhook_client):
+        """Test only acknowledged events are purged, and never the newest"""
+        dispatch_pending(app, webhook_client)
+        login_regular_user(client)
+        book(client, 'First')
+        book(client, 'Second')
+        later = datetime.utcnow() + timedelta(days=30)
+
+        assert purge_delivered_events(now=later) == 0
+        dispatch_pending(app, webhook_client)
+        assert purge_delivered_events(now=later) == 1
+        assert OutboxEvent.query.one().data['ticket']['passenger_name'] == 'Second'
+
+    def test_purge_respects_cursors_without_config(self, app, init_database):
+        """Test a lagging cursor holds events back even where no webhooks are configured"""
+        app.config['OUTBOX_WEBHOOK_URLS'] = []
+        for event_type in ('first', 'second', 'third'):
+            db.session.add(OutboxEvent(event_type=event_type, data={}))
+        db.session.commit()
+        later = datetime.utcnow() + timedelta(days=30)
+
+        assert purge_delivered_events(now=later) == 0  # no cursors: nothing is known delivered
+        first = OutboxEvent.query.filter_by(event_type='first').one()
+        db.session.add(OutboxCursor(url='http://n8n:5678/webhook/slow', last_event_id=first.id))
+        db.session.commit()
+
+        assert purge_delivered_events(now=later) == 1
+        assert event_types() == ['second', 'third']
+
+    def test_status_endpoint(self, app, client, init_database, webhook, webhook_client):
+        """Test admins see each webhook's backlog"""
+        dispatch_pending(app, webhook_client)
+        login_admin(client)
+        db.session.add(OutboxEvent(event_type='test', data={}))
+        db.session.commit()
+
+        status = client.get('/api/ops/outbox').get_json()
+
+        assert status['webhooks'][0]['url'] == webhook.url
+        assert status['webhooks'][0]['pending'] == 1
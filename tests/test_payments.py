@@ -0,0 +1,237 @@
+"""
+Tests for payments: intents, gateway jobs, callbacks and unpaid ticket expiry
+"""
+import hashlib
+import hmac
+import json
+import threading
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from sqlalchemy import event, update
+from conftest import login_admin, login_regular_user, book
+from jobs import run_pending
+from models import db, Job, Payment, Seat, Ticket
+from payments import expire_unpaid_tickets
+
+SECRET = 'test-webhook-secret'
+
+
+class StubGateway(ThreadingHTTPServer):
+    """Local stand-in for the payment gateway: records calls, answers `status`"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubGatewayHandler)
+        self.calls = []
+        self.status = 200
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/v1'
+
+
+class StubGatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        path = self.path[len('/v1'):]
+        self.server.calls.append((path, body, self.headers['Idempotency-Key']))
+        reply = json.dumps({'id': f'pi_{body["reference"]}'} if path == '/intents' else {}).encode()
+        self.send_response(self.server.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def gateway(app):
+    """Payments enabled against a running stub gateway"""
+    server = StubGateway()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    app.config.update(PAYMENTS_ENABLED=True, PAYMENT_GATEWAY_URL=server.url, PAYMENT_WEBHOOK_SECRET=SECRET)
+    yield server
+    app.extensions.pop('payment_gateway', None)
+    server.shutdown()
+    server.server_close()
+
+
+def callback(client, *events):
+    return signed_callback(client, {'events': [{'id': f'evt_{i}', 'type': event_type, 'intent_id': intent_id}
+                                               for i, (event_type, intent_id) in enumerate(events)]})
+
+
+def signed_callback(client, data):
+    body = json.dumps(data).encode()
+    signature = 'sha256=' + hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return client.post('/api/payments/callback', data=body, content_type='application/json',
+                       headers={'X-Gateway-Signature': signature})
+
+
+def pay(app, client, ticket):
+    """Create and confirm a payment for ticket, running the worker; returns the intent id"""
+    payment = client.post('/api/payments/', json={'ticket_id': ticket['id'], 'payment_method': 'upi'}).get_json()
+    client.post(f'/api/payments/{payment["payment"]["id"]}/confirm')
+    run_pending(app)
+    return Payment.query.get(payment['payment']['id']).transaction_id
+
+
+class TestPaymentFlow:
+    """Test paying for a ticket end to end"""
+
+    def test_disabled_by_default(self, client, init_database):
+        """Test tickets are confirmed on booking and the API is off"""
+        login_regular_user(client)
+
+        assert book(client).get_json()['ticket']['status'] == 'confirmed'
+        assert client.post('/api/payments/', json={}).status_code == 404
+
+    def test_intent_confirm_and_callback(self, app, client, init_database, gateway):
+        """Test requests only queue jobs and the ticket is confirmed by the callback"""
+        login_regular_user(client)
+        ticket = book(client).get_json()['ticket']
+        assert ticket['status'] == 'pending'
+
+        response = client.post('/api/payments/', json={'ticket_id': ticket['id'], 'payment_method': 'upi'})
+        assert response.status_code == 202
+        payment_id = response.get_json()['payment']['id']
+        assert client.post(f'/api/payments/{payment_id}/confirm').status_code == 202
+        assert gateway.calls == []
+
+        run_pending(app)
+        paths = [path for path, _, _ in gateway.calls]
+        assert paths == ['/intents', f'/intents/pi_payment-{payment_id}/confirm']
+        assert gateway.calls[0][1]['amount'] == float(ticket['fare'])
+        assert gateway.calls[0][1]['currency'] == 'UAH'
+        assert gateway.calls[0][2] == f'payment-{payment_id}-intent'
+
+        assert callback(client, ('payment.succeeded', f'pi_payment-{payment_id}')).status_code == 200
+        run_pending(app)
+
+        assert Payment.query.get(payment_id).payment_status == 'completed'
+        assert Ticket.query.get(ticket['id']).status == 'confirmed'
+
+    def test_callbacks_reconciled_in_one_batch(self, app, client, init_database, gateway):
+        """Test several callback events are settled by one batched job call"""
+        login_regular_user(client)
+        intents = [pay(app, client, book(client, f'Rider {i}').get_json()['ticket']) for i in range(3)]
+
+        callback(client, *[('payment.succeeded', intent) for intent in intents],
+                 ('payment.succeeded', intents[0]), ('payment.failed', 'pi_unknown'))
+        run_pending(app)
+
+        results = [job.result for job in Job.query.filter_by(name='payments.reconcile').order_by(Job.id)]
+        assert results == ['confirmed', 'confirmed', 'confirmed', 'ignored', 'unknown intent']
+        assert {ticket.status for ticket in Ticket.query.all()} == {'confirmed'}
+
+    def test_bad_signature_rejected(self, client, init_database, gateway):
+        """Test unsigned callbacks are refused"""
+        response = client.post('/api/payments/callback', json={'type': 'payment.succeeded', 'intent_id': 'x'},
+                               headers={'X-Gateway-Signature': 'sha256=00'})
+
+        assert response.status_code == 403
+
+    def test_malformed_callback_rejected(self, client, init_database, gateway):
+        """Test signed bodies that are not an event object or list get 400, not 500"""
+        event = {'type': 'payment.succeeded', 'intent_id': 'x'}
+
+        assert signed_callback(client, [event]).status_code == 400
+        assert signed_callback(client, {'events': event}).status_code == 400
+        assert Job.query.count() == 0
+
+    def test_gateway_down_is_retried(self, app, client, init_database, gateway):
+        """Test a failing gateway call is retried by the job, not the request"""
+        gateway.status = 502
+        login_regular_user(client)
+        ticket = book(client).get_json()['ticket']
+
+        response = client.post('/api/payments/', json={'ticket_id': ticket['id'], 'payment_method': 'wallet'})
+        run_pending(app)
+
+        assert response.status_code == 202
+        job = Job.query.filter_by(name='payments.create_intent').one()
+        assert (job.status, job.attempts) == ('queued', 1)
+        assert 'HTTP 502' in job.last_error
+
+    def test_cancel_paid_ticket_refunds(self, app, client, init_database, gateway):
+        """Test cancelling a paid ticket refunds it"""
+        login_regular_user(client)
+        ticket = book(client).get_json()['ticket']
+        intent = pay(app, client, ticket)
+        callback(client, ('payment.succeeded', intent))
+        run_pending(app)
+
+        client.put(f'/api/tickets/{ticket["id"]}/cancel')
+        run_pending(app)
+        callback(client, ('refund.succeeded', intent))
+        run_pending(app)
+
+        assert gateway.calls[-1][0] == f'/intents/{intent}/refund'
+        assert Payment.query.one().payment_status == 'refunded'
+
+
+class TestUnpaidExpiry:
+    """Test seats of unpaid tickets are released"""
+
+    def test_expire_releases_seat(self, app, client, init_database, gateway):
+        """Test an unpaid ticket past the timeout is cancelled and its seat freed"""
+        login_regular_user(client)
+        ticket = book(client).get_json()['ticket']
+        paid = book(client, 'Paid Rider').get_json()['ticket']
+        callback(client, ('payment.succeeded', pay(app, client, paid)))
+        run_pending(app)
+        later = datetime.utcnow() + timedelta(minutes=30)
+
+        assert expire_unpaid_tickets(now=later) == 1
+
+        assert Ticket.query.get(ticket['id']).status == 'cancelled'
+        assert Ticket.query.get(paid['id']).status == 'confirmed'
+        seat = Seat.query.filter_by(seat_number=ticket['seat_number'], journey_date=date.today() + timedelta(days=7)).one()
+        assert seat.is_available
+
+    def test_late_payment_refunded(self, app, client, init_database, gateway):
+        """Test a payment that succeeds after its ticket expired is refunded"""
+        login_regular_user(client)
+        ticket = book(client).get_json()['ticket']
+        intent = pay(app, client, ticket)
+        expire_unpaid_tickets(now=datetime.utcnow() + timedelta(minutes=30))
+
+        callback(client, ('payment.succeeded', intent))
+        run_pending(app)
+        run_pending(app)
+
+        assert Ticket.query.get(ticket['id']).status == 'cancelled'
+        assert gateway.calls[-1][0] == f'/intents/{intent}/refund'
+
+    def test_expired_during_reconcile_refunded(self, app, client, init_database, gateway):
+        """Test a ticket expired between the reconcile job's read and its write is refunded, not confirmed"""
+        login_regular_user(client)
+        ticket = book(client).get_json()['ticket']
+        intent = pay(app, client, ticket)
+        callback(client, ('payment.succeeded', intent))
+
+        expired = []
+
+        def expire_first(state):
+            # The sweeper commits its cancellation before the job's UPDATE runs
+            if state.is_update and state.bind_mapper.class_ is Ticket and not expired:
+                expired.append(ticket['id'])
+                state.session.connection().execute(
+                    update(Ticket).where(Ticket.id == ticket['id']).values(status='cancelled')
+                )
+        event.listen(db.session, 'do_orm_execute', expire_first)
+        try:
+            run_pending(app)
+        finally:
+            event.remove(db.session, 'do_orm_execute', expire_first)
+        run_pending(app)
+
+        assert Job.query.filter_by(name='payments.reconcile').one().result == 'refunding'
+        assert Ticket.query.get(ticket['id']).status == 'cancelled'
+        assert gateway.calls[-1][0] == f'/intents/{intent}/refund'
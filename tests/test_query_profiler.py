@@ -0,0 +1,133 @@
+"""
+Tests for the per-request query profiler and query budgets
+"""
+import logging
+import pytest
+from datetime import date, time, timedelta
+from conftest import TestConfig, login_admin, login_regular_user
+from app import create_app
+from config import Config
+from models import db, Train, Route, Schedule
+from query_profiler import fingerprint, QueryProfile
+
+
+@pytest.fixture
+def many_schedules(init_database):
+    """Add five more trains, routes and schedules between City A and City B"""
+    for i in range(5):
+        train = Train(train_number=f'BUD{i}', train_name=f'Budget {i}', train_type='express', total_seats=10)
+        route = Route(route_name=f'Route {i}', source_station='City A', destination_station='City B',
+                      distance_km=100, duration_hours=2)
+        db.session.add_all([train, route])
+        db.session.flush()
+        db.session.add(Schedule(train_id=train.id, route_id=route.id, departure_time=time(9, 0),
+                                arrival_time=time(11, 0), frequency='daily', base_fare=80))
+    db.session.commit()
+    return init_database
+
+
+class TestFingerprints:
+    """Test statement normalization and repeat detection"""
+
+    def test_fingerprint_collapses_in_lists_and_literals(self):
+        """Test expanded IN lists and literals share one fingerprint"""
+        assert fingerprint('SELECT * FROM seats\n WHERE id IN (?, ?, ?) LIMIT 1') == \
+            fingerprint('SELECT * FROM seats WHERE id IN (?, ?) LIMIT 5')
+
+    def test_repeated_statements(self):
+        """Test the N+1 pattern is reported once per fingerprint"""
+        profile = QueryProfile()
+        for _ in range(6):
+            profile.record('SELECT * FROM trains WHERE trains.id = ?', 0.001)
+        profile.record('SELECT * FROM schedules', 0.002)
+
+        assert profile.count == 7
+        assert profile.repeated(5) == [('SELECT * FROM trains WHERE trains.id = ?', 6)]
+
+
+class TestRequestProfile:
+    """Test per-request reporting"""
+
+    def test_server_timing_header(self, client, init_database):
+        """Test DB time and statement count are sent in Server-Timing"""
+        response = client.get('/api/trains/')
+
+        header = response.headers['Server-Timing']
+        assert header.startswith('db;dur=')
+        assert 'desc="1 queries"' in header
+        assert 'app;dur=' in header
+
+    def test_server_timing_off_by_default(self):
+        """Test production responses do not expose query timings"""
+        class ProductionLikeConfig(TestConfig):
+            QUERY_PROFILER_SERVER_TIMING = Config.QUERY_PROFILER_SERVER_TIMING
+
+        app = create_app(ProductionLikeConfig)
+        with app.app_context():
+            db.create_all()
+            response = app.test_client().get('/api/trains/')
+            db.drop_all()
+
+        assert 'Server-Timing' not in response.headers
+
+    def test_threshold_logging(self, caplog):
+        """Test requests over the query threshold are logged"""
+        class StrictConfig(TestConfig):
+            QUERY_PROFILER_MAX_QUERIES = 0
+
+        app = create_app(StrictConfig)
+        with app.app_context():
+            db.create_all()
+            with caplog.at_level(logging.WARNING, logger='query_profiler'):
+                app.test_client().get('/api/trains/')
+            db.drop_all()
+
+        assert 'GET /api/trains/' in caplog.text
+        assert '1 queries' in caplog.text
+
+
+class TestQueryBudgets:
+    """Test list and lookup endpoints load their relations eagerly"""
+
+    def test_schedule_list(self, client, many_schedules, query_budget):
+        """Test listing six schedules with train and route names is one query"""
+        with query_budget(1):
+            response = client.get('/api/schedules/')
+
+        assert response.get_json()['count'] == 6
+
+    def test_schedule_search(self, client, many_schedules, query_budget):
+        """Test search does not lazy load per result"""
+        future_date = (date.today() + timedelta(days=7)).isoformat()
+
+        with query_budget(1):
+            client.get('/api/schedules/search?source=City A&destination=City B')
+        with query_budget(4):
+            response = client.get(
+                f'/api/schedules/search?source=City A&destination=City B&journey_date={future_date}'
+            )
+
+        assert response.get_json()['count'] == 6
+
+    def test_pnr_lookup(self, client, init_database, query_budget):
+        """Test PNR lookup loads ticket, schedule, train and route together"""
+        login_regular_user(client)
+        pnr = client.post('/api/tickets/', json={
+            'schedule_id': 1,
+            'journey_date': (date.today() + timedelta(days=7)).isoformat(),
+            'passenger_name': 'Budget Test',
+            'passenger_age': 30,
+            'passenger_gender': 'male'
+        }).get_json()['ticket']['pnr_number']
+
+        with query_budget(1):
+            response = client.get(f'/api/tickets/pnr/{pnr}')
+
+        assert response.get_json()['ticket']['schedule']['train_number'] == 'EXP001'
+
+    def test_admin_list(self, client, init_database, query_budget):
+        """Test the admin check and the user list cost one query each"""
+        login_admin(client)
+
+        with query_budget(2):
+            client.get('/api/users/')
@@ -0,0 +1,62 @@
+"""
+Tests for column-projected read models
+"""
+from datetime import date
+from decimal import Decimal
+import pytest
+from conftest import login_admin, login_regular_user
+from models import db, User, Train, Route, Ticket, Seat
+from read_models import USERS, TRAINS, ROUTES, TICKETS, SEATS
+
+
+class TestReadModels:
+    """Test read models return exactly what to_dict() returns"""
+
+    @pytest.mark.parametrize('read_model, model', [
+        (USERS, User), (TRAINS, Train), (ROUTES, Route), (TICKETS, Ticket), (SEATS, Seat)
+    ])
+    def test_rows_match_to_dict(self, init_database, read_model, model):
+        """Test every serialized column is selected and converted the same way"""
+        db.session.add(Ticket(
+            user_id=init_database['user'].id, schedule_id=init_database['schedule'].id,
+            booking_date=date.today(), journey_date=init_database['future_date'],
+            passenger_name='Row Test', passenger_age=30, passenger_gender='other',
+            seat_number='A1', fare=Decimal('150.00'), status='confirmed', pnr_number='PNRROW1'
+        ))
+        db.session.commit()
+        expected = [obj.to_dict() for obj in model.query.order_by(model.id)]
+
+        rows = read_model.all(read_model.select().order_by(model.id))
+
+        assert rows and rows == expected
+
+    def test_extra_columns(self, init_database):
+        """Test extra columns are readable on the row and left out of the dict"""
+        row = db.session.execute(SEATS.select(Seat.segment_mask).limit(1)).one()
+
+        assert row.segment_mask == 0
+        assert 'segment_mask' not in SEATS.to_dict(row)
+
+
+class TestListEndpoints:
+    """Test list endpoints read rows, not ORM instances"""
+
+    @pytest.mark.parametrize('url', ['/api/trains/', '/api/routes/', '/api/users/', '/api/tickets/'])
+    def test_no_identity_map_entries(self, client, init_database, query_budget, url):
+        """Test the list is built in one query without loading instances"""
+        login_admin(client)
+        db.session.expunge_all()
+
+        with query_budget(2):  # the current user for /users/ and /tickets/
+            response = client.get(url)
+
+        assert response.status_code == 200
+        assert all(not isinstance(obj, (Train, Route, Ticket)) for obj in db.session.identity_map.values())
+
+    def test_user_tickets_filtered(self, client, init_database):
+        """Test regular users still see only their own tickets"""
+        login_regular_user(client)
+
+        tickets = client.get('/api/tickets/').get_json()['tickets']
+
+        assert {ticket['user_id'] for ticket in tickets} <= {init_database['user'].id}
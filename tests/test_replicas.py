@@ -0,0 +1,160 @@
+"""
+Tests for read replica routing, using two SQLite files as primary and replica
+"""
+import pytest
+from conftest import TestConfig, login_admin
+from app import create_app
+from models import db, User, Train
+from replicas import get_router
+
+
+def add_train(engine, train_number):
+    """Insert a train directly into one database"""
+    with engine.begin() as connection:
+        connection.execute(Train.__table__.insert().values(
+            train_number=train_number,
+            train_name=f'{train_number} Express',
+            train_type='express',
+            total_seats=100,
+            status='active'
+        ))
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    """App with a primary and one replica; the replica holds different rows"""
+    class ReplicaConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        DB_REPLICA_URIS = [f"sqlite:///{tmp_path / 'replica.db'}"]
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+
+    app = create_app(ReplicaConfig, start_background=False)
+    with app.app_context():
+        replica = get_router().engines[0]
+        get_router().refresh()  # what the lag thread does in a running app
+        db.create_all()
+        db.metadata.create_all(replica)
+
+        admin = User(username='admin', email='admin@test.com', full_name='Admin User', role='admin')
+        admin.set_password('adminpass123')
+        db.session.add(admin)
+        db.session.commit()
+
+        add_train(db.engine, 'PRI001')
+        add_train(replica, 'REP001')
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+        replica.dispose()
+
+
+def train_numbers(client):
+    """Helper to list train numbers from the public catalog"""
+    return [t['train_number'] for t in client.get('/api/trains/').get_json()['trains']]
+
+
+class TestReplicaRouting:
+    """Test which database serves each endpoint"""
+
+    def test_public_reads_use_replica(self, replica_app):
+        """Test get_all_trains reads from the replica"""
+        client = replica_app.test_client()
+
+        assert train_numbers(client) == ['REP001']
+
+    def test_other_endpoints_use_primary(self, replica_app):
+        """Test an undecorated endpoint reads from the primary"""
+        client = replica_app.test_client()
+
+        response = client.get('/api/trains/1')
+
+        assert response.get_json()['train']['train_number'] == 'PRI001'
+
+    def test_read_your_writes(self, replica_app):
+        """Test a client that just wrote reads from the primary"""
+        client = replica_app.test_client()
+        client.post('/api/auth/register', json={
+            'username': 'newuser',
+            'email': 'newuser@test.com',
+            'password': 'password123',
+            'full_name': 'New User'
+        })
+
+        assert train_numbers(client) == ['PRI001']
+        # Other clients still read from the replica
+        assert train_numbers(replica_app.test_client()) == ['REP001']
+
+    def test_no_replicas_configured(self, client, init_database):
+        """Test read-only endpoints work without replicas"""
+        assert train_numbers(client) == ['EXP001']
+
+    def test_no_session_stamp_without_replicas(self, client, init_database):
+        """Test a write does not set a session cookie when there is no replica to avoid"""
+        response = client.post('/api/auth/register', json={
+            'username': 'cookieless',
+            'email': 'cookieless@test.com',
+            'password': 'password123',
+            'full_name': 'Cookieless User'
+        })
+
+        assert response.status_code == 201
+        assert 'Set-Cookie' not in response.headers
+
+
+class TestReplicaLag:
+    """Test lagging and unreachable replicas"""
+
+    def test_lagging_replica_falls_back_to_primary(self, replica_app):
+        """Test the default fallback reads from the primary"""
+        get_router().measure_lag = lambda engine: 60.0
+        get_router().refresh()
+
+        assert train_numbers(replica_app.test_client()) == ['PRI001']
+
+    def test_lagging_replica_fallback_replica(self, replica_app):
+        """Test fallback 'replica' serves stale reads from the least lagged replica"""
+        router = get_router()
+        router.fallback = 'replica'
+        router.measure_lag = lambda engine: 60.0
+        router.refresh()
+
+        assert train_numbers(replica_app.test_client()) == ['REP001']
+
+    def test_unreachable_replica(self, replica_app):
+        """Test a replica whose lag check fails is skipped and reported"""
+        def broken(engine):
+            raise ConnectionError('replica down')
+        router = get_router()
+        router.fallback = 'replica'
+        router.measure_lag = broken
+        router.refresh()
+        client = replica_app.test_client()
+
+        assert train_numbers(client) == ['PRI001']
+
+        login_admin(client)
+        status = client.get('/api/ops/replicas').get_json()
+        assert status['replicas'][0]['healthy'] is False
+        assert status['replicas'][0]['lag_seconds'] is None
+
+    def test_requests_never_measure_lag(self, replica_app):
+        """Test routing reads the last measurement and skips replicas not measured yet"""
+        router = get_router()
+        router._lag.clear()
+
+        def probe(engine):
+            raise AssertionError('lag measured on a request thread')
+        router.measure_lag = probe
+
+        assert train_numbers(replica_app.test_client()) == ['PRI001']
+
+    def test_lag_thread(self, replica_app):
+        """Test the background thread measures lag and stops"""
+        router = get_router()
+        router._lag.clear()
+        thread = router.start()
+        thread.stop_event.set()
+        thread.join(timeout=5)
+
+        assert not thread.is_alive()
+        assert router.lag(router.engines[0]) == 0.0
@@ -286,3 +286,62 @@ class TestDeleteSeat:
         response = client.delete('/api/seats/9999')
         
         assert response.status_code == 404
+
+
+class TestCompactSeatMap:
+    """Test the compact seat map format"""
+    
+    def test_compact_format(self, client, init_database):
+        """Test compact payload encodes numbers, types and availability"""
+        from seat_map import decode_bitmap, decode_seat_numbers
+        
+        login_regular_user(client)
+        future_date = (date.today() + timedelta(days=7)).isoformat()
+        client.post('/api/tickets/', json={
+            'schedule_id': 1,
+            'journey_date': future_date,
+            'passenger_name': 'Map Test',
+            'passenger_age': 30,
+            'passenger_gender': 'male'
+        })
+        
+        response = client.get(f'/api/seats/?schedule_id=1&journey_date={future_date}&format=compact')
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['seat_number_runs'] == [['A', 1, 5]]
+        assert decode_seat_numbers(data['seat_number_runs']) == ['A1', 'A2', 'A3', 'A4', 'A5']
+        assert data['seat_types'] == ['AC']
+        assert data['type_runs'] == [[0, 5]]
+        assert decode_bitmap(data['availability'], 5) == [False, True, True, True, True]
+        assert data['total_available'] == 4
+        assert data['total_occupied'] == 1
+    
+    def test_compact_format_etag(self, client, init_database):
+        """Test unchanged seat maps revalidate with 304"""
+        future_date = (date.today() + timedelta(days=7)).isoformat()
+        url = f'/api/seats/?schedule_id=1&journey_date={future_date}&format=compact'
+        
+        first = client.get(url)
+        etag = first.headers['ETag']
+        second = client.get(url, headers={'If-None-Match': etag})
+        
+        assert etag.startswith('W/')
+        assert second.status_code == 304
+    
+    def test_compact_format_gzip(self, client, init_database):
+        """Test compact seat maps are compressed when the client accepts gzip"""
+        import gzip
+        import json
+        
+        future_date = (date.today() + timedelta(days=7)).isoformat()
+        
+        response = client.get(
+            f'/api/seats/?schedule_id=1&journey_date={future_date}&format=compact',
+            headers={'Accept-Encoding': 'gzip'}
+        )
+        
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        data = json.loads(gzip.decompress(response.get_data()))
+        assert data['total_available'] == 5
@@ -0,0 +1,161 @@
+"""
+Tests for route stops and segment-based seat inventory
+"""
+import pytest
+from datetime import date, timedelta
+from conftest import login_admin, login_regular_user
+from models import Seat
+from segments import SegmentBitmap, segment_mask
+
+
+@pytest.fixture
+def stops_route(client, init_database):
+    """Give the fixture route two intermediate stops: A -> X -> Y -> B"""
+    login_admin(client)
+    client.put('/api/routes/1', json={'stops': ['Stop X', 'Stop Y']})
+    client.post('/api/auth/logout')
+    login_regular_user(client)
+    return init_database
+
+
+def book_trip(client, from_station=None, to_station=None):
+    """Helper to book a (partial) trip on the fixture schedule"""
+    payload = {
+        'schedule_id': 1,
+        'journey_date': (date.today() + timedelta(days=7)).isoformat(),
+        'passenger_name': 'Segment Rider',
+        'passenger_age': 30,
+        'passenger_gender': 'female'
+    }
+    if from_station:
+        payload['from_station'] = from_station
+    if to_station:
+        payload['to_station'] = to_station
+    return client.post('/api/tickets/', json=payload)
+
+
+class TestRouteStops:
+    """Test managing intermediate stops"""
+
+    def test_route_returns_stops(self, client, stops_route):
+        """Test stops are saved in order and returned with the route"""
+        response = client.get('/api/routes/1')
+
+        assert response.get_json()['route']['stops'] == ['Stop X', 'Stop Y']
+
+    def test_invalid_stops(self, client, init_database):
+        """Test stops must be a list of names"""
+        login_admin(client)
+
+        response = client.put('/api/routes/1', json={'stops': 'Stop X'})
+
+        assert response.status_code == 400
+
+    def test_stops_locked_after_segment_sale(self, client, stops_route):
+        """Test stops cannot be renumbered once segment tickets exist"""
+        book_trip(client, 'City A', 'Stop X')
+        client.post('/api/auth/logout')
+        login_admin(client)
+
+        response = client.put('/api/routes/1', json={'stops': ['Stop Z']})
+
+        assert response.status_code == 400
+
+
+class TestSegmentBooking:
+    """Test selling seats per segment"""
+
+    def test_disjoint_trips_share_a_seat(self, client, stops_route):
+        """Test A->X and X->B go on the same seat"""
+        first = book_trip(client, 'City A', 'Stop X').get_json()['ticket']
+        second = book_trip(client, 'Stop X', 'City B').get_json()['ticket']
+
+        assert first['seat_number'] == second['seat_number'] == 'A1'
+        assert (first['from_stop'], first['to_stop']) == (0, 1)
+        assert (second['from_stop'], second['to_stop']) == (1, 3)
+
+    def test_overlapping_trips_use_different_seats(self, client, stops_route):
+        """Test A->Y and X->B overlap on X->Y"""
+        first = book_trip(client, 'City A', 'Stop Y').get_json()['ticket']
+        second = book_trip(client, 'Stop X', 'City B').get_json()['ticket']
+
+        assert first['seat_number'] != second['seat_number']
+
+    def test_partial_seat_not_sold_for_whole_route(self, client, stops_route):
+        """Test a whole-route booking skips partly sold seats"""
+        book_trip(client, 'City A', 'Stop X')
+
+        ticket = book_trip(client).get_json()['ticket']
+
+        assert ticket['seat_number'] == 'A2'
+        assert ticket['from_stop'] is None
+
+    def test_reversed_stations_rejected(self, client, stops_route):
+        """Test stations must be in travel order"""
+        response = book_trip(client, 'Stop Y', 'Stop X')
+
+        assert response.status_code == 400
+
+    def test_cancel_frees_only_the_trip(self, client, stops_route, app):
+        """Test cancelling clears the ticket's segments and keeps others"""
+        first = book_trip(client, 'City A', 'Stop X').get_json()['ticket']
+        second = book_trip(client, 'Stop X', 'City B').get_json()['ticket']
+
+        client.put(f"/api/tickets/{first['id']}/cancel")
+        with app.app_context():
+            seat = Seat.query.filter_by(seat_number='A1').first()
+            assert seat.segment_mask == segment_mask(1, 3)
+            assert seat.is_available is False
+
+        client.put(f"/api/tickets/{second['id']}/cancel")
+        with app.app_context():
+            seat = Seat.query.filter_by(seat_number='A1').first()
+            assert seat.segment_mask == 0
+            assert seat.is_available is True
+
+
+class TestSegmentAvailability:
+    """Test segment-aware availability queries"""
+
+    def test_available_seats_for_trip(self, client, stops_route):
+        """Test a seat sold A->X is still free for Y->B"""
+        future_date = (date.today() + timedelta(days=7)).isoformat()
+        for _ in range(5):
+            book_trip(client, 'City A', 'Stop X')
+
+        whole = client.get(f'/api/seats/?schedule_id=1&journey_date={future_date}').get_json()
+        tail = client.get(
+            f'/api/seats/?schedule_id=1&journey_date={future_date}&from_station=Stop Y&to_station=City B'
+        ).get_json()
+
+        assert whole['total_available'] == 0
+        assert tail['total_available'] == 5
+
+    def test_segment_counts(self, client, stops_route):
+        """Test free seats per segment"""
+        future_date = (date.today() + timedelta(days=7)).isoformat()
+        book_trip(client, 'City A', 'Stop Y')
+
+        data = client.get(f'/api/seats/segments?schedule_id=1&journey_date={future_date}').get_json()
+
+        assert data['stations'] == ['City A', 'Stop X', 'Stop Y', 'City B']
+        assert [s['available'] for s in data['segments']] == [4, 4, 5]
+
+
+class TestSegmentBitmap:
+    """Test the in-memory interval bitsets"""
+
+    def test_round_trip_and_queries(self):
+        """Test transposing masks and querying stop ranges"""
+        masks = [segment_mask(0, 2), 0, segment_mask(2, 4)]
+        bitmap = SegmentBitmap.from_masks(masks, 4)
+
+        assert [bitmap.seat_mask(i) for i in range(3)] == masks
+        assert bitmap.first_free(0, 2) == 1
+        assert bitmap.first_free(1, 3) == 1
+        assert bitmap.free(0, 2) == 0b110
+
+        bitmap.book(1, 0, 4)
+        assert bitmap.first_free(1, 3) is None
+        bitmap.release(1, 0, 4)
+        assert bitmap.first_free(1, 3) == 1
@@ -0,0 +1,83 @@
+"""
+Tests for generated model serializers and the orjson JSON provider
+"""
+from datetime import datetime, time
+from decimal import Decimal
+import pytest
+from flask import request
+from werkzeug.exceptions import BadRequest
+from conftest import TestConfig
+from app import create_app
+from models import Route, Schedule, Train
+from serializers import OrjsonProvider
+
+
+class TestColumnSerializer:
+    """Test generated to_dict methods"""
+
+    def test_column_conversions(self, app):
+        """Test ISO dates, Numeric as float and falsy values as before"""
+        route = Route(id=1, route_name='R', source_station='A', destination_station='B',
+                      distance_km=Decimal('120.50'), duration_hours=Decimal('0'),
+                      status='active', created_at=datetime(2024, 5, 1, 8, 30))
+
+        assert route.to_dict() == {
+            'id': 1, 'route_name': 'R', 'source_station': 'A', 'destination_station': 'B',
+            'distance_km': 120.5, 'duration_hours': 0, 'status': 'active',
+            'created_at': '2024-05-01T08:30:00'
+        }
+        assert Train(id=2).to_dict()['created_at'] is None
+
+    def test_relationship_fields(self, app):
+        """Test schedules still carry train and route fields"""
+        schedule = Schedule(id=3, departure_time=time(6, 5), base_fare=Decimal('99.90'),
+                            train=Train(train_name='Express', train_number='E1'))
+
+        data = schedule.to_dict()
+
+        assert data['departure_time'] == '06:05:00'
+        assert data['base_fare'] == 99.9
+        assert data['train_number'] == 'E1'
+        assert data['source_station'] is None
+
+    def test_compiled_once(self, app):
+        """Test the descriptor installs a plain function on the class"""
+        Train(id=1).to_dict()
+
+        assert hasattr(Train.__dict__['to_dict'], '__source__')
+
+
+class TestOrjsonProvider:
+    """Test the JSON provider used by jsonify and request.get_json"""
+
+    def test_compact_responses(self, app, client, init_database):
+        """Test production responses are compact and keep key order"""
+        assert isinstance(app.json, OrjsonProvider)
+
+        body = client.get('/api/trains/').get_data(as_text=True)
+
+        assert body.startswith('{"trains":[{"id":1,"train_number":"EXP001"')
+        assert body.endswith('}\n')
+
+    def test_pretty_when_not_compact(self):
+        """Test JSON_COMPACT = False indents responses"""
+        class PrettyConfig(TestConfig):
+            JSON_COMPACT = False
+
+        pretty = create_app(PrettyConfig)
+        with pretty.app_context():
+            body = pretty.json.response({'a': [1]}).get_data(as_text=True)
+
+        assert body == '{\n  "a": [\n    1\n  ]\n}\n'
+
+    def test_native_types(self, app):
+        """Test Decimal, datetime and non-string keys"""
+        assert app.json.dumps({1: Decimal('2.50'), 'at': datetime(2024, 1, 2, 3, 4, 5)}) == \
+            '{"1":2.5,"at":"2024-01-02T03:04:05"}'
+
+    def test_invalid_request_body(self, app):
+        """Test malformed JSON is still a client error"""
+        with app.test_request_context(data='{"username":', content_type='application/json'):
+            assert request.get_json(silent=True) is None
+            with pytest.raises(BadRequest):
+                request.get_json()
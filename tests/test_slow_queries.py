@@ -0,0 +1,103 @@
+"""
+Tests for the slow query log
+"""
+import pytest
+from conftest import TestConfig, login_admin, login_regular_user
+from app import create_app
+from models import db, Train
+from slow_queries import SlowQueryLog, redact
+
+
+@pytest.fixture
+def slow_log(app):
+    """Record every statement, without EXPLAIN"""
+    log = SlowQueryLog(threshold_ms=0, explain=False)
+    app.extensions['slow_query_log'] = log
+    return log
+
+
+class TestRedaction:
+    """Test parameters are never stored"""
+
+    def test_values_replaced_by_types(self):
+        """Test strings keep only their length"""
+        assert redact(('secret@example.com', 42, None)) == ['<str:18>', '<int>', None]
+        assert redact({'pnr': 'PNR123'}) == {'pnr': '<str:6>'}
+        assert redact([('a', 1), ('bb', 2)], executemany=True) == ['<str:1>', '<int>']
+
+
+class TestSlowQueryLog:
+    """Test threshold, dedup and bounds"""
+
+    def test_threshold(self, client, init_database):
+        """Test statements under the threshold are not recorded"""
+        client.get('/api/trains/')
+
+        assert client.application.extensions['slow_query_log'].snapshot()['recent'] == []
+
+    def test_fingerprint_dedup(self, client, init_database, slow_log):
+        """Test repeated statements share one fingerprint entry"""
+        client.get('/api/trains/search?q=Express')
+        client.get('/api/trains/search?q=Local')
+
+        snapshot = slow_log.snapshot()
+        searches = [entry for entry in snapshot['fingerprints'] if 'LIKE' in entry['statement']]
+        assert len(searches) == 1
+        assert searches[0]['count'] == 2
+        assert searches[0]['last_endpoint'] == 'trains.search_trains'
+        assert 'Express' not in str(snapshot)
+
+    def test_bounded(self, app):
+        """Test the ring buffer and fingerprint table stay at capacity"""
+        log = SlowQueryLog(threshold_ms=0, capacity=3, explain=False)
+        app.extensions['slow_query_log'] = log
+        for i in range(10):
+            db.session.execute(db.text(f'SELECT 1 AS column_{i}'))
+
+        snapshot = log.snapshot()
+        assert len(snapshot['recent']) == 3
+        assert len(snapshot['fingerprints']) == 3
+
+    def test_explain_captured(self, tmp_path):
+        """Test the query plan is filled in by the background thread"""
+        class SlowConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path}/slow.db'
+            SLOW_QUERY_MS = 0
+
+        app = create_app(SlowConfig)
+        with app.app_context():
+            db.create_all()
+            db.session.add(Train(train_number='EXP001', train_name='Express',
+                                 train_type='express', total_seats=100))
+            db.session.commit()
+
+            app.test_client().get('/api/trains/search?q=Express')
+            log = app.extensions['slow_query_log']
+            log.wait_for_explains()
+            entry = next(e for e in log.snapshot()['fingerprints'] if e['last_endpoint'] == 'trains.search_trains')
+            db.drop_all()
+
+        assert entry['plan_error'] is None
+        assert any('trains' in row['detail'] for row in entry['plan'])
+
+
+class TestSlowQueryEndpoint:
+    """Test the admin endpoint"""
+
+    def test_admin_only(self, client, init_database):
+        """Test regular users cannot read the log"""
+        login_regular_user(client)
+
+        assert client.get('/api/ops/slow-queries').status_code == 403
+
+    def test_list_and_clear(self, client, init_database, slow_log):
+        """Test admins can read and clear the log"""
+        login_admin(client)
+        client.get('/api/trains/')
+
+        data = client.get('/api/ops/slow-queries').get_json()
+        assert data['threshold_ms'] == 0
+        assert any('FROM trains' in entry['statement'] for entry in data['fingerprints'])
+
+        assert client.delete('/api/ops/slow-queries').status_code == 200
+        assert slow_log.snapshot()['fingerprints'] == []
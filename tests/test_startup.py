@@ -0,0 +1,102 @@
+"""
+Tests for application startup and gunicorn worker hooks
+"""
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+from conftest import TestConfig
+from app import create_app, start_background_tasks, warm_up
+from models import db
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def load_hooks():
+    """Functions defined in gunicorn.conf.py"""
+    namespace = {}
+    with open(os.path.join(ROOT, 'gunicorn.conf.py')) as f:
+        exec(compile(f.read(), 'gunicorn.conf.py', 'exec'), namespace)
+    return namespace
+
+
+class SweeperConfig(TestConfig):
+    """Sweeper on, with an interval that never elapses during a test"""
+    SWEEPER_ENABLED = True
+    SWEEPER_INTERVAL_SECONDS = 3600
+
+
+class TestStartup:
+    """Test the app is built once and reports its startup phases"""
+
+    def test_import_builds_no_app(self):
+        """Test importing app.py does not construct an application"""
+        script = 'import app, flask; assert not any(isinstance(v, flask.Flask) for v in vars(app).values())'
+
+        subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True,
+                       env=dict(os.environ, PYTHONPATH=ROOT))
+
+    def test_startup_timings(self, app):
+        """Test create_app records a per-phase breakdown"""
+        timings = app.extensions['startup_timings']
+
+        assert {'config', 'extensions', 'blueprints', 'schema_check', 'background', 'total'} <= set(timings)
+        assert timings['total'] >= timings['blueprints']
+
+    def test_background_deferred(self):
+        """Test background threads can be left to the worker hook"""
+        app = create_app(SweeperConfig, start_background=False)
+        assert 'sweeper' not in app.extensions
+
+        start_background_tasks(app)
+        sweeper = app.extensions['sweeper']
+        start_background_tasks(app)
+
+        assert app.extensions['sweeper'] is sweeper
+        sweeper.stop_event.set()
+
+    def test_warm_up_compiles_templates(self, app):
+        """Test every template is compiled and cached before forking"""
+        warm_up(app)
+
+        cached = {key[1] for key in app.jinja_env.cache.keys()}
+        assert set(app.jinja_env.list_templates()) <= cached
+
+
+class TestGunicornHooks:
+    """Test the preload hooks in gunicorn.conf.py"""
+
+    def test_preload_by_default(self, monkeypatch):
+        """Test preload is on unless GUNICORN_PRELOAD=false"""
+        assert load_hooks()['preload_app'] is True
+        monkeypatch.setenv('GUNICORN_PRELOAD', 'false')
+        assert load_hooks()['preload_app'] is False
+
+    def test_post_fork_resets_pool(self, tmp_path):
+        """Test a worker forked from a preloaded master gets a fresh pool"""
+        class FileConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path}/startup.db'
+        app = create_app(FileConfig, start_background=False)
+        with app.app_context():
+            db.session.execute(db.text('SELECT 1'))
+            db.session.remove()
+            pool = db.engine.pool
+        assert pool.checkedin() == 1
+
+        server = SimpleNamespace(cfg=SimpleNamespace(preload_app=True),
+                                 app=SimpleNamespace(wsgi=lambda: app))
+        load_hooks()['post_fork'](server, worker=None)
+
+        with app.app_context():
+            assert db.engine.pool is not pool
+            assert db.engine.pool.checkedin() == 0
+
+    def test_post_worker_init_starts_sweeper(self):
+        """Test each worker starts its own background threads"""
+        app = create_app(SweeperConfig, start_background=False)
+        worker = SimpleNamespace(wsgi=app, pid=os.getpid(), log=SimpleNamespace(info=lambda *args: None))
+
+        load_hooks()['post_worker_init'](worker)
+
+        assert app.extensions['sweeper'].is_alive()
+        app.extensions['sweeper'].stop_event.set()
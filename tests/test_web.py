@@ -0,0 +1,142 @@
+"""
+Tests for frontend pages, static assets and response compression
+"""
+import gzip
+import json
+import re
+import time
+from conftest import login_admin, login_regular_user
+from models import db, Train
+
+
+class TestCompression:
+    """Test negotiated compression of API and HTML responses"""
+
+    def test_large_json_compressed(self, client, init_database):
+        """Test JSON above the threshold is gzipped for clients that accept it"""
+        db.session.add_all(Train(train_number=f'GZ{i:03d}', train_name=f'Gzip {i}', train_type='local',
+                                 total_seats=50) for i in range(10))
+        db.session.commit()
+
+        response = client.get('/api/trains/', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert json.loads(gzip.decompress(response.get_data()))['count'] == 11
+
+    def test_small_or_unaccepted_left_alone(self, client, init_database):
+        """Test small bodies and clients without Accept-Encoding get identity"""
+        small = client.get('/api/auth/check', headers={'Accept-Encoding': 'gzip'})
+        plain = client.get('/api/schedules/')
+
+        assert 'Content-Encoding' not in small.headers
+        assert 'Content-Encoding' not in plain.headers
+        assert plain.get_json()['count'] == 1
+
+    def test_html_brotli(self, client):
+        """Test pages prefer brotli"""
+        response = client.get('/', headers={'Accept-Encoding': 'gzip, br'})
+
+        assert response.headers['Content-Encoding'] == 'br'
+
+
+class TestStaticAssets:
+    """Test fingerprinted static files"""
+
+    def test_fingerprinted_links_cached_forever(self, client):
+        """Test pages link assets by content hash and those are immutable"""
+        html = client.get('/').get_data(as_text=True)
+        css = re.search(r'href="(/static/css/base\.css\?v=[0-9a-f]{12})"', html).group(1)
+
+        response = client.get(css, headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+        assert gzip.decompress(response.get_data()).startswith(b'* {')
+        response.close()
+
+    def test_stale_fingerprint_revalidates(self, client):
+        """Test an unknown fingerprint is not cached for a year"""
+        response = client.get('/static/js/base.js?v=000000000000')
+
+        assert 'immutable' not in response.headers.get('Cache-Control', '')
+        assert b'checkAuth' in response.get_data()
+        response.close()
+
+
+class TestPageCache:
+    """Test rendered pages are cached for anonymous visitors only"""
+
+    def test_anonymous_pages_cached(self, app, client):
+        """Test the second anonymous visit is served from the cache"""
+        client.get('/search')
+        cache = app.extensions['page_cache']
+        expires, _ = cache._entries['/search', None]
+        cache._entries['/search', None] = (expires, (b'cached copy', None))
+
+        assert client.get('/search').get_data(as_text=True) == 'cached copy'
+
+    def test_data_pages_cached_briefly(self, app, client, init_database):
+        """Test the booking page, which embeds schedule data, uses the short TTL"""
+        url = f'/book/{init_database["schedule"].id}'
+        started = time.monotonic()
+        client.get(url)
+        client.get('/search')
+        entries = app.extensions['page_cache']._entries
+
+        assert entries[url, None][0] - started <= app.config['PAGE_CACHE_DATA_SECONDS'] + 1
+        assert entries['/search', None][0] - started >= app.config['PAGE_CACHE_SECONDS'] - 1
+
+    def test_logged_in_users_rendered(self, app, client, init_database):
+        """Test signed-in users always get a fresh rendering"""
+        client.get('/tickets')
+        cache = app.extensions['page_cache']
+        expires, _ = cache._entries['/tickets', None]
+        cache._entries['/tickets', None] = (expires, (b'cached copy', None))
+        login_regular_user(client)
+
+        assert 'cached copy' not in client.get('/tickets').get_data(as_text=True)
+
+
+def embedded(response):
+    """JSON embedded in a page for its first paint, or None"""
+    match = re.search(r'<script id="initial-data" type="application/json">(.*?)</script>',
+                      response.get_data(as_text=True), re.S)
+    return json.loads(match.group(1)) if match else None
+
+
+class TestInitialData:
+    """Test pages embed the payload of their first API call"""
+
+    def test_book_page_embeds_schedule(self, client, init_database):
+        """Test the booking page carries what GET /api/schedules/<id> returns"""
+        schedule_id = init_database['schedule'].id
+
+        assert embedded(client.get(f'/book/{schedule_id}')) == client.get(f'/api/schedules/{schedule_id}').get_json()
+        assert embedded(client.get('/book/999')) is None
+
+    def test_tickets_and_dashboard_for_signed_in_users(self, client, init_database):
+        """Test personal data is embedded only for the signed-in user"""
+        assert embedded(client.get('/tickets')) is None
+        login_regular_user(client)
+
+        tickets = client.get('/api/tickets/').get_json()
+        me = client.get('/api/auth/me').get_json()
+
+        assert embedded(client.get('/tickets')) == tickets
+        assert embedded(client.get('/dashboard')) == {'user': me['user'], 'tickets': tickets['tickets']}
+
+    def test_disabled(self, app, client, init_database):
+        """Test EMBED_INITIAL_DATA = False renders the plain shell"""
+        app.config['EMBED_INITIAL_DATA'] = False
+
+        assert embedded(client.get(f'/book/{init_database["schedule"].id}')) is None
+
+    def test_schedule_update_clears_cached_pages(self, client, init_database):
+        """Test a cached booking page does not outlive a schedule change"""
+        url = f'/book/{init_database["schedule"].id}'
+        client.get(url)
+        login_admin(client)
+        client.put(f'/api/schedules/{init_database["schedule"].id}', json={'base_fare': 175})
+        client.post('/api/auth/logout')
+
+        assert embedded(client.get(url))['schedule']['base_fare'] == 175
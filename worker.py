@@ -0,0 +1,55 @@
+"""
+Background job worker (see jobs.py), run next to the web service
+
+Usage: python worker.py [--threads 1] [--once]
+
+Each thread polls the jobs table and runs due jobs. With
+OUTBOX_WEBHOOK_URLS set, one more thread delivers outbox events (outbox.py). SIGTERM and SIGINT let
+running jobs finish, then exit; a job cut off anyway is queued again once
+its lease lapses. --once runs every due job and exits (cron, tests).
+"""
+import argparse
+import signal
+import threading
+from app import create_app
+from jobs import JOBS, run_pending, work
+from outbox import dispatch
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run background jobs')
+    parser.add_argument('--threads', type=int, default=1, help='jobs run concurrently')
+    parser.add_argument('--once', action='store_true', help='run the due jobs, then exit')
+    args = parser.parse_args()
+
+    app = create_app(start_background=False)
+
+    if args.once:
+        total = 0
+        while claimed := run_pending(app):
+            total += claimed
+        print(f"Ran {total} jobs.")
+        return
+
+    stop_event = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop_event.set())
+
+    threads = [threading.Thread(target=work, args=(app, stop_event), name=f'job-worker-{i}')
+               for i in range(args.threads)]
+    if app.config['OUTBOX_WEBHOOK_URLS']:
+        threads.append(threading.Thread(target=dispatch, args=(app, stop_event), name='outbox-dispatcher'))
+    for thread in threads:
+        thread.start()
+    print(f"Job worker running {args.threads} thread(s) for: {', '.join(sorted(JOBS))}")
+    if app.config['OUTBOX_WEBHOOK_URLS']:
+        print(f"Delivering outbox events to {len(app.config['OUTBOX_WEBHOOK_URLS'])} webhook(s)")
+
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=1)
+    print("Job worker stopped.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+"""
+WSGI entry point: gunicorn wsgi:app
+
+Builds the application once per process (once in the master with
+--preload). Background threads are started per worker and pooled DB
+connections reset after fork by the hooks in gunicorn.conf.py.
+"""
+from app import create_app
+
+app = create_app(start_background=False)